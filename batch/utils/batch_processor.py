@@ -1,97 +1,120 @@
 import os
-import gc
-from batch.utils.settings_check import check_settings
-from batch.utils.video_processor import process_video
-from core.utils.config_utils import load_key, update_key
+import sys
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from batch.utils.settings_check import check_settings, SETTINGS_FILE
+from batch.utils.video_processor import process_video, ERROR_OUTPUT_DIR
+from batch.utils.task_state import TaskState, read_tasks, export_status, RUNNING_PREFIX
+from core.utils.config_utils import load_key
+from core.utils.job_context import new_job
+from core.utils.resource_slots import get_resource_slots
 import pandas as pd
 from rich.console import Console
 from rich.panel import Panel
-import time
-import shutil
 
 console = Console()
 
-def record_and_update_config(source_language, target_language):
-    original_source_lang = load_key('whisper.language')
-    original_target_lang = load_key('target_language')
-    
+def task_overrides(source_language, target_language):
+    """Config keys set by a task row, they apply to that task's job only"""
+    overrides = {}
     if source_language and not pd.isna(source_language):
-        update_key('whisper.language', source_language)
+        overrides['whisper.language'] = source_language
     if target_language and not pd.isna(target_language):
-        update_key('target_language', target_language)
-    
-    return original_source_lang, original_target_lang
+        overrides['target_language'] = target_language
+    return overrides
+
+def max_parallel_tasks(slots):
+    """Tasks in flight at once, by default enough to keep every slot busy"""
+    try:
+        return max(1, int(load_key("batch.max_parallel")))
+    except KeyError:
+        return slots.capacity
+
+def restore_error_folder(video_file, workspace):
+    """Copy a failed task's files back from batch/output/ERROR into its workspace"""
+    error_folder = os.path.join(ERROR_OUTPUT_DIR, os.path.splitext(video_file)[0])
+    if not os.path.exists(error_folder):
+        console.print(f"[yellow]Warning: Error folder not found: {error_folder}")
+        return
+    os.makedirs(workspace, exist_ok=True)
+    for item in os.listdir(error_folder):
+        src_path = os.path.join(error_folder, item)
+        dst_path = os.path.join(workspace, item)
+        if os.path.isdir(src_path):
+            if os.path.exists(dst_path):
+                shutil.rmtree(dst_path)
+            shutil.copytree(src_path, dst_path)
+        else:
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            shutil.copy2(src_path, dst_path)
+    console.print(f"[green]Restored files from ERROR folder for {video_file}")
+
+def run_task(index, row, total_tasks, state, slots):
+    video_file = row['Video File']
+    status = '' if pd.isna(row['Status']) else str(row['Status'])
+    # an interrupted task still has its workspace, the step cache resumes it
+    is_retry = 'Error' in status or status.startswith(RUNNING_PREFIX)
+    job = new_job(f"batch_{index + 1}", overrides=task_overrides(row['Source Language'], row['Target Language']))
+
+    if 'Error' in status:
+        console.print(Panel(f"Retrying failed task: {video_file}\nTask {index + 1}/{total_tasks}",
+                         title="[bold yellow]Retry Task", expand=False))
+        restore_error_folder(video_file, job.root)
+    else:
+        console.print(Panel(f"Now processing task: {video_file}\nTask {index + 1}/{total_tasks}",
+                         title="[bold blue]Current Task", expand=False))
+
+    def on_step(step_name):
+        state.set_status(index, video_file, f"{RUNNING_PREFIX}: {step_name}")
+
+    try:
+        dubbing = 0 if pd.isna(row['Dubbing']) else int(row['Dubbing'])
+        ok, error_step, error_message = process_video(video_file, dubbing, is_retry, job=job, slots=slots, on_step=on_step)
+        status_msg = "Done" if ok else f"Error: {error_step} - {error_message}"
+    except Exception as e:
+        status_msg = f"Error: Unhandled exception - {str(e)}"
+        console.print(f"[bold red]Error processing {video_file}: {status_msg}")
+    state.set_status(index, video_file, status_msg)
+    return status_msg
 
 def process_batch():
     if not check_settings():
         raise Exception("Settings check failed")
 
-    df = pd.read_excel('batch/tasks_setting.xlsx')
-    for index, row in df.iterrows():
-        if pd.isna(row['Status']) or 'Error' in str(row['Status']):
-            total_tasks = len(df)
-            video_file = row['Video File']
-            
-            if not pd.isna(row['Status']) and 'Error' in str(row['Status']):
-                console.print(Panel(f"Retrying failed task: {video_file}\nTask {index + 1}/{total_tasks}", 
-                                 title="[bold yellow]Retry Task", expand=False))
-                
-                # Restore files from batch/output/ERROR to output
-                error_folder = os.path.join('batch', 'output', 'ERROR', os.path.splitext(video_file)[0])
-                
-                if os.path.exists(error_folder):
-                    # Ensure the output folder exists
-                    os.makedirs('output', exist_ok=True)
-                    
-                    # Copy all contents from ERROR folder for the specific video to output
-                    for item in os.listdir(error_folder):
-                        src_path = os.path.join(error_folder, item)
-                        dst_path = os.path.join('output', item)
-                        
-                        if os.path.isdir(src_path):
-                            if os.path.exists(dst_path):
-                                shutil.rmtree(dst_path)
-                            shutil.copytree(src_path, dst_path)
-                        else:
-                            if os.path.exists(dst_path):
-                                os.remove(dst_path)
-                            shutil.copy2(src_path, dst_path)
-                            
-                    console.print(f"[green]Restored files from ERROR folder for {video_file}")
-                else:
-                    console.print(f"[yellow]Warning: Error folder not found: {error_folder}")
+    state = TaskState()
+    slots = get_resource_slots()
+    try:
+        df = read_tasks(SETTINGS_FILE, state)
+        pending = []
+        for index, row in df.iterrows():
+            status = '' if pd.isna(row['Status']) else str(row['Status'])
+            if not status or 'Error' in status or status.startswith(RUNNING_PREFIX):
+                pending.append((index, row))
             else:
-                console.print(Panel(f"Now processing task: {video_file}\nTask {index + 1}/{total_tasks}", 
-                                 title="[bold blue]Current Task", expand=False))
-            
-            source_language = row['Source Language']
-            target_language = row['Target Language']
-            
-            original_source_lang, original_target_lang = record_and_update_config(source_language, target_language)
-            
-            try:
-                dubbing = 0 if pd.isna(row['Dubbing']) else int(row['Dubbing'])
-                is_retry = not pd.isna(row['Status']) and 'Error' in str(row['Status'])
-                status, error_step, error_message = process_video(video_file, dubbing, is_retry)
-                status_msg = "Done" if status else f"Error: {error_step} - {error_message}"
-            except Exception as e:
-                status_msg = f"Error: Unhandled exception - {str(e)}"
-                console.print(f"[bold red]Error processing {video_file}: {status_msg}")
-            finally:
-                update_key('whisper.language', original_source_lang)
-                update_key('target_language', original_target_lang)
-                
-                df.at[index, 'Status'] = status_msg
-                df.to_excel('batch/tasks_setting.xlsx', index=False)
-                
-                gc.collect()
-                
-                time.sleep(1)
-        else:
-            print(f"Skipping task: {row['Video File']} - Status: {row['Status']}")
+                print(f"Skipping task: {row['Video File']} - Status: {row['Status']}")
+
+        workers = min(len(pending), max_parallel_tasks(slots))
+        if pending:
+            console.print(Panel(f"{len(pending)} task(s), up to {workers} at once\nSlots: {slots.limits}",
+                                title="[bold blue]Batch Scheduler", expand=False))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run_task, index, row, len(df), state, slots) for index, row in pending]
+                for future in futures:
+                    future.result()
+    finally:
+        export_status(SETTINGS_FILE, state)
+        state.close()
 
     console.print(Panel("All tasks processed!\nCheck out in `batch/output`!", 
                        title="[bold green]Batch Processing Complete", expand=False))
 
 if __name__ == "__main__":
-    process_batch()
\ No newline at end of file
+    # python batch/utils/batch_processor.py --export: only copy the task statuses into the sheet
+    if '--export' in sys.argv[1:]:
+        state = TaskState()
+        export_status(SETTINGS_FILE, state)
+        state.close()
+        console.print(f"[green]Task statuses exported to {SETTINGS_FILE}")
+    else:
+        process_batch()
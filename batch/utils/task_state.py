@@ -0,0 +1,71 @@
+import os
+import time
+import sqlite3
+from threading import Lock
+import pandas as pd
+
+# ------------
+# batch task state
+# ------------
+# Task status lives in a small sqlite file next to the task sheet. Workers
+# update one row as their task moves from step to step, instead of rewriting
+# the whole spreadsheet. export_status() copies the statuses into the sheet's
+# Status column, at the end of a batch or on demand. A status newer than the
+# sheet wins when tasks are read, so a batch that was cut short picks up where
+# it stopped; edit the sheet afterwards to override it.
+# ------------
+
+STATE_DB_FILE = 'batch/tasks_state.db'
+RUNNING_PREFIX = 'Running'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    row INTEGER PRIMARY KEY,
+    video_file TEXT,
+    status TEXT,
+    updated_at REAL
+);
+"""
+
+class TaskState:
+    def __init__(self, db_file=STATE_DB_FILE):
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def set_status(self, row, video_file, status):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (row, video_file, status, updated_at) VALUES (?, ?, ?, ?)",
+                (int(row), video_file, status, time.time()),
+            )
+
+    def statuses(self, newer_than=0):
+        """{row: (video_file, status)} of the rows updated after `newer_than`"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT row, video_file, status FROM tasks WHERE updated_at > ?", (newer_than,)
+            ).fetchall()
+        return {row: (video_file, status) for row, video_file, status in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def read_tasks(settings_file, state):
+    """The task sheet with each Status replaced by a newer one from the state db"""
+    df = pd.read_excel(settings_file)
+    df['Status'] = df['Status'].astype(object)
+    for row, (video_file, status) in state.statuses(os.path.getmtime(settings_file)).items():
+        # the sheet may have been edited since, only trust rows that still name the same video
+        if row in df.index and df.at[row, 'Video File'] == video_file:
+            df.at[row, 'Status'] = status
+    return df
+
+def export_status(settings_file, state):
+    """Write the latest statuses into the sheet's Status column"""
+    df = read_tasks(settings_file, state)
+    df.to_excel(settings_file, index=False)
+    return df
@@ -1,7 +1,9 @@
 import os
 from core.st_utils.imports_and_utils import *
 from core.utils.onekeycleanup import cleanup
-from core.utils import load_key
+from core.utils import load_key, job_path, use_job
+from core.utils.job_context import DEFAULT_JOB
+from core.utils.resource_slots import SLOT_ASR, SLOT_LLM, SLOT_TTS, SLOT_ENCODE
 import shutil
 from functools import partial
 from rich.panel import Panel
@@ -16,32 +18,45 @@ SAVE_DIR = 'batch/output'
 ERROR_OUTPUT_DIR = 'batch/output/ERROR'
 YTB_RESOLUTION_KEY = "ytb_resolution"
 
-def process_video(file, dubbing=False, is_retry=False):
+def process_video(file, dubbing=False, is_retry=False, job=DEFAULT_JOB, slots=None, on_step=None):
+    """Run every step for one video in `job`'s workspace; the default job works in output/
+
+    With `slots` (ResourceSlots) each step holds the slot of its kind of work, so
+    several videos can share the host. on_step(step_name) is called as each step starts.
+    """
+    with use_job(job):
+        return _process_video(file, dubbing, is_retry, slots, on_step)
+
+def _process_video(file, dubbing, is_retry, slots, on_step):
     if not is_retry:
-        prepare_output_folder(OUTPUT_DIR)
+        prepare_output_folder(job_path(OUTPUT_DIR))
     
+    # (name, function, resource slot), the download only waits on the network
     text_steps = [
-        ("🎥 Processing input file", partial(process_input_file, file)),
-        ("🎙️ Transcribing with Whisper", partial(_2_asr.transcribe)),
-        ("✂️ Splitting sentences", split_sentences),
-        ("📝 Summarizing and translating", summarize_and_translate),
-        ("⚡ Processing and aligning subtitles", process_and_align_subtitles),
-        ("🎬 Merging subtitles to video", _7_sub_into_vid.merge_subtitles_to_video),
+        ("🎥 Processing input file", partial(process_input_file, file), None),
+        ("🎙️ Transcribing with Whisper", partial(_2_asr.transcribe), SLOT_ASR),
+        ("✂️ Splitting sentences", split_sentences, SLOT_ENCODE),
+        ("📝 Summarizing and translating", summarize_and_translate, SLOT_LLM),
+        ("⚡ Processing and aligning subtitles", process_and_align_subtitles, SLOT_LLM),
+        ("🎬 Merging subtitles to video", _7_sub_into_vid.merge_subtitles_to_video, SLOT_ENCODE),
     ]
     
     if dubbing:
         dubbing_steps = [
-            ("🔊 Generating audio tasks", gen_audio_tasks),
-            ("🎵 Extracting reference audio", _9_refer_audio.extract_refer_audio_main),
-            ("🗣️ Generating audio", _10_gen_audio.gen_audio),
-            ("🔄 Merging full audio", _11_merge_audio.merge_full_audio),
-            ("🎞️ Merging dubbing to video", _12_dub_to_vid.merge_video_audio),
+            ("🔊 Generating audio tasks", gen_audio_tasks, SLOT_LLM),
+            # demucs may run here when it was off for ASR
+            ("🎵 Extracting reference audio", _9_refer_audio.extract_refer_audio_main, SLOT_ASR),
+            ("🗣️ Generating audio", _10_gen_audio.gen_audio, SLOT_TTS),
+            ("🔄 Merging full audio", _11_merge_audio.merge_full_audio, SLOT_ENCODE),
+            ("🎞️ Merging dubbing to video", _12_dub_to_vid.merge_video_audio, SLOT_ENCODE),
         ]
         text_steps.extend(dubbing_steps)
     
     current_step = ""
-    for step_name, step_func in text_steps:
+    for step_name, step_func, slot in text_steps:
         current_step = step_name
+        if on_step:
+            on_step(step_name)
         for attempt in range(3):
             try:
                 console.print(Panel(
@@ -49,7 +64,11 @@ def process_video(file, dubbing=False, is_retry=False):
                     subtitle=f"Attempt {attempt + 1}/3" if attempt > 0 else None,
                     border_style="blue"
                 ))
-                result = step_func()
+                if slots is None:
+                    result = step_func()
+                else:
+                    with slots.acquire(slot):
+                        result = step_func()
                 if result is not None:
                     globals().update(result)
                 break
@@ -82,18 +101,17 @@ def process_input_file(file):
         video_file = _1_ytdlp.find_video_files()
     else:
         input_file = os.path.join('batch', 'input', file)
-        output_file = os.path.join(OUTPUT_DIR, file)
+        output_file = os.path.join(job_path(OUTPUT_DIR), file)
         shutil.copy(input_file, output_file)
         video_file = output_file
     return {'video_file': video_file}
 
 def split_sentences():
     _3_1_split_nlp.split_by_spacy()
-    _3_2_split_meaning.split_sentences_by_meaning()
 
 def summarize_and_translate():
-    _4_1_summarize.get_summary()
-    _4_2_translate.translate_all()
+    # split by meaning, summary and translation run overlapped
+    _4_2_translate.split_and_translate()
 
 def process_and_align_subtitles():
     _5_split_sub.split_for_sub_main()
@@ -1,25 +1,31 @@
 import os
-import time
-import shutil
-import subprocess
-from typing import Tuple
+import asyncio
+from typing import List, Tuple
 
 import pandas as pd
-from pydub import AudioSegment
+import soundfile as sf
 from rich.console import Console
 from rich.progress import Progress
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 from core.utils import *
 from core.utils.models import *
-from core.asr_backend.audio_preprocess import get_audio_duration
-from core.tts_backend.tts_main import tts_main
+from core.utils.audio_duration import get_audio_duration
+from core.tts_backend.tts_main import tts_main_async, ASYNC_TTS_METHODS
+from core.tts_backend.tts_client import run_sync
+from core.tts_backend.tts_cache import reset_tts_cache_stats, report_tts_cache_stats
+from core.utils.time_stretch import stretch_file, stretch_files
+from core.utils.step_cache import cached_step
 
 console = Console()
 
 TEMP_FILE_TEMPLATE = f"{_AUDIO_TMP_DIR}/{{}}_temp.wav"
 OUTPUT_FILE_TEMPLATE = f"{_AUDIO_SEGS_DIR}/{{}}.wav"
 WARMUP_SIZE = 5
+STRETCH_WORKERS = 4
+# every setting that can change the generated voice
+TTS_CONFIG = ["tts_method", "edge_tts", "openai_tts", "azure_tts", "fish_tts", "sf_fish_tts", "sf_cosyvoice2", "gpt_sovits", "f5tts",
+              "speed_factor", "target_language", "whisper.language", "whisper.detected_language"]
 
 def parse_df_srt_time(time_str: str) -> float:
     """Convert SRT time format to seconds"""
@@ -27,91 +33,77 @@ def parse_df_srt_time(time_str: str) -> float:
     seconds, milliseconds = seconds.split('.')
     return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(milliseconds) / 1000
 
-def adjust_audio_speed(input_file: str, output_file: str, speed_factor: float) -> None:
-    """Adjust audio speed and handle edge cases"""
-    # If the speed factor is close to 1, directly copy the file
-    if abs(speed_factor - 1.0) < 0.001:
-        shutil.copy2(input_file, output_file)
-        return
-        
-    atempo = speed_factor
-    cmd = ['ffmpeg', '-i', input_file, '-filter:a', f'atempo={atempo}', '-y', output_file]
-    input_duration = get_audio_duration(input_file)
-    max_retries = 2
-    for attempt in range(max_retries):
-        try:
-            subprocess.run(cmd, check=True, stderr=subprocess.PIPE)
-            output_duration = get_audio_duration(output_file)
-            expected_duration = input_duration / speed_factor
-            diff = output_duration - expected_duration
-            # If the output duration exceeds the expected duration, but the input audio is less than 3 seconds, and the error is within 0.1 seconds, truncate to the expected length
-            if output_duration >= expected_duration * 1.02 and input_duration < 3 and diff <= 0.1:
-                audio = AudioSegment.from_wav(output_file)
-                trimmed_audio = audio[:(expected_duration * 1000)]  # pydub uses milliseconds
-                trimmed_audio.export(output_file, format="wav")
-                print(f"✂️ Trimmed to expected duration: {expected_duration:.2f} seconds")
-                return
-            elif output_duration >= expected_duration * 1.02:
-                raise Exception(f"Audio duration abnormal: input file={input_file}, output file={output_file}, speed factor={speed_factor}, input duration={input_duration:.2f}s, output duration={output_duration:.2f}s")
-            return
-        except subprocess.CalledProcessError as e:
-            if attempt < max_retries - 1:
-                rprint(f"[yellow]⚠️ Audio speed adjustment failed, retrying in 1s ({attempt + 1}/{max_retries})[/yellow]")
-                time.sleep(1)
-            else:
-                rprint(f"[red]❌ Audio speed adjustment failed, max retries reached ({max_retries})[/red]")
-                raise e
+def adjust_audio_speed(input_file: str, output_file: str, speed_factor: float) -> float:
+    """Adjust audio speed in process, returns the exact output duration"""
+    return stretch_file(input_file, output_file, speed_factor)
 
-def process_row(row: pd.Series, tasks_df: pd.DataFrame) -> Tuple[int, float]:
-    """Helper function for processing single row data"""
+async def process_row_async(row: pd.Series, tasks_df: pd.DataFrame) -> Tuple[int, float]:
+    """Synthesize the lines of one row in order, returns the row number and total duration"""
     number = row['number']
-    lines = eval(row['lines']) if isinstance(row['lines'], str) else row['lines']
-    real_dur = 0
+    lines = row['lines']
+    temp_files = []
     for line_index, line in enumerate(lines):
-        temp_file = TEMP_FILE_TEMPLATE.format(f"{number}_{line_index}")
-        tts_main(line, temp_file, number, tasks_df)
-        real_dur += get_audio_duration(temp_file)
-    return number, real_dur
+        temp_file = job_path(TEMP_FILE_TEMPLATE.format(f"{number}_{line_index}"))
+        await tts_main_async(line, temp_file, number, tasks_df)
+        temp_files.append(temp_file)
+    # tts_main already probed each file, these are memo hits
+    return number, sum(get_audio_duration(f) for f in temp_files)
+
+def process_row(row: pd.Series, tasks_df: pd.DataFrame) -> Tuple[int, float]:
+    """Helper function for processing single row data"""
+    return run_sync(process_row_async(row, tasks_df))
+
+async def process_rows_async(rows: List[pd.Series], tasks_df: pd.DataFrame, max_workers: int, on_done) -> None:
+    """All rows on one event loop; cloud backends are throttled per provider by the TTS client"""
+    limit = asyncio.Semaphore(max_workers)
+
+    async def run(row):
+        async with limit:
+            on_done(*await process_row_async(row, tasks_df))
+
+    tasks = [asyncio.ensure_future(run(row)) for row in rows]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
 
 def generate_tts_audio(tasks_df: pd.DataFrame) -> pd.DataFrame:
-    """Generate TTS audio sequentially and calculate actual duration"""
+    """Generate TTS audio and calculate actual duration"""
     tasks_df['real_dur'] = 0
     rprint("[bold green]🎯 Starting TTS audio generation...[/bold green]")
+    reset_tts_cache_stats()
     
     with Progress() as progress:
         task = progress.add_task("[cyan]🔄 Generating TTS audio...", total=len(tasks_df))
+
+        def on_done(number, real_dur):
+            tasks_df.loc[tasks_df['number'] == number, 'real_dur'] = real_dur
+            progress.advance(task)
         
         # warm up for first 5 rows
         warmup_size = min(WARMUP_SIZE, len(tasks_df))
         for _, row in tasks_df.head(warmup_size).iterrows():
             try:
-                number, real_dur = process_row(row, tasks_df)
-                tasks_df.loc[tasks_df['number'] == number, 'real_dur'] = real_dur
-                progress.advance(task)
+                on_done(*process_row(row, tasks_df))
             except Exception as e:
                 rprint(f"[red]❌ Error in warmup: {str(e)}[/red]")
                 raise e
         
-        # for gpt_sovits, do not use parallel to avoid mistakes
-        max_workers = load_key("max_workers") if load_key("tts_method") != "gpt_sovits" else 1
-        # parallel processing for remaining tasks
+        # HTTP backends are throttled per provider by the TTS client (gpt_sovits keeps its local server's queue short)
+        tts_method = load_key("tts_method")
+        max_workers = len(tasks_df) if tts_method in ASYNC_TTS_METHODS else load_key("max_workers")
+        # concurrent processing for remaining tasks
         if len(tasks_df) > warmup_size:
-            remaining_tasks = tasks_df.iloc[warmup_size:].copy()
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
-                    executor.submit(process_row, row, tasks_df.copy())
-                    for _, row in remaining_tasks.iterrows()
-                ]
-                
-                for future in as_completed(futures):
-                    try:
-                        number, real_dur = future.result()
-                        tasks_df.loc[tasks_df['number'] == number, 'real_dur'] = real_dur
-                        progress.advance(task)
-                    except Exception as e:
-                        rprint(f"[red]❌ Error: {str(e)}[/red]")
-                        raise e
+            remaining_rows = [row for _, row in tasks_df.iloc[warmup_size:].iterrows()]
+            try:
+                run_sync(process_rows_async(remaining_rows, tasks_df.copy(), max_workers, on_done))
+            except Exception as e:
+                rprint(f"[red]❌ Error: {str(e)}[/red]")
+                raise e
 
+    report_tts_cache_stats()
     rprint("[bold green]✨ TTS audio generation completed![/bold green]")
     return tasks_df
 
@@ -138,84 +130,110 @@ def process_chunk(chunk_df: pd.DataFrame, accept: float, min_speed: float) -> tu
         
     return round(speed_factor, 3), keep_gaps
 
+def find_chunks(tasks_df: pd.DataFrame) -> List[Tuple[int, int]]:
+    """(first, last) row index of every chunk, a chunk ends at a cut_off row"""
+    chunks, chunk_start = [], 0
+    for index, cut_off in enumerate(tasks_df['cut_off'].tolist()):
+        if cut_off == 1:
+            chunks.append((chunk_start, index))
+            chunk_start = index + 1
+    return chunks
+
+def stretch_chunks(tasks_df: pd.DataFrame, chunks: List[Tuple[int, int]], speed_factors: List[float]) -> List[List[float]]:
+    """Time-stretch every line of every chunk, chunks in parallel; returns the durations per chunk in line order"""
+    jobs = []
+    for (chunk_start, index), speed_factor in zip(chunks, speed_factors):
+        files = []
+        for _, row in tasks_df.iloc[chunk_start:index+1].iterrows():
+            for line_index in range(len(row['lines'])):
+                name = f"{row['number']}_{line_index}"
+                # resolved here, the stretch threads do not run in the caller's job
+                files.append((job_path(TEMP_FILE_TEMPLATE.format(name)), job_path(OUTPUT_FILE_TEMPLATE.format(name))))
+        jobs.append((files, speed_factor))
+
+    workers = min(len(jobs), STRETCH_WORKERS, os.cpu_count() or 1)
+    if workers <= 1:
+        return [stretch_files(files, speed_factor) for files, speed_factor in jobs]
+    # threads, not processes: a stretch takes milliseconds, a spawned worker would import the whole core package first
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(stretch_files, files, speed_factor) for files, speed_factor in jobs]
+        return [future.result() for future in futures]
+
+def trim_audio(audio_file: str, time_diff: float) -> None:
+    """Cut time_diff seconds off the end of a wav"""
+    audio, sample_rate = sf.read(audio_file, dtype='float32', always_2d=True)
+    keep = max(len(audio) - int(round(time_diff * sample_rate)), 0)
+    sf.write(audio_file, audio[:keep], sample_rate, subtype='PCM_16')
+
 def merge_chunks(tasks_df: pd.DataFrame) -> pd.DataFrame:
     """Merge audio chunks and adjust timeline"""
     rprint("[bold blue]🔄 Starting audio chunks processing...[/bold blue]")
     accept = load_key("speed_factor.accept")
     min_speed = load_key("speed_factor.min")
-    chunk_start = 0
     
     tasks_df['new_sub_times'] = None
+
+    # 🎯 Step1: Speed factor of every chunk, then stretch all of them at once
+    chunks = find_chunks(tasks_df)
+    plans = [process_chunk(tasks_df.iloc[chunk_start:index+1].reset_index(drop=True), accept, min_speed) for chunk_start, index in chunks]
+    chunk_durations = stretch_chunks(tasks_df, chunks, [speed_factor for speed_factor, _ in plans])
     
-    for index, row in tasks_df.iterrows():
-        if row['cut_off'] == 1:
-            chunk_df = tasks_df.iloc[chunk_start:index+1].reset_index(drop=True)
-            speed_factor, keep_gaps = process_chunk(chunk_df, accept, min_speed)
-            
-            # 🎯 Step1: Start processing new timeline
-            chunk_start_time = parse_df_srt_time(chunk_df.iloc[0]['start_time'])
-            chunk_end_time = parse_df_srt_time(chunk_df.iloc[-1]['end_time']) + chunk_df.iloc[-1]['tolerance'] # 加上tolerance才是这一块的结束
-            cur_time = chunk_start_time
-            for i, row in chunk_df.iterrows():
-                # If i is not 0, which is not the first row of the chunk, cur_time needs to be added with the gap of the previous row, remember to divide by speed_factor
-                if i != 0 and keep_gaps:
-                    cur_time += chunk_df.iloc[i-1]['gap']/speed_factor
-                new_sub_times = []
-                number = row['number']
-                lines = eval(row['lines']) if isinstance(row['lines'], str) else row['lines']
-                for line_index, line in enumerate(lines):
-                    # 🔄 Step2: Start speed change and save as OUTPUT_FILE_TEMPLATE
-                    temp_file = TEMP_FILE_TEMPLATE.format(f"{number}_{line_index}")
-                    output_file = OUTPUT_FILE_TEMPLATE.format(f"{number}_{line_index}")
-                    adjust_audio_speed(temp_file, output_file, speed_factor)
-                    ad_dur = get_audio_duration(output_file)
-                    new_sub_times.append([cur_time, cur_time+ad_dur])
-                    cur_time += ad_dur
-                # 🔄 Step3: Find corresponding main DataFrame index and update new_sub_times
-                main_df_idx = tasks_df[tasks_df['number'] == row['number']].index[0]
-                tasks_df.at[main_df_idx, 'new_sub_times'] = new_sub_times
-                # 🎯 Step4: Choose emoji based on speed_factor and accept comparison
-                emoji = "⚡" if speed_factor <= accept else "⚠️"
-                rprint(f"[cyan]{emoji} Processed chunk {chunk_start} to {index} with speed factor {speed_factor}[/cyan]")
-            # 🔄 Step5: Check if the last row exceeds the range
-            if cur_time > chunk_end_time:
-                time_diff = cur_time - chunk_end_time
-                if time_diff <= 0.6:  # If exceeding time is within 0.6 seconds, truncate the last audio
-                    rprint(f"[yellow]⚠️ Chunk {chunk_start} to {index} exceeds by {time_diff:.3f}s, truncating last audio[/yellow]")
-                    # Get the last audio file
-                    last_number = tasks_df.iloc[index]['number']
-                    last_lines = eval(tasks_df.iloc[index]['lines']) if isinstance(tasks_df.iloc[index]['lines'], str) else tasks_df.iloc[index]['lines']
-                    last_line_index = len(last_lines) - 1
-                    last_file = OUTPUT_FILE_TEMPLATE.format(f"{last_number}_{last_line_index}")
-                    
-                    # Calculate the duration to keep
-                    audio = AudioSegment.from_wav(last_file)
-                    original_duration = len(audio) / 1000  # Convert to seconds
-                    new_duration = original_duration - time_diff
-                    trimmed_audio = audio[:(new_duration * 1000)]  # pydub uses milliseconds
-                    trimmed_audio.export(last_file, format="wav")
-                    
-                    # Update the last timestamp
-                    last_times = tasks_df.at[index, 'new_sub_times']
-                    last_times[-1][1] = chunk_end_time
-                    tasks_df.at[index, 'new_sub_times'] = last_times
-                else:
-                    raise Exception(f"Chunk {chunk_start} to {index} exceeds the chunk end time {chunk_end_time:.2f} seconds with current time {cur_time:.2f} seconds")
-            chunk_start = index+1
+    for (chunk_start, index), (speed_factor, keep_gaps), durations in zip(chunks, plans, chunk_durations):
+        chunk_df = tasks_df.iloc[chunk_start:index+1].reset_index(drop=True)
+        durations = iter(durations)
+        
+        # 🔄 Step2: Lay the stretched lines out on the new timeline
+        chunk_start_time = parse_df_srt_time(chunk_df.iloc[0]['start_time'])
+        chunk_end_time = parse_df_srt_time(chunk_df.iloc[-1]['end_time']) + chunk_df.iloc[-1]['tolerance'] # 加上tolerance才是这一块的结束
+        cur_time = chunk_start_time
+        for i, row in chunk_df.iterrows():
+            # If i is not 0, which is not the first row of the chunk, cur_time needs to be added with the gap of the previous row, remember to divide by speed_factor
+            if i != 0 and keep_gaps:
+                cur_time += chunk_df.iloc[i-1]['gap']/speed_factor
+            new_sub_times = []
+            for _ in row['lines']:
+                ad_dur = next(durations)
+                new_sub_times.append([cur_time, cur_time+ad_dur])
+                cur_time += ad_dur
+            # 🔄 Step3: Update new_sub_times in the main DataFrame
+            tasks_df.at[tasks_df.index[chunk_start + i], 'new_sub_times'] = new_sub_times
+        # 🎯 Step4: Choose emoji based on speed_factor and accept comparison
+        emoji = "⚡" if speed_factor <= accept else "⚠️"
+        rprint(f"[cyan]{emoji} Processed chunk {chunk_start} to {index} with speed factor {speed_factor}[/cyan]")
+        # 🔄 Step5: Check if the last row exceeds the range
+        if cur_time > chunk_end_time:
+            time_diff = cur_time - chunk_end_time
+            if time_diff <= 0.6:  # If exceeding time is within 0.6 seconds, truncate the last audio
+                rprint(f"[yellow]⚠️ Chunk {chunk_start} to {index} exceeds by {time_diff:.3f}s, truncating last audio[/yellow]")
+                last_number = tasks_df.iloc[index]['number']
+                last_line_index = len(tasks_df.iloc[index]['lines']) - 1
+                trim_audio(job_path(OUTPUT_FILE_TEMPLATE.format(f"{last_number}_{last_line_index}")), time_diff)
+                
+                # Update the last timestamp
+                last_times = tasks_df.at[index, 'new_sub_times']
+                last_times[-1][1] = chunk_end_time
+                tasks_df.at[index, 'new_sub_times'] = last_times
+            else:
+                raise Exception(f"Chunk {chunk_start} to {index} exceeds the chunk end time {chunk_end_time:.2f} seconds with current time {cur_time:.2f} seconds")
     
     rprint("[bold green]✅ Audio chunks processing completed![/bold green]")
     return tasks_df
 
+@cached_step(
+    inputs=[_8_1_AUDIO_TASK, _AUDIO_REFERS_DIR],
+    config=TTS_CONFIG,
+    outputs=[_8_1_AUDIO_TASK, _AUDIO_SEGS_DIR],
+)
 def gen_audio() -> None:
     """Main function: Generate audio and process timeline"""
     rprint("[bold magenta]🚀 Starting audio generation process...[/bold magenta]")
     
     # 🎯 Step1: Create necessary directories
-    os.makedirs(_AUDIO_TMP_DIR, exist_ok=True)
-    os.makedirs(_AUDIO_SEGS_DIR, exist_ok=True)
+    os.makedirs(job_path(_AUDIO_TMP_DIR), exist_ok=True)
+    os.makedirs(job_path(_AUDIO_SEGS_DIR), exist_ok=True)
     
     # 📝 Step2: Load task file
-    tasks_df = pd.read_excel(_8_1_AUDIO_TASK)
+    tasks_df = load_table(_8_1_AUDIO_TASK)
     rprint("[green]📊 Loaded task file successfully[/green]")
     
     # 🔊 Step3: Generate TTS audio
@@ -225,7 +243,7 @@ def gen_audio() -> None:
     tasks_df = merge_chunks(tasks_df)
     
     # 💾 Step5: Save results
-    tasks_df.to_excel(_8_1_AUDIO_TASK, index=False)
+    save_table(tasks_df, _8_1_AUDIO_TASK)
     rprint("[bold green]🎉 Audio generation completed successfully![/bold green]")
 
 if __name__ == "__main__":
@@ -1,11 +1,14 @@
 import os
-import pandas as pd
 import subprocess
-from pydub import AudioSegment
+from math import gcd
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.console import Console
 from core.utils import *
 from core.utils.models import *
+from core.utils.step_cache import cached_step
 console = Console()
 
 DUB_VOCAL_FILE = 'output/dub.mp3'
@@ -13,14 +16,11 @@ DUB_VOCAL_FILE = 'output/dub.mp3'
 DUB_SUB_FILE = 'output/dub.srt'
 OUTPUT_FILE_TEMPLATE = f"{_AUDIO_SEGS_DIR}/{{}}.wav"
 
-def load_and_flatten_data(excel_file):
-    """Load and flatten Excel data"""
-    df = pd.read_excel(excel_file)
-    lines = [eval(line) if isinstance(line, str) else line for line in df['lines'].tolist()]
-    lines = [item for sublist in lines for item in sublist]
-    
-    new_sub_times = [eval(time) if isinstance(time, str) else time for time in df['new_sub_times'].tolist()]
-    new_sub_times = [item for sublist in new_sub_times for item in sublist]
+def load_and_flatten_data(table_file):
+    """Load and flatten the task table"""
+    df = load_table(table_file)
+    lines = [item for sublist in df['lines'].tolist() for item in sublist]
+    new_sub_times = [item for sublist in df['new_sub_times'].tolist() for item in sublist]
     
     return df, lines, new_sub_times
 
@@ -29,63 +29,76 @@ def get_audio_files(df):
     audios = []
     for index, row in df.iterrows():
         number = row['number']
-        line_count = len(eval(row['lines']) if isinstance(row['lines'], str) else row['lines'])
+        line_count = len(row['lines'])
         for line_index in range(line_count):
-            temp_file = OUTPUT_FILE_TEMPLATE.format(f"{number}_{line_index}")
+            temp_file = job_path(OUTPUT_FILE_TEMPLATE.format(f"{number}_{line_index}"))
             audios.append(temp_file)
     return audios
 
-def process_audio_segment(audio_file):
-    """Process a single audio segment with MP3 compression"""
-    temp_file = f"{audio_file}_temp.mp3"
-    ffmpeg_cmd = [
-        'ffmpeg', '-y',
-        '-i', audio_file,
-        '-ar', '16000',
-        '-ac', '1',
-        '-b:a', '64k',
-        temp_file
-    ]
-    subprocess.run(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    audio_segment = AudioSegment.from_mp3(temp_file)
-    os.remove(temp_file)
-    return audio_segment
+# ------------
+# timeline mixer
+# ------------
+# Segments are read straight from their wav files, resampled once in memory and
+# written into one preallocated int16 buffer at their new_sub_times offsets.
+# The buffer is encoded by a single ffmpeg call at the end, so the cost stays
+# linear in the output length however many segments there are.
+# ------------
+
+def resampled_length(frames, orig_sr, sample_rate):
+    """Sample count resample_poly returns for `frames` samples at orig_sr"""
+    if orig_sr == sample_rate:
+        return frames
+    g = gcd(orig_sr, sample_rate)
+    up, down = sample_rate // g, orig_sr // g
+    return -(-frames * up // down)
+
+def read_segment(audio_file, sample_rate):
+    """Mono int16 samples of a segment at sample_rate"""
+    data, orig_sr = sf.read(audio_file, dtype='float32', always_2d=True)
+    data = data.mean(axis=1)
+    if orig_sr != sample_rate:
+        g = gcd(orig_sr, sample_rate)
+        data = resample_poly(data, sample_rate // g, orig_sr // g)
+    return (np.clip(data, -1, 1) * 32767).astype(np.int16)
+
+def plan_timeline(audios, new_sub_times, sample_rate):
+    """(file, offset) of every existing segment plus the total length in samples, from the wav headers only"""
+    placements, cursor = [], 0
+    for audio_file, (start_time, _) in zip(audios, new_sub_times):
+        if not os.path.exists(audio_file):
+            console.print(f"[bold yellow]⚠️  Warning: File {audio_file} does not exist, skipping...[/bold yellow]")
+            continue
+        info = sf.info(audio_file)
+        # a segment that overruns its slot pushes the next one back instead of overlapping it
+        offset = max(int(round(start_time * sample_rate)), cursor)
+        cursor = offset + resampled_length(info.frames, info.samplerate, sample_rate)
+        placements.append((audio_file, offset))
+    return placements, cursor
 
 def merge_audio_segments(audios, new_sub_times, sample_rate):
-    merged_audio = AudioSegment.silent(duration=0, frame_rate=sample_rate)
-    
+    placements, total = plan_timeline(audios, new_sub_times, sample_rate)
+    timeline = np.zeros(total, dtype=np.int16)
+
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(), TaskProgressColumn()) as progress:
-        merge_task = progress.add_task("🎵 Merging audio segments...", total=len(audios))
-        
-        for i, (audio_file, time_range) in enumerate(zip(audios, new_sub_times)):
-            if not os.path.exists(audio_file):
-                console.print(f"[bold yellow]⚠️  Warning: File {audio_file} does not exist, skipping...[/bold yellow]")
-                progress.advance(merge_task)
-                continue
-                
-            audio_segment = process_audio_segment(audio_file)
-            start_time, end_time = time_range
-            
-            # Add silence segment
-            if i > 0:
-                prev_end = new_sub_times[i-1][1]
-                silence_duration = start_time - prev_end
-                if silence_duration > 0:
-                    silence = AudioSegment.silent(duration=int(silence_duration * 1000), frame_rate=sample_rate)
-                    merged_audio += silence
-            elif start_time > 0:
-                silence = AudioSegment.silent(duration=int(start_time * 1000), frame_rate=sample_rate)
-                merged_audio += silence
-                
-            merged_audio += audio_segment
+        merge_task = progress.add_task("🎵 Merging audio segments...", total=len(placements))
+        for audio_file, offset in placements:
+            samples = read_segment(audio_file, sample_rate)[:total - offset]
+            timeline[offset:offset + len(samples)] = samples
             progress.advance(merge_task)
-    
-    return merged_audio
+
+    return timeline
+
+def export_timeline(timeline, sample_rate, output_file):
+    subprocess.run([
+        'ffmpeg', '-y',
+        '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+        '-b:a', '64k', output_file
+    ], input=timeline.tobytes(), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
 def create_srt_subtitle():
     df, lines, new_sub_times = load_and_flatten_data(_8_1_AUDIO_TASK)
     
-    with open(DUB_SUB_FILE, 'w', encoding='utf-8') as f:
+    with open(job_path(DUB_SUB_FILE), 'w', encoding='utf-8') as f:
         for i, ((start_time, end_time), line) in enumerate(zip(new_sub_times, lines), 1):
             start_str = f"{int(start_time//3600):02d}:{int((start_time%3600)//60):02d}:{int(start_time%60):02d},{int((start_time*1000)%1000):03d}"
             end_str = f"{int(end_time//3600):02d}:{int((end_time%3600)//60):02d}:{int(end_time%60):02d},{int((end_time*1000)%1000):03d}"
@@ -96,6 +109,10 @@ def create_srt_subtitle():
     
     rprint(f"[bold green]✅ Subtitle file created: {DUB_SUB_FILE}[/bold green]")
 
+@cached_step(
+    inputs=[_8_1_AUDIO_TASK, _AUDIO_SEGS_DIR],
+    outputs=[DUB_VOCAL_FILE, DUB_SUB_FILE],
+)
 def merge_full_audio():
     """Main function: Process the complete audio merging process"""
     console.print("\n[bold cyan]🎬 Starting audio merging process...[/bold cyan]")
@@ -113,17 +130,16 @@ def merge_full_audio():
     
     if not os.path.exists(audios[0]):
         console.print(f"[bold red]❌ Error: First audio file {audios[0]} does not exist![/bold red]")
-        return
+        raise FileNotFoundError(f"First audio file {audios[0]} does not exist")
     
     sample_rate = 16000
     console.print(f"[bold green]✅ Sample rate: {sample_rate}Hz[/bold green]")
 
     console.print("[bold cyan]🔄 Starting audio merge process...[/bold cyan]")
-    merged_audio = merge_audio_segments(audios, new_sub_times, sample_rate)
+    timeline = merge_audio_segments(audios, new_sub_times, sample_rate)
     
     with console.status("[bold cyan]💾 Exporting final audio file...[/bold cyan]"):
-        merged_audio = merged_audio.set_frame_rate(16000).set_channels(1)
-        merged_audio.export(DUB_VOCAL_FILE, format="mp3", parameters=["-b:a", "64k"])
+        export_timeline(timeline, sample_rate, job_path(DUB_VOCAL_FILE))
     console.print(f"[bold green]✅ Audio file successfully merged![/bold green]")
     console.print(f"[bold green]📁 Output file: {DUB_VOCAL_FILE}[/bold green]")
 
@@ -1,10 +1,16 @@
 from core.utils import *
 from core.asr_backend.demucs_vl import demucs_audio
-from core.asr_backend.audio_preprocess import process_transcription, convert_video_to_audio, split_audio, save_results, normalize_audio_volume
+from core.asr_backend.audio_preprocess import process_transcription, convert_video_to_audio, split_audio, save_results, normalize_audio_volume, transcribe_concurrently
 from core._1_ytdlp import find_video_files
 from core.utils.models import *
+from core.utils.step_cache import cached_step
 
-@check_file_exists(_2_CLEANED_CHUNKS)
+@cached_step(
+    inputs=[find_video_files],
+    config=["whisper.runtime", "whisper.model", "whisper.language", "demucs"],
+    outputs=[_2_CLEANED_CHUNKS, _RAW_AUDIO_FILE, _VOCAL_AUDIO_FILE, _BACKGROUND_AUDIO_FILE],
+    adopt_existing=True,
+)
 def transcribe():
     # 1. video to audio
     video_file = find_video_files()
@@ -21,21 +27,19 @@ def transcribe():
     segments = split_audio(_RAW_AUDIO_FILE)
     
     # 4. Transcribe audio by clips
-    all_results = []
     runtime = load_key("whisper.runtime")
     if runtime == "local":
-        from core.asr_backend.whisperX_local import transcribe_audio as ts
+        from core.asr_backend.whisperX_local import transcribe_segments
         rprint("[cyan]🎤 Transcribing audio with local model...[/cyan]")
+        all_results = transcribe_segments(_RAW_AUDIO_FILE, vocal_audio, segments)
     elif runtime == "cloud":
         from core.asr_backend.whisperX_302 import transcribe_audio_302 as ts
         rprint("[cyan]🎤 Transcribing audio with 302 API...[/cyan]")
+        all_results = transcribe_concurrently(ts, _RAW_AUDIO_FILE, vocal_audio, segments)
     elif runtime == "elevenlabs":
         from core.asr_backend.elevenlabs_asr import transcribe_audio_elevenlabs as ts
         rprint("[cyan]🎤 Transcribing audio with ElevenLabs API...[/cyan]")
-
-    for start, end in segments:
-        result = ts(_RAW_AUDIO_FILE, vocal_audio, start, end)
-        all_results.append(result)
+        all_results = transcribe_concurrently(ts, _RAW_AUDIO_FILE, vocal_audio, segments)
     
     # 5. Combine results
     combined_result = {'segments': []}
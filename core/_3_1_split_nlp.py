@@ -1,15 +1,22 @@
 from core.spacy_utils import *
-from core.utils.models import _3_1_SPLIT_BY_NLP
-from core.utils import check_file_exists
+from core.utils.models import _2_CLEANED_CHUNKS, _3_1_SPLIT_BY_NLP
+from core.utils.step_cache import cached_step
 
-@check_file_exists(_3_1_SPLIT_BY_NLP)
+@cached_step(
+    inputs=[_2_CLEANED_CHUNKS],
+    config=["whisper.language", "whisper.detected_language", "spacy_model_map"],
+    outputs=[_3_1_SPLIT_BY_NLP],
+    adopt_existing=True,
+)
 def split_by_spacy():
     nlp = init_nlp()
-    split_by_mark(nlp)
-    split_by_comma_main(nlp)
-    split_sentences_main(nlp)
-    split_long_by_root_main(nlp)
+    # one parse of the transcript, every pass below splits spans of the same Doc
+    doc = parse_transcript(nlp)
+    sentences = split_by_mark(doc)
+    sentences = split_by_comma_main(sentences)
+    sentences = split_sentences_main(sentences)
+    split_long_by_root_main(sentences)
     return
 
 if __name__ == '__main__':
-    split_by_spacy()
\ No newline at end of file
+    split_by_spacy()
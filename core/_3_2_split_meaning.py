@@ -1,16 +1,23 @@
-import concurrent.futures
 from difflib import SequenceMatcher
 import math
+from threading import Lock
 from core.prompts import get_split_prompt
 from core.spacy_utils.load_nlp_model import init_nlp
 from core.utils import *
+from core.utils.llm_dispatcher import get_llm_dispatcher, PRIORITY_SPLIT
+from core.utils.step_cache import cached_step, PROMPTS_FILE, LLM_CONFIG
 from rich.console import Console
 from rich.table import Table
 from core.utils.models import _3_1_SPLIT_BY_NLP, _3_2_SPLIT_BY_MEANING
 console = Console()
 
+SPLIT_ATTEMPTS = 3
+NLP_LOCK = Lock()
+
 def tokenize_sentence(sentence, nlp):
-    doc = nlp(sentence)
+    # spaCy pipelines are not guaranteed thread-safe, tokenization may run from worker threads
+    with NLP_LOCK:
+        doc = nlp(sentence)
     return [token.text for token in doc]
 
 def find_split_positions(original, modified):
@@ -80,47 +87,65 @@ def split_sentence(sentence, num_parts, word_limit=20, index=-1, retry_attempt=0
     
     return best_split
 
-def parallel_split_sentences(sentences, max_length, max_workers, nlp, retry_attempt=0):
-    """Split sentences in parallel using a thread pool."""
+def parallel_split_sentences(sentences, max_length, nlp, retry_attempt=0):
+    """Split sentences in parallel on the shared LLM dispatcher."""
     new_sentences = [None] * len(sentences)
     futures = []
+    dispatcher = get_llm_dispatcher()
+
+    for index, sentence in enumerate(sentences):
+        # Use tokenizer to split the sentence
+        tokens = tokenize_sentence(sentence, nlp)
+        # print("Tokenization result:", tokens)
+        num_parts = math.ceil(len(tokens) / max_length)
+        if len(tokens) > max_length:
+            future = dispatcher.submit(split_sentence, sentence, num_parts, max_length, index=index, retry_attempt=retry_attempt, priority=PRIORITY_SPLIT)
+            futures.append((future, index, num_parts, sentence))
+        else:
+            new_sentences[index] = [sentence]
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for index, sentence in enumerate(sentences):
-            # Use tokenizer to split the sentence
-            tokens = tokenize_sentence(sentence, nlp)
-            # print("Tokenization result:", tokens)
-            num_parts = math.ceil(len(tokens) / max_length)
-            if len(tokens) > max_length:
-                future = executor.submit(split_sentence, sentence, num_parts, max_length, index=index, retry_attempt=retry_attempt)
-                futures.append((future, index, num_parts, sentence))
-            else:
-                new_sentences[index] = [sentence]
-
-        for future, index, num_parts, sentence in futures:
-            split_result = future.result()
-            if split_result:
-                split_lines = split_result.strip().split('\n')
-                new_sentences[index] = [line.strip() for line in split_lines]
-            else:
-                new_sentences[index] = [sentence]
+    for future, index, num_parts, sentence in futures:
+        split_result = future.result()
+        if split_result:
+            split_lines = split_result.strip().split('\n')
+            new_sentences[index] = [line.strip() for line in split_lines]
+        else:
+            new_sentences[index] = [sentence]
 
     return [sentence for sublist in new_sentences for sentence in sublist]
 
-@check_file_exists(_3_2_SPLIT_BY_MEANING)
+def split_sentence_fully(sentence, max_length, nlp, retry_attempt=0, index=-1):
+    """Split one sentence until every part fits, same prompts as the passes of `split_sentences_by_meaning`."""
+    if retry_attempt >= SPLIT_ATTEMPTS:
+        return [sentence]
+    tokens = tokenize_sentence(sentence, nlp)
+    if len(tokens) <= max_length:
+        return [sentence]
+    split_result = split_sentence(sentence, math.ceil(len(tokens) / max_length), max_length, index=index, retry_attempt=retry_attempt)
+    if not split_result:
+        return [sentence]
+    lines = [line.strip() for line in split_result.strip().split('\n')]
+    return [part for line in lines for part in split_sentence_fully(line, max_length, nlp, retry_attempt + 1, index)]
+
+@cached_step(
+    inputs=[_3_1_SPLIT_BY_NLP, PROMPTS_FILE],
+    config=[*LLM_CONFIG, "max_split_length"],
+    outputs=[_3_2_SPLIT_BY_MEANING],
+    adopt_existing=True,
+)
 def split_sentences_by_meaning():
     """The main function to split sentences by meaning."""
     # read input sentences
-    with open(_3_1_SPLIT_BY_NLP, 'r', encoding='utf-8') as f:
+    with open(job_path(_3_1_SPLIT_BY_NLP), 'r', encoding='utf-8') as f:
         sentences = [line.strip() for line in f.readlines()]
 
     nlp = init_nlp()
     # 🔄 process sentences multiple times to ensure all are split
-    for retry_attempt in range(3):
-        sentences = parallel_split_sentences(sentences, max_length=load_key("max_split_length"), max_workers=load_key("max_workers"), nlp=nlp, retry_attempt=retry_attempt)
+    for retry_attempt in range(SPLIT_ATTEMPTS):
+        sentences = parallel_split_sentences(sentences, max_length=load_key("max_split_length"), nlp=nlp, retry_attempt=retry_attempt)
 
     # 💾 save results
-    with open(_3_2_SPLIT_BY_MEANING, 'w', encoding='utf-8') as f:
+    with open(job_path(_3_2_SPLIT_BY_MEANING), 'w', encoding='utf-8') as f:
         f.write('\n'.join(sentences))
     console.print('[green]✅ All sentences have been successfully split![/green]')
 
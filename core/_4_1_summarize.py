@@ -2,13 +2,15 @@ import json
 from core.prompts import get_summary_prompt
 import pandas as pd
 from core.utils import *
+from core.utils.llm_dispatcher import llm_priority, PRIORITY_SUMMARY
+from core.utils.step_cache import cached_step, PROMPTS_FILE, LLM_CONFIG
 from core.utils.models import _3_2_SPLIT_BY_MEANING, _4_1_TERMINOLOGY
 
 CUSTOM_TERMS_PATH = 'custom_terms.xlsx'
 
-def combine_chunks():
+def combine_chunks(source_file=_3_2_SPLIT_BY_MEANING):
     """Combine the text chunks identified by whisper into a single long text"""
-    with open(_3_2_SPLIT_BY_MEANING, 'r', encoding='utf-8') as file:
+    with open(job_path(source_file), 'r', encoding='utf-8') as file:
         sentences = file.readlines()
     cleaned_sentences = [line.strip() for line in sentences]
     combined_text = ' '.join(cleaned_sentences)
@@ -16,7 +18,7 @@ def combine_chunks():
 
 def search_things_to_note_in_prompt(sentence):
     """Search for terms to note in the given sentence"""
-    with open(_4_1_TERMINOLOGY, 'r', encoding='utf-8') as file:
+    with open(job_path(_4_1_TERMINOLOGY), 'r', encoding='utf-8') as file:
         things_to_note = json.load(file)
     things_to_note_list = [term['src'] for term in things_to_note['terms'] if term['src'].lower() in sentence.lower()]
     if things_to_note_list:
@@ -30,8 +32,8 @@ def search_things_to_note_in_prompt(sentence):
     else:
         return None
 
-def get_summary():
-    src_content = combine_chunks()
+def summarize(source_file):
+    src_content = combine_chunks(source_file)
     custom_terms = pd.read_excel(CUSTOM_TERMS_PATH)
     custom_terms_json = {
         "terms": 
@@ -59,13 +61,22 @@ def get_summary():
                 return {"status": "error", "message": "Invalid response format"}   
         return {"status": "success", "message": "Summary completed"}
 
-    summary = ask_gpt(summary_prompt, resp_type='json', valid_def=valid_summary, log_title='summary')
+    with llm_priority(PRIORITY_SUMMARY):
+        summary = ask_gpt(summary_prompt, resp_type='json', valid_def=valid_summary, log_title='summary')
     summary['terms'].extend(custom_terms_json['terms'])
     
-    with open(_4_1_TERMINOLOGY, 'w', encoding='utf-8') as f:
+    with open(job_path(_4_1_TERMINOLOGY), 'w', encoding='utf-8') as f:
         json.dump(summary, f, ensure_ascii=False, indent=4)
 
     rprint(f'💾 Summary log saved to → `{_4_1_TERMINOLOGY}`')
 
+@cached_step(
+    inputs=[_3_2_SPLIT_BY_MEANING, CUSTOM_TERMS_PATH, PROMPTS_FILE],
+    config=[*LLM_CONFIG, "summary_length"],
+    outputs=[_4_1_TERMINOLOGY],
+)
+def get_summary():
+    summarize(_3_2_SPLIT_BY_MEANING)
+
 if __name__ == '__main__':
     get_summary()
\ No newline at end of file
@@ -2,34 +2,54 @@ import pandas as pd
 import json
 import concurrent.futures
 from core.translate_lines import translate_lines
-from core._4_1_summarize import search_things_to_note_in_prompt
+from core._3_2_split_meaning import tokenize_sentence, split_sentence_fully, split_sentences_by_meaning
+from core._4_1_summarize import search_things_to_note_in_prompt, get_summary, summarize, CUSTOM_TERMS_PATH
+from core.spacy_utils.load_nlp_model import init_nlp
 from core._8_1_audio_task import check_len_then_trim
 from core._6_gen_sub import align_timestamp
 from core.utils import *
+from core.utils.llm_dispatcher import get_llm_dispatcher, PRIORITY_SUMMARY, PRIORITY_SPLIT, PRIORITY_TRANSLATE
+from core.utils.step_cache import cached_step, is_step_current, record_step, PROMPTS_FILE, LLM_CONFIG
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from difflib import SequenceMatcher
 from core.utils.models import *
 console = Console()
 
+CHUNK_SIZE = 600
+CHUNK_MAX_LINES = 10
+
+class ChunkBuilder:
+    """Incremental chunker: feed sentences in order, get each chunk as soon as it is closed"""
+    def __init__(self, chunk_size, max_i):
+        self.chunk_size = chunk_size
+        self.max_i = max_i
+        self.chunk = ''
+        self.sentence_count = 0
+
+    def add(self, sentence):
+        closed = None
+        if len(self.chunk) + len(sentence + '\n') > self.chunk_size or self.sentence_count == self.max_i:
+            closed = self.chunk.strip()
+            self.chunk = sentence + '\n'
+            self.sentence_count = 1
+        else:
+            self.chunk += sentence + '\n'
+            self.sentence_count += 1
+        return closed
+
+    def finish(self):
+        return self.chunk.strip()
+
 # Function to split text into chunks
 def split_chunks_by_chars(chunk_size, max_i): 
     """Split text into chunks based on character count, return a list of multi-line text chunks"""
-    with open(_3_2_SPLIT_BY_MEANING, "r", encoding="utf-8") as file:
+    with open(job_path(_3_2_SPLIT_BY_MEANING), "r", encoding="utf-8") as file:
         sentences = file.read().strip().split('\n')
 
-    chunks = []
-    chunk = ''
-    sentence_count = 0
-    for sentence in sentences:
-        if len(chunk) + len(sentence + '\n') > chunk_size or sentence_count == max_i:
-            chunks.append(chunk.strip())
-            chunk = sentence + '\n'
-            sentence_count = 1
-        else:
-            chunk += sentence + '\n'
-            sentence_count += 1
-    chunks.append(chunk.strip())
+    builder = ChunkBuilder(chunk_size, max_i)
+    chunks = [chunk for chunk in map(builder.add, sentences) if chunk is not None]
+    chunks.append(builder.finish())
     return chunks
 
 # Get context from surrounding chunks
@@ -50,27 +70,37 @@ def translate_chunk(chunk, chunks, theme_prompt, i):
 def similar(a, b):
     return SequenceMatcher(None, a, b).ratio()
 
+TRANSLATE_CONFIG = [*LLM_CONFIG, "reflect_translate", "min_trim_duration", "speed_factor"]
+
 # 🚀 Main function to translate all chunks
-@check_file_exists(_4_2_TRANSLATION)
+@cached_step(
+    inputs=[_3_2_SPLIT_BY_MEANING, _4_1_TERMINOLOGY, _2_CLEANED_CHUNKS, PROMPTS_FILE],
+    config=TRANSLATE_CONFIG,
+    outputs=[_4_2_TRANSLATION],
+    adopt_existing=True,
+)
 def translate_all():
     console.print("[bold green]Start Translating All...[/bold green]")
-    chunks = split_chunks_by_chars(chunk_size=600, max_i=10)
-    with open(_4_1_TERMINOLOGY, 'r', encoding='utf-8') as file:
+    chunks = split_chunks_by_chars(chunk_size=CHUNK_SIZE, max_i=CHUNK_MAX_LINES)
+    with open(job_path(_4_1_TERMINOLOGY), 'r', encoding='utf-8') as file:
         theme_prompt = json.load(file).get('theme')
 
     # 🔄 Use concurrent execution for translation
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), transient=True) as progress:
         task = progress.add_task("[cyan]Translating chunks...", total=len(chunks))
-        with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
-            futures = []
-            for i, chunk in enumerate(chunks):
-                future = executor.submit(translate_chunk, chunk, chunks, theme_prompt, i)
-                futures.append(future)
-            results = []
-            for future in concurrent.futures.as_completed(futures):
-                results.append(future.result())
-                progress.update(task, advance=1)
+        dispatcher = get_llm_dispatcher()
+        futures = []
+        for i, chunk in enumerate(chunks):
+            future = dispatcher.submit(translate_chunk, chunk, chunks, theme_prompt, i, priority=PRIORITY_TRANSLATE)
+            futures.append(future)
+        results = []
+        for future in concurrent.futures.as_completed(futures):
+            results.append(future.result())
+            progress.update(task, advance=1)
 
+    save_translation_results(chunks, results)
+
+def save_translation_results(chunks, results):
     results.sort(key=lambda x: x[0])  # Sort results based on original order
     
     # 💾 Save results to lists and Excel file
@@ -95,7 +125,7 @@ def translate_all():
         trans_text.extend(best_match[0][2].split('\n'))
     
     # Trim long translation text
-    df_text = pd.read_excel(_2_CLEANED_CHUNKS)
+    df_text = load_table(_2_CLEANED_CHUNKS)
     df_text['text'] = df_text['text'].str.strip('"').str.strip()
     df_translate = pd.DataFrame({'Source': src_text, 'Translation': trans_text})
     subtitle_output_configs = [('trans_subs_for_audio.srt', ['Translation'])]
@@ -105,8 +135,95 @@ def translate_all():
     df_time['Translation'] = df_time.apply(lambda x: check_len_then_trim(x['Translation'], x['duration']) if x['duration'] > load_key("min_trim_duration") else x['Translation'], axis=1)
     console.print(df_time)
     
-    df_time.to_excel(_4_2_TRANSLATION, index=False)
+    save_table(df_time, _4_2_TRANSLATION)
     console.print("[bold green]✅ Translation completed and results saved.[/bold green]")
 
+# ------------
+# pipelined split -> summarize -> translate
+# ------------
+# Sentences are split by meaning independently, the summary runs on the NLP
+# split text at the same time, and a chunk is sent to translation as soon as
+# its next chunk is known (it is needed as context). LLM latency of the three
+# stages overlaps instead of adding up.
+
+@cached_step(
+    inputs=[_3_1_SPLIT_BY_NLP, _2_CLEANED_CHUNKS, CUSTOM_TERMS_PATH, PROMPTS_FILE],
+    config=[*TRANSLATE_CONFIG, "max_split_length", "summary_length"],
+    outputs=[_4_2_TRANSLATION, _3_2_SPLIT_BY_MEANING, _4_1_TERMINOLOGY],
+    adopt_existing=True,
+)
+def split_and_translate():
+    if is_step_current(split_sentences_by_meaning):
+        # splitting is already done for these inputs, nothing left to overlap
+        split_sentences_by_meaning()
+        get_summary()
+        translate_all()
+        return
+
+    console.print("[bold green]Start splitting and translating (pipelined)...[/bold green]")
+    with open(job_path(_3_1_SPLIT_BY_NLP), 'r', encoding='utf-8') as f:
+        sentences = [line.strip() for line in f.readlines()]
+    nlp = init_nlp()
+    max_length = load_key("max_split_length")
+    dispatcher = get_llm_dispatcher()
+
+    summary_future = dispatcher.submit(summarize, _3_1_SPLIT_BY_NLP, priority=PRIORITY_SUMMARY)
+    final_parts = [None] * len(sentences)
+    split_futures = {}
+    for index, sentence in enumerate(sentences):
+        if len(tokenize_sentence(sentence, nlp)) <= max_length:
+            final_parts[index] = [sentence]
+        else:
+            future = dispatcher.submit(split_sentence_fully, sentence, max_length, nlp, index=index, priority=PRIORITY_SPLIT)
+            split_futures[future] = index
+
+    builder = ChunkBuilder(CHUNK_SIZE, CHUNK_MAX_LINES)
+    split_lines, chunks, translate_futures = [], [], []
+    next_index, all_chunks_known, summary_ready, summary_recorded, theme_prompt = 0, False, False, False, None
+    pending = set(split_futures) | {summary_future}
+    while pending or len(translate_futures) < len(chunks) or not all_chunks_known:
+        if pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future is summary_future:
+                    future.result()
+                    summary_ready = True
+                    with open(job_path(_4_1_TERMINOLOGY), 'r', encoding='utf-8') as file:
+                        theme_prompt = json.load(file).get('theme')
+                else:
+                    final_parts[split_futures[future]] = future.result()
+
+        # feed the finalized prefix of sentences into the chunker
+        while next_index < len(final_parts) and final_parts[next_index] is not None:
+            for line in final_parts[next_index]:
+                split_lines.append(line)
+                closed = builder.add(line)
+                if closed is not None:
+                    chunks.append(closed)
+            next_index += 1
+        if next_index == len(final_parts) and not all_chunks_known:
+            chunks.append(builder.finish())
+            all_chunks_known = True
+            with open(job_path(_3_2_SPLIT_BY_MEANING), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(split_lines))
+            record_step(split_sentences_by_meaning)
+            console.print('[green]✅ All sentences have been successfully split![/green]')
+        if summary_ready and all_chunks_known and not summary_recorded:
+            # get_summary's key covers the split file, so it is recorded once both are on disk
+            record_step(get_summary)
+            summary_recorded = True
+
+        # a chunk can be translated once the summary is ready and its following chunk is known
+        if summary_ready:
+            while len(translate_futures) < len(chunks) and (all_chunks_known or len(translate_futures) + 1 < len(chunks)):
+                i = len(translate_futures)
+                context = chunks if all_chunks_known else chunks[:i + 2]
+                translate_futures.append(dispatcher.submit(translate_chunk, chunks[i], context, theme_prompt, i, priority=PRIORITY_TRANSLATE))
+
+    results = [future.result() for future in translate_futures]
+    save_translation_results(chunks, results)
+    # same outputs translate_all would give for these inputs, lets a later resume skip it
+    record_step(translate_all)
+
 if __name__ == '__main__':
     translate_all()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import pandas as pd
-from typing import List, Tuple
 import concurrent.futures
+from typing import List, Tuple
 
 from core._3_2_split_meaning import split_sentence
 from core.prompts import get_align_prompt
@@ -8,6 +8,8 @@ from rich.panel import Panel
 from rich.console import Console
 from rich.table import Table
 from core.utils import *
+from core.utils.llm_dispatcher import get_llm_dispatcher, PRIORITY_SPLIT
+from core.utils.step_cache import cached_step, PROMPTS_FILE, LLM_CONFIG
 from core.utils.models import *
 console = Console()
 
@@ -84,8 +86,8 @@ def split_align_subs(src_lines: List[str], tr_lines: List[str]):
         tr_lines[i] = tr_parts
         remerged_tr_lines[i] = tr_remerged
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=load_key("max_workers")) as executor:
-        executor.map(process, to_split)
+    dispatcher = get_llm_dispatcher()
+    concurrent.futures.wait([dispatcher.submit(process, i, priority=PRIORITY_SPLIT) for i in to_split])
     
     # Flatten `src_lines` and `tr_lines`
     src_lines = [item for sublist in src_lines for item in (sublist if isinstance(sublist, list) else [sublist])]
@@ -93,10 +95,15 @@ def split_align_subs(src_lines: List[str], tr_lines: List[str]):
     
     return src_lines, tr_lines, remerged_tr_lines
 
+@cached_step(
+    inputs=[_4_2_TRANSLATION, PROMPTS_FILE],
+    config=[*LLM_CONFIG, "subtitle"],
+    outputs=[_5_SPLIT_SUB, _5_REMERGED],
+)
 def split_for_sub_main():
     console.print("[bold green]🚀 Start splitting subtitles...[/bold green]")
     
-    df = pd.read_excel(_4_2_TRANSLATION)
+    df = load_table(_4_2_TRANSLATION)
     src = df['Source'].tolist()
     trans = df['Translation'].tolist()
     
@@ -122,8 +129,8 @@ def split_for_sub_main():
     elif len(remerged) > len(src):
         src += [None] * (len(remerged) - len(src))
     
-    pd.DataFrame({'Source': split_src, 'Translation': split_trans}).to_excel(_5_SPLIT_SUB, index=False)
-    pd.DataFrame({'Source': src, 'Translation': remerged}).to_excel(_5_REMERGED, index=False)
+    save_table(pd.DataFrame({'Source': split_src, 'Translation': split_trans}), _5_SPLIT_SUB)
+    save_table(pd.DataFrame({'Source': src, 'Translation': remerged}), _5_REMERGED)
 
 if __name__ == '__main__':
     split_for_sub_main()
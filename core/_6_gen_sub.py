@@ -1,6 +1,8 @@
 import pandas as pd
+import numpy as np
 import os
 import re
+import hashlib
 from rich.panel import Panel
 from rich.console import Console
 import autocorrect_py as autocorrect
@@ -56,69 +58,92 @@ def show_difference(str1, str2):
     print("Position markers: " + "".join("^" if i in diff_positions else " " for i in range(max(len(str1), len(str2)))))
     print(f"Difference indices: {diff_positions}")
 
+# ------------
+# char -> word index, cached by the words it was built from
+# ------------
+
+_WORD_INDEX_CACHE = {}
+_TIMESTAMP_CACHE = {}
+_CACHE_SIZE = 4
+
+def _hash_texts(texts):
+    h = hashlib.md5()
+    for text in texts:
+        h.update(str(text).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+def _remember(cache, key, value):
+    if len(cache) >= _CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+    return value
+
+def build_word_index(words):
+    """Concatenate cleaned words and map every char position to its word (int32 array)"""
+    clean_words = [remove_punctuation(word.lower()) for word in words]
+    full_words_str = ''.join(clean_words)
+    lengths = np.fromiter((len(w) for w in clean_words), dtype=np.int64, count=len(clean_words))
+    char_to_word = np.repeat(np.arange(len(clean_words), dtype=np.int32), lengths)
+    return full_words_str, char_to_word
+
 def get_sentence_timestamps(df_words, df_sentences):
+    words = df_words['text'].tolist()
+    sentences = df_sentences['Source'].tolist()
+    words_key = _hash_texts(words)
+    cache_key = (words_key, _hash_texts(df_words['start'].tolist() + df_words['end'].tolist()), _hash_texts(sentences))
+    if cache_key in _TIMESTAMP_CACHE:
+        return list(_TIMESTAMP_CACHE[cache_key])
+
+    if words_key not in _WORD_INDEX_CACHE:
+        _remember(_WORD_INDEX_CACHE, words_key, build_word_index(words))
+    full_words_str, char_to_word = _WORD_INDEX_CACHE[words_key]
+    starts = df_words['start'].to_numpy(dtype=float)
+    ends = df_words['end'].to_numpy(dtype=float)
+
+    def word_at(pos):
+        if not 0 <= pos < len(char_to_word):
+            raise KeyError(pos)
+        return int(char_to_word[pos])
+
     time_stamp_list = []
-    
-    # Build complete string and position mapping
-    full_words_str = ''
-    position_to_word_idx = {}
-    
-    for idx, word in enumerate(df_words['text']):
-        clean_word = remove_punctuation(word.lower())
-        start_pos = len(full_words_str)
-        full_words_str += clean_word
-        for pos in range(start_pos, len(full_words_str)):
-            position_to_word_idx[pos] = idx
-    
     current_pos = 0
     for idx, sentence in df_sentences['Source'].items():
         clean_sentence = remove_punctuation(sentence.lower()).replace(" ", "")
         sentence_len = len(clean_sentence)
-        
-        match_found = False
-        while current_pos <= len(full_words_str) - sentence_len:
-            if full_words_str[current_pos:current_pos+sentence_len] == clean_sentence:
-                start_word_idx = position_to_word_idx[current_pos]
-                end_word_idx = position_to_word_idx[current_pos + sentence_len - 1]
-                
-                time_stamp_list.append((
-                    float(df_words['start'][start_word_idx]),
-                    float(df_words['end'][end_word_idx])
-                ))
-                
-                current_pos += sentence_len
-                match_found = True
-                break
-            current_pos += 1
-            
-        if not match_found:
+
+        # single pass: jump straight to the next occurrence instead of sliding char by char
+        match_pos = full_words_str.find(clean_sentence, current_pos)
+        if match_pos != -1 and match_pos <= len(full_words_str) - sentence_len:
+            start_word_idx = word_at(match_pos)
+            end_word_idx = word_at(match_pos + sentence_len - 1)
+            time_stamp_list.append((float(starts[start_word_idx]), float(ends[end_word_idx])))
+            current_pos = match_pos + sentence_len
+        else:
+            current_pos = max(current_pos, len(full_words_str) - sentence_len + 1)
             print(f"\n⚠️ Warning: No exact match found for sentence: {sentence}")
             show_difference(clean_sentence, 
                           full_words_str[current_pos:current_pos+len(clean_sentence)])
             print("\nOriginal sentence:", df_sentences['Source'][idx])
             raise ValueError("❎ No match found for sentence.")
-    
+
+    _remember(_TIMESTAMP_CACHE, cache_key, tuple(time_stamp_list))
     return time_stamp_list
 
 def align_timestamp(df_text, df_translate, subtitle_output_configs: list, output_dir: str, for_display: bool = True):
     """Align timestamps and add a new timestamp column to df_translate"""
     df_trans_time = df_translate.copy()
 
-    # Assign an ID to each word in df_text['text'] and create a new DataFrame
-    words = df_text['text'].str.split(expand=True).stack().reset_index(level=1, drop=True).reset_index()
-    words.columns = ['id', 'word']
-    words['id'] = words['id'].astype(int)
-
     # Process timestamps ⏰
     time_stamp_list = get_sentence_timestamps(df_text, df_translate)
-    df_trans_time['timestamp'] = time_stamp_list
-    df_trans_time['duration'] = df_trans_time['timestamp'].apply(lambda x: x[1] - x[0])
+    df_trans_time['duration'] = [end - start for start, end in time_stamp_list]
 
     # Remove gaps 🕳️
-    for i in range(len(df_trans_time)-1):
-        delta_time = df_trans_time.loc[i+1, 'timestamp'][0] - df_trans_time.loc[i, 'timestamp'][1]
+    for i in range(len(time_stamp_list)-1):
+        delta_time = time_stamp_list[i+1][0] - time_stamp_list[i][1]
         if 0 < delta_time < 1:
-            df_trans_time.at[i, 'timestamp'] = (df_trans_time.loc[i, 'timestamp'][0], df_trans_time.loc[i+1, 'timestamp'][0])
+            time_stamp_list[i] = (time_stamp_list[i][0], time_stamp_list[i+1][0])
+    df_trans_time['timestamp'] = time_stamp_list
 
     # Convert start and end timestamps to SRT format
     df_trans_time['timestamp'] = df_trans_time['timestamp'].apply(lambda x: convert_to_srt_format(x[0], x[1]))
@@ -132,6 +157,7 @@ def align_timestamp(df_text, df_translate, subtitle_output_configs: list, output
         return ''.join([f"{i+1}\n{row['timestamp']}\n{row[columns[0]].strip()}\n{row[columns[1]].strip() if len(columns) > 1 else ''}\n\n" for i, row in df.iterrows()]).strip()
 
     if output_dir:
+        output_dir = job_path(output_dir)
         os.makedirs(output_dir, exist_ok=True)
         for filename, columns in subtitle_output_configs:
             subtitle_str = generate_subtitle_string(df_trans_time, columns)
@@ -148,21 +174,46 @@ def clean_translation(x):
     return autocorrect.format(cleaned)
 
 def align_timestamp_main():
-    df_text = pd.read_excel(_2_CLEANED_CHUNKS)
+    df_text = load_table(_2_CLEANED_CHUNKS)
     df_text['text'] = df_text['text'].str.strip('"').str.strip()
-    df_translate = pd.read_excel(_5_SPLIT_SUB)
+    df_translate = load_table(_5_SPLIT_SUB)
     df_translate['Translation'] = df_translate['Translation'].apply(clean_translation)
     
     align_timestamp(df_text, df_translate, SUBTITLE_OUTPUT_CONFIGS, _OUTPUT_DIR)
     console.print(Panel("[bold green]🎉📝 Subtitles generation completed! Please check in the `output` folder 👀[/bold green]"))
 
     # for audio
-    df_translate_for_audio = pd.read_excel(_5_REMERGED) # use remerged file to avoid unmatched lines when dubbing
+    df_translate_for_audio = load_table(_5_REMERGED) # use remerged file to avoid unmatched lines when dubbing
     df_translate_for_audio['Translation'] = df_translate_for_audio['Translation'].apply(clean_translation)
     
     align_timestamp(df_text, df_translate_for_audio, AUDIO_SUBTITLE_OUTPUT_CONFIGS, _AUDIO_DIR)
     console.print(Panel(f"[bold green]🎉📝 Audio subtitles generation completed! Please check in the `{_AUDIO_DIR}` folder 👀[/bold green]"))
     
 
+def benchmark_alignment(hours=3, words_per_second=2.5, words_per_sentence=12):
+    """Time the aligner on a synthetic transcript of the given length"""
+    import time
+    import random
+    random.seed(0)
+    vocab = ['the', 'quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog', 'hello', 'world', "don't", 'video', 'lingo']
+    n_words = int(hours * 3600 * words_per_second)
+    texts = [random.choice(vocab) for _ in range(n_words)]
+    starts = [i / words_per_second for i in range(n_words)]
+    df_words = pd.DataFrame({'text': texts, 'start': starts, 'end': [s + 0.3 for s in starts]})
+    sentences = [' '.join(texts[i:i + words_per_sentence]) + '.' for i in range(0, n_words, words_per_sentence)]
+    df_sentences = pd.DataFrame({'Source': sentences})
+
+    start = time.time()
+    get_sentence_timestamps(df_words, df_sentences)
+    cold = time.time() - start
+    start = time.time()
+    get_sentence_timestamps(df_words, df_sentences)
+    warm = time.time() - start
+    print(f"{n_words} words / {len(sentences)} sentences: cold {cold:.2f}s, cached {warm * 1000:.1f}ms")
+
 if __name__ == '__main__':
-    align_timestamp_main()
\ No newline at end of file
+    import sys
+    if '--bench' in sys.argv:
+        benchmark_alignment()
+    else:
+        align_timestamp_main()
\ No newline at end of file
@@ -4,6 +4,7 @@ import cv2
 import numpy as np
 import platform
 from core.utils import *
+from core.utils.step_cache import cached_step
 
 SRC_FONT_SIZE = 15
 TRANS_FONT_SIZE = 17
@@ -40,9 +41,15 @@ def check_gpu_available():
     except:
         return False
 
+@cached_step(
+    inputs=[find_video_files, SRC_SRT, TRANS_SRT],
+    config=["burn_subtitles", "ffmpeg_gpu"],
+    outputs=[OUTPUT_VIDEO],
+)
 def merge_subtitles_to_video():
     video_file = find_video_files()
-    os.makedirs(os.path.dirname(OUTPUT_VIDEO), exist_ok=True)
+    output_video, src_srt, trans_srt = job_path(OUTPUT_VIDEO), job_path(SRC_SRT), job_path(TRANS_SRT)
+    os.makedirs(os.path.dirname(output_video), exist_ok=True)
 
     # Check resolution
     if not load_key("burn_subtitles"):
@@ -51,14 +58,14 @@ def merge_subtitles_to_video():
         # Create a black frame
         frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(OUTPUT_VIDEO, fourcc, 1, (1920, 1080))
+        out = cv2.VideoWriter(output_video, fourcc, 1, (1920, 1080))
         out.write(frame)
         out.release()
 
         rprint("[bold green]Placeholder video has been generated.[/bold green]")
         return
 
-    if not os.path.exists(SRC_SRT) or not os.path.exists(TRANS_SRT):
+    if not os.path.exists(src_srt) or not os.path.exists(trans_srt):
         rprint("Subtitle files not found in the 'output' directory.")
         exit(1)
 
@@ -72,10 +79,10 @@ def merge_subtitles_to_video():
         '-vf', (
             f"scale={TARGET_WIDTH}:{TARGET_HEIGHT}:force_original_aspect_ratio=decrease,"
             f"pad={TARGET_WIDTH}:{TARGET_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
-            f"subtitles={SRC_SRT}:force_style='FontSize={SRC_FONT_SIZE},FontName={FONT_NAME}," 
+            f"subtitles={src_srt}:force_style='FontSize={SRC_FONT_SIZE},FontName={FONT_NAME}," 
             f"PrimaryColour={SRC_FONT_COLOR},OutlineColour={SRC_OUTLINE_COLOR},OutlineWidth={SRC_OUTLINE_WIDTH},"
             f"ShadowColour={SRC_SHADOW_COLOR},BorderStyle=1',"
-            f"subtitles={TRANS_SRT}:force_style='FontSize={TRANS_FONT_SIZE},FontName={TRANS_FONT_NAME},"
+            f"subtitles={trans_srt}:force_style='FontSize={TRANS_FONT_SIZE},FontName={TRANS_FONT_NAME},"
             f"PrimaryColour={TRANS_FONT_COLOR},OutlineColour={TRANS_OUTLINE_COLOR},OutlineWidth={TRANS_OUTLINE_WIDTH},"
             f"BackColour={TRANS_BACK_COLOR},Alignment=2,MarginV=27,BorderStyle=4'"
         ).encode('utf-8'),
@@ -85,7 +92,7 @@ def merge_subtitles_to_video():
     if ffmpeg_gpu:
         rprint("[bold green]will use GPU acceleration.[/bold green]")
         ffmpeg_cmd.extend(['-c:v', 'h264_nvenc'])
-    ffmpeg_cmd.extend(['-y', OUTPUT_VIDEO])
+    ffmpeg_cmd.extend(['-y', output_video])
 
     rprint("🎬 Start merging subtitles to video...")
     start_time = time.time()
@@ -7,6 +7,7 @@ from core.prompts import get_subtitle_trim_prompt
 from core.tts_backend.estimate_duration import init_estimator, estimate_duration
 from core.utils import *
 from core.utils.models import *
+from core.utils.step_cache import cached_step, PROMPTS_FILE, LLM_CONFIG
 
 console = Console()
 speed_factor = load_key("speed_factor")
@@ -52,10 +53,10 @@ def time_diff_seconds(t1, t2, base_date):
 def process_srt():
     """Process srt file, generate audio tasks"""
     
-    with open(TRANS_SUBS_FOR_AUDIO_FILE, 'r', encoding='utf-8') as file:
+    with open(job_path(TRANS_SUBS_FOR_AUDIO_FILE), 'r', encoding='utf-8') as file:
         content = file.read()
     
-    with open(SRC_SUBS_FOR_AUDIO_FILE, 'r', encoding='utf-8') as src_file:
+    with open(job_path(SRC_SUBS_FOR_AUDIO_FILE), 'r', encoding='utf-8') as src_file:
         src_content = src_file.read()
     
     subtitles = []
@@ -132,11 +133,16 @@ def process_srt():
 
     return df
 
-@check_file_exists(_8_1_AUDIO_TASK)
+@cached_step(
+    inputs=[TRANS_SUBS_FOR_AUDIO_FILE, SRC_SUBS_FOR_AUDIO_FILE, PROMPTS_FILE],
+    config=[*LLM_CONFIG, "min_subtitle_duration", "speed_factor"],
+    outputs=[_8_1_AUDIO_TASK],
+    adopt_existing=True,
+)
 def gen_audio_task_main():
     df = process_srt()
     console.print(df)
-    df.to_excel(_8_1_AUDIO_TASK, index=False)
+    save_table(df, _8_1_AUDIO_TASK)
     rprint(Panel(f"Successfully generated {_8_1_AUDIO_TASK}", title="Success", border_style="green"))
 
 if __name__ == '__main__':
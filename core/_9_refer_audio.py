@@ -4,11 +4,15 @@ from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from core.utils import *
 from core.utils.models import *
-import pandas as pd
 import soundfile as sf
 console = Console()
 from core.asr_backend.demucs_vl import demucs_audio
 from core.utils.models import *
+from core.utils.step_cache import cached_step
+from core.utils.pcm_cache import load_pcm
+
+# references feed voice cloning, keep them at full band rather than the 16kHz ASR rate
+REFER_SAMPLE_RATE = 44100
 
 def time_to_samples(time_str, sr):
     """Unified time conversion function"""
@@ -23,18 +27,28 @@ def extract_audio(audio_data, sr, start_time, end_time, out_file):
     end = time_to_samples(end_time, sr)
     sf.write(out_file, audio_data[start:end], sr)
 
+# demucs may run here too, so the separated tracks are outputs of this step as well
+@cached_step(
+    inputs=[_8_1_AUDIO_TASK, _RAW_AUDIO_FILE],
+    outputs=[_AUDIO_REFERS_DIR, _VOCAL_AUDIO_FILE, _BACKGROUND_AUDIO_FILE],
+)
 def extract_refer_audio_main():
     demucs_audio() #!!! in case demucs not run
-    if os.path.exists(os.path.join(_AUDIO_SEGS_DIR, '1.wav')):
+    refers_dir = job_path(_AUDIO_REFERS_DIR)
+    if os.path.exists(job_path(os.path.join(_AUDIO_SEGS_DIR, '1.wav'))):
+        if not os.path.isdir(refers_dir):
+            # nothing to hand to the TTS step, it must not be recorded as done
+            raise FileNotFoundError(f"Audio segments exist but {_AUDIO_REFERS_DIR} is missing, delete {_AUDIO_SEGS_DIR} to extract references again")
         rprint(Panel("Audio segments already exist, skipping extraction", title="Info", border_style="blue"))
         return
 
     # Create output directory
-    os.makedirs(_AUDIO_REFERS_DIR, exist_ok=True)
+    os.makedirs(refers_dir, exist_ok=True)
     
     # Read task file and audio data
-    df = pd.read_excel(_8_1_AUDIO_TASK)
-    data, sr = sf.read(_VOCAL_AUDIO_FILE)
+    df = load_table(_8_1_AUDIO_TASK)
+    sr = REFER_SAMPLE_RATE
+    data = load_pcm(_VOCAL_AUDIO_FILE, sr)
     
     with Progress(
         SpinnerColumn(),
@@ -45,11 +59,11 @@ def extract_refer_audio_main():
         task = progress.add_task("Extracting audio segments...", total=len(df))
         
         for _, row in df.iterrows():
-            out_file = os.path.join(_AUDIO_REFERS_DIR, f"{row['number']}.wav")
+            out_file = os.path.join(refers_dir, f"{row['number']}.wav")
             extract_audio(data, sr, row['start_time'], row['end_time'], out_file)
             progress.update(task, advance=1)
             
-    rprint(Panel(f"Audio segments saved to {_AUDIO_REFERS_DIR}", title="Success", border_style="green"))
+    rprint(Panel(f"Audio segments saved to {refers_dir}", title="Success", border_style="green"))
 
 if __name__ == "__main__":
     extract_refer_audio_main()
\ No newline at end of file
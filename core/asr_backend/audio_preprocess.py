@@ -1,56 +1,45 @@
 import os, subprocess
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from typing import Dict, List, Tuple
 from pydub import AudioSegment
 from core.utils import *
 from core.utils.models import *
-from pydub import AudioSegment
-from pydub.silence import detect_silence
-from pydub.utils import mediainfo
+from core.utils.pcm_cache import pcm_duration
+from core.utils.job_context import with_current_job
+# re-exported, callers used to import it from here
+from core.utils.audio_duration import get_audio_duration
+from core.asr_backend.silence_detect import get_silence_detector
 from rich import print as rprint
 
 def normalize_audio_volume(audio_path, output_path, target_db = -20.0, format = "wav"):
-    audio = AudioSegment.from_file(audio_path)
+    audio = AudioSegment.from_file(job_path(audio_path))
     change_in_dBFS = target_db - audio.dBFS
     normalized_audio = audio.apply_gain(change_in_dBFS)
-    normalized_audio.export(output_path, format=format)
+    normalized_audio.export(job_path(output_path), format=format)
     rprint(f"[green]✅ Audio normalized from {audio.dBFS:.1f}dB to {target_db:.1f}dB[/green]")
     return output_path
 
 def convert_video_to_audio(video_file: str):
-    os.makedirs(_AUDIO_DIR, exist_ok=True)
-    if not os.path.exists(_RAW_AUDIO_FILE):
+    raw_audio_file = job_path(_RAW_AUDIO_FILE)
+    os.makedirs(job_path(_AUDIO_DIR), exist_ok=True)
+    if not os.path.exists(raw_audio_file):
         rprint(f"[blue]🎬➡️🎵 Converting to high quality audio with FFmpeg ......[/blue]")
         subprocess.run([
             'ffmpeg', '-y', '-i', video_file, '-vn',
             '-c:a', 'libmp3lame', '-b:a', '32k',
             '-ar', '16000',
             '-ac', '1', 
-            '-metadata', 'encoding=UTF-8', _RAW_AUDIO_FILE
+            '-metadata', 'encoding=UTF-8', raw_audio_file
         ], check=True, stderr=subprocess.PIPE)
-        rprint(f"[green]🎬➡️🎵 Converted <{video_file}> to <{_RAW_AUDIO_FILE}> with FFmpeg\n[/green]")
-
-def get_audio_duration(audio_file: str) -> float:
-    """Get the duration of an audio file using ffmpeg."""
-    cmd = ['ffmpeg', '-i', audio_file]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    _, stderr = process.communicate()
-    output = stderr.decode('utf-8', errors='ignore')
-    
-    try:
-        duration_str = [line for line in output.split('\n') if 'Duration' in line][0]
-        duration_parts = duration_str.split('Duration: ')[1].split(',')[0].split(':')
-        duration = float(duration_parts[0])*3600 + float(duration_parts[1])*60 + float(duration_parts[2])
-    except Exception as e:
-        print(f"[red]❌ Error: Failed to get audio duration: {e}[/red]")
-        duration = 0
-    return duration
+        rprint(f"[green]🎬➡️🎵 Converted <{video_file}> to <{raw_audio_file}> with FFmpeg\n[/green]")
 
 def split_audio(audio_file: str, target_len: float = 30*60, win: float = 60) -> List[Tuple[float, float]]:
-    ## 在 [target_len-win, target_len+win] 区间内用 pydub 检测静默，切分音频
+    ## 在 [target_len-win, target_len+win] 区间内检测静默，切分音频
     rprint(f"[blue]🎙️ Starting audio segmentation {audio_file} {target_len} {win}[/blue]")
-    audio = AudioSegment.from_file(audio_file)
-    duration = float(mediainfo(audio_file)["duration"])
+    # the energy envelope is built once per file, each cut below only scans its window
+    detector = get_silence_detector(audio_file)
+    duration = detector.duration
     if duration <= target_len + win:
         return [(0, duration)]
     segments, pos = [], 0.0
@@ -61,21 +50,9 @@ def split_audio(audio_file: str, target_len: float = 30*60, win: float = 60) ->
             segments.append((pos, duration)); break
 
         threshold = pos + target_len
-        ws, we = int((threshold - win) * 1000), int((threshold + win) * 1000)
-        
-        # 获取完整的静默区域
-        silence_regions = detect_silence(audio[ws:we], min_silence_len=int(safe_margin*1000), silence_thresh=-30)
-        silence_regions = [(s/1000 + (threshold - win), e/1000 + (threshold - win)) for s, e in silence_regions]
-        # 筛选长度足够（至少1秒）且位置适合的静默区域
-        valid_regions = [
-            (start, end) for start, end in silence_regions 
-            if (end - start) >= (safe_margin * 2) and threshold <= start + safe_margin <= threshold + win
-        ]
-        
-        if valid_regions:
-            start, end = valid_regions[0]
-            split_at = start + safe_margin  # 在静默区域起始点后0.5秒处切分
-        else:
+        # 在静默区域（至少1秒）起始点后0.5秒处切分
+        split_at = detector.best_cut(threshold, win, safe_margin=safe_margin, silence_thresh=-30)
+        if split_at is None:
             rprint(f"[yellow]⚠️ No valid silence regions found for {audio_file} at {threshold}s, using threshold[/yellow]")
             split_at = threshold
             
@@ -84,6 +61,15 @@ def split_audio(audio_file: str, target_len: float = 30*60, win: float = 60) ->
     rprint(f"[green]🎙️ Audio split completed {len(segments)} segments[/green]")
     return segments
 
+def transcribe_concurrently(ts, raw_audio_file: str, vocal_audio_file: str, segments: List[Tuple[float, float]]) -> List[Dict]:
+    """Send the segments of a cloud backend as concurrent requests, results in segment order"""
+    # decode once before the threads race for it
+    pcm_duration(vocal_audio_file)
+    workers = max(1, min(len(segments), load_key("max_workers")))
+    ts = with_current_job(ts)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda seg: ts(raw_audio_file, vocal_audio_file, *seg), segments))
+
 def process_transcription(result: Dict) -> pd.DataFrame:
     all_words = []
     for segment in result['segments']:
@@ -136,7 +122,7 @@ def process_transcription(result: Dict) -> pd.DataFrame:
     return pd.DataFrame(all_words)
 
 def save_results(df: pd.DataFrame):
-    os.makedirs('output/log', exist_ok=True)
+    os.makedirs(job_path('output/log'), exist_ok=True)
 
     # Remove rows where 'text' is empty
     initial_rows = len(df)
@@ -152,8 +138,8 @@ def save_results(df: pd.DataFrame):
         df = df[df['text'].str.len() <= 30]
     
     df['text'] = df['text'].apply(lambda x: f'"{x}"')
-    df.to_excel(_2_CLEANED_CHUNKS, index=False)
-    rprint(f"[green]📊 Excel file saved to {_2_CLEANED_CHUNKS}[/green]")
+    save_table(df, _2_CLEANED_CHUNKS)
+    rprint(f"[green]📊 Table saved to {_2_CLEANED_CHUNKS}[/green]")
 
 def save_language(language: str):
-    update_key("whisper.detected_language", language)
\ No newline at end of file
+    set_job_key("whisper.detected_language", language)
\ No newline at end of file
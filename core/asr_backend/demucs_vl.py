@@ -10,6 +10,7 @@ from demucs.api import Separator
 from demucs.apply import BagOfModels
 import gc
 from core.utils.models import *
+from core.utils.job_context import job_path
 
 class PreloadedSeparator(Separator):
     def __init__(self, model: BagOfModels, shifts: int = 1, overlap: float = 0.25,
@@ -20,29 +21,30 @@ class PreloadedSeparator(Separator):
                             segment=segment, jobs=jobs, progress=True, callback=None, callback_arg=None)
 
 def demucs_audio():
-    if os.path.exists(_VOCAL_AUDIO_FILE) and os.path.exists(_BACKGROUND_AUDIO_FILE):
-        rprint(f"[yellow]⚠️ {_VOCAL_AUDIO_FILE} and {_BACKGROUND_AUDIO_FILE} already exist, skip Demucs processing.[/yellow]")
+    vocal_file, background_file = job_path(_VOCAL_AUDIO_FILE), job_path(_BACKGROUND_AUDIO_FILE)
+    if os.path.exists(vocal_file) and os.path.exists(background_file):
+        rprint(f"[yellow]⚠️ {vocal_file} and {background_file} already exist, skip Demucs processing.[/yellow]")
         return
     
     console = Console()
-    os.makedirs(_AUDIO_DIR, exist_ok=True)
+    os.makedirs(job_path(_AUDIO_DIR), exist_ok=True)
     
     console.print("🤖 Loading <htdemucs> model...")
     model = get_model('htdemucs')
     separator = PreloadedSeparator(model=model, shifts=1, overlap=0.25)
     
     console.print("🎵 Separating audio...")
-    _, outputs = separator.separate_audio_file(_RAW_AUDIO_FILE)
+    _, outputs = separator.separate_audio_file(job_path(_RAW_AUDIO_FILE))
     
     kwargs = {"samplerate": model.samplerate, "bitrate": 128, "preset": 2, 
              "clip": "rescale", "as_float": False, "bits_per_sample": 16}
     
     console.print("🎤 Saving vocals track...")
-    save_audio(outputs['vocals'].cpu(), _VOCAL_AUDIO_FILE, **kwargs)
+    save_audio(outputs['vocals'].cpu(), vocal_file, **kwargs)
     
     console.print("🎹 Saving background music...")
     background = sum(audio for source, audio in outputs.items() if source != 'vocals')
-    save_audio(background.cpu(), _BACKGROUND_AUDIO_FILE, **kwargs)
+    save_audio(background.cpu(), background_file, **kwargs)
     
     # Clean up memory
     del outputs, background, model, separator
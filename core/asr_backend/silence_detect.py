@@ -0,0 +1,122 @@
+import os
+from threading import Lock
+import numpy as np
+from core.utils.pcm_cache import load_pcm, PCM_SAMPLE_RATE
+from core.utils.job_context import job_path
+
+# ------------
+# vectorized silence detection
+# ------------
+# The whole file is reduced once to a per-millisecond energy envelope (mean
+# square of each 1ms frame, computed on strided views of the PCM memmap).
+# A silence query over a window is then a cumsum over that slice of the
+# envelope, so "where can I cut near T" costs O(window) and never decodes audio.
+# Results match pydub.silence.detect_silence with seek_step=1.
+# ------------
+
+ENVELOPE_CHUNK_SECONDS = 600
+
+class SilenceDetector:
+    def __init__(self, pcm, sample_rate=PCM_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.frame = sample_rate // 1000  # samples per ms
+        self.duration = len(pcm) / sample_rate
+        n_frames = len(pcm) // self.frame
+        self.energy = np.empty(n_frames, dtype=np.float32)
+        step = ENVELOPE_CHUNK_SECONDS * 1000
+        for i in range(0, n_frames, step):
+            j = min(i + step, n_frames)
+            frames = np.asarray(pcm[i * self.frame:j * self.frame], dtype=np.float32).reshape(-1, self.frame)
+            self.energy[i:j] = np.einsum('ij,ij->i', frames, frames) / self.frame
+
+    def silence_regions(self, start, end, min_silence_len=0.5, silence_thresh=-30):
+        """(start, end) seconds of silences in [start, end], same rules as pydub detect_silence"""
+        offset = max(int(start * 1000), 0)
+        energy = self.energy[offset:max(int(end * 1000), 0)]
+        min_ms = int(min_silence_len * 1000)
+        if min_ms <= 0 or len(energy) < min_ms:
+            return []
+        cumsum = np.concatenate(([0.0], np.cumsum(energy, dtype=np.float64)))
+        window_energy = (cumsum[min_ms:] - cumsum[:-min_ms]) / min_ms
+        threshold = (10 ** (silence_thresh / 20)) ** 2
+        silent_starts = np.flatnonzero(window_energy <= threshold)
+        if len(silent_starts) == 0:
+            return []
+        # a new region starts where the next silent window does not overlap the previous one
+        breaks = np.flatnonzero(np.diff(silent_starts) > min_ms)
+        region_starts = silent_starts[np.r_[0, breaks + 1]]
+        region_ends = silent_starts[np.r_[breaks, len(silent_starts) - 1]] + min_ms
+        return [(s / 1000 + start, e / 1000 + start) for s, e in zip(region_starts, region_ends)]
+
+    def best_cut(self, target, win, safe_margin=0.5, silence_thresh=-30):
+        """First cut point in [target, target + win] that sits safe_margin inside a silence, None if there is none"""
+        for start, end in self.silence_regions(target - win, target + win, safe_margin, silence_thresh):
+            if (end - start) >= safe_margin * 2 and target <= start + safe_margin <= target + win:
+                return start + safe_margin
+        return None
+
+_detectors = {}
+_detectors_lock = Lock()
+
+def get_silence_detector(audio_file):
+    """Detector for a file, built once and shared by every split with any target length"""
+    audio_file = job_path(audio_file)
+    st = os.stat(audio_file)
+    key = (os.path.abspath(audio_file), st.st_mtime_ns, st.st_size)
+    with _detectors_lock:
+        if key not in _detectors:
+            _detectors.clear()
+            _detectors[key] = SilenceDetector(load_pcm(audio_file))
+        return _detectors[key]
+
+if __name__ == "__main__":
+    # ------------
+    # benchmark on synthetic 1-4 hour inputs: python -m core.asr_backend.silence_detect [hours ...]
+    # ------------
+    import sys
+    import time
+    import tempfile
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+
+    def synth(path, hours, sr=PCM_SAMPLE_RATE):
+        rng = np.random.default_rng(0)
+        n = int(hours * 3600 * sr)
+        pcm = np.memmap(path, dtype=np.float32, mode='w+', shape=(n,))
+        step = 600 * sr
+        for i in range(0, n, step):
+            chunk = rng.normal(0, 0.2, min(step, n - i)).astype(np.float32)
+            # a 1.5s pause roughly every 40s
+            for p in range(0, len(chunk) - 2 * sr, 40 * sr):
+                gap = p + int(rng.integers(0, 20 * sr))
+                chunk[gap:gap + int(1.5 * sr)] *= 0.001
+            pcm[i:i + len(chunk)] = chunk
+        pcm.flush()
+        return np.memmap(path, dtype=np.float32, mode='r')
+
+    hours_list = [float(h) for h in sys.argv[1:]] or [1, 2, 3, 4]
+    with tempfile.TemporaryDirectory() as tmp:
+        for hours in hours_list:
+            pcm = synth(os.path.join(tmp, f"{hours}h.f32"), hours)
+            start = time.time()
+            detector = SilenceDetector(pcm)
+            build = time.time() - start
+            queries = []
+            for target_len in (10 * 60, 20 * 60, 30 * 60):
+                start = time.time()
+                pos, cuts = 0.0, 0
+                while detector.duration - pos > target_len:
+                    pos = detector.best_cut(pos + target_len, 60) or pos + target_len
+                    cuts += 1
+                queries.append(f"{target_len // 60}min: {cuts} cuts {(time.time() - start) * 1000:.1f}ms")
+            print(f"{hours:g}h envelope {build:.2f}s | " + " | ".join(queries))
+
+            # reference: pydub on one 2 minute window
+            ws = int(len(pcm) / 2 / PCM_SAMPLE_RATE)
+            window = np.asarray(pcm[ws * PCM_SAMPLE_RATE:(ws + 120) * PCM_SAMPLE_RATE])
+            segment = AudioSegment((np.clip(window, -1, 1) * 32767).astype(np.int16).tobytes(), sample_width=2, frame_rate=PCM_SAMPLE_RATE, channels=1)
+            start = time.time()
+            expected = [(s / 1000 + ws, e / 1000 + ws) for s, e in detect_silence(segment, min_silence_len=500, silence_thresh=-30)]
+            pydub_time = time.time() - start
+            got = detector.silence_regions(ws, ws + 120)
+            print(f"   pydub 2min window {pydub_time:.2f}s vs {len(got)} regions, identical: {got == expected}")
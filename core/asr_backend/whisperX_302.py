@@ -3,37 +3,29 @@ import io
 import json
 import time
 import requests
-import librosa
 import soundfile as sf
 from rich import print as rprint
 from core.utils import *
 from core.utils.models import *
+from core.utils.pcm_cache import pcm_slice, PCM_SAMPLE_RATE
 
 OUTPUT_LOG_DIR = "output/log"
 def transcribe_audio_302(raw_audio_path: str, vocal_audio_path: str, start: float = None, end: float = None):
-    os.makedirs(OUTPUT_LOG_DIR, exist_ok=True)
-    LOG_FILE = f"{OUTPUT_LOG_DIR}/whisperx302_{start}_{end}.json"
+    log_dir = job_path(OUTPUT_LOG_DIR)
+    os.makedirs(log_dir, exist_ok=True)
+    LOG_FILE = f"{log_dir}/whisperx302_{start}_{end}.json"
     if os.path.exists(LOG_FILE):
         with open(LOG_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
         
     WHISPER_LANGUAGE = load_key("whisper.language")
-    update_key("whisper.language", WHISPER_LANGUAGE)
     url = "https://api.302.ai/302/whisperx"
     
-    y, sr = librosa.load(vocal_audio_path, sr=16000)
-    audio_duration = len(y) / sr
-    
-    if start is None or end is None:
-        start = 0
-        end = audio_duration
-        
-    start_sample = int(start * sr)
-    end_sample = int(end * sr)
-    y_slice = y[start_sample:end_sample]
+    # only the requested segment is read from the decoded cache
+    y_slice = pcm_slice(vocal_audio_path, start, end)
     
     audio_buffer = io.BytesIO()
-    sf.write(audio_buffer, y_slice, sr, format='WAV', subtype='PCM_16')
+    sf.write(audio_buffer, y_slice, PCM_SAMPLE_RATE, format='WAV', subtype='PCM_16')
     audio_buffer.seek(0)
     
     files = [('audio_input', ('audio_slice.wav', audio_buffer, 'application/octet-stream'))]
@@ -2,11 +2,15 @@ import os
 import warnings
 import time
 import subprocess
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import torch
 import whisperx
-import librosa
 from rich import print as rprint
 from core.utils import *
+from core.utils.pcm_cache import pcm_slice, load_pcm
+from core.utils.job_context import current_job, use_job
 
 warnings.filterwarnings("ignore")
 MODEL_DIR = load_key("model_dir")
@@ -35,88 +39,213 @@ def check_hf_mirror():
     rprint(f"[cyan]🚀 Selected mirror:[/cyan] {fastest_url} ({best_time:.2f}s)")
     return fastest_url
 
+_mirror = None
+
+def use_hf_mirror(mirror=None):
+    """Pick the HuggingFace endpoint once per process instead of pinging for every segment"""
+    global _mirror
+    if mirror is not None:
+        _mirror = mirror
+    elif _mirror is None:
+        _mirror = check_hf_mirror() or "https://huggingface.co"
+    os.environ['HF_ENDPOINT'] = _mirror
+    return _mirror
+
+# ------------
+# transcription session
+# ------------
+
+class WhisperXSession:
+    """Loads the whisper and alignment models once and transcribes any number of segments"""
+
+    def __init__(self, device=None, threads=None, language=None):
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.threads = threads
+        # the configured language picks and presets the model, read in the job that owns the session
+        self.language = language or load_key("whisper.language")
+        self.model_name = load_key("whisper.model")
+        if self.device == "cuda":
+            gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024**3)
+            self.batch_size = 16 if gpu_mem > 8 else 2
+            self.compute_type = "float16" if torch.cuda.is_bf16_supported() else "int8"
+            rprint(f"[cyan]🎮 GPU memory:[/cyan] {gpu_mem:.2f} GB, [cyan]📦 Batch size:[/cyan] {self.batch_size}, [cyan]⚙️ Compute type:[/cyan] {self.compute_type}")
+        else:
+            self.batch_size = 1
+            self.compute_type = "int8"
+            rprint(f"[cyan]📦 Batch size:[/cyan] {self.batch_size}, [cyan]⚙️ Compute type:[/cyan] {self.compute_type}")
+        self._model = None
+        self._align_models = {}
+
+    def _whisper_model(self):
+        if self._model is not None:
+            return self._model
+        use_hf_mirror()
+        if self.language == 'zh':
+            model_name = "Huan69/Belle-whisper-large-v3-zh-punct-fasterwhisper"
+            local_model = os.path.join(MODEL_DIR, "Belle-whisper-large-v3-zh-punct-fasterwhisper")
+        else:
+            model_name = self.model_name
+            local_model = os.path.join(MODEL_DIR, model_name)
+            
+        if os.path.exists(local_model):
+            rprint(f"[green]📥 Loading local WHISPER model:[/green] {local_model} ...")
+            model_name = local_model
+        else:
+            rprint(f"[green]📥 Using WHISPER model from HuggingFace:[/green] {model_name} ...")
+
+        vad_options = {"vad_onset": 0.500,"vad_offset": 0.363}
+        asr_options = {"temperatures": [0],"initial_prompt": "",}
+        whisper_language = None if 'auto' in self.language else self.language
+        rprint("[bold yellow] You can ignore warning of `Model was trained with torch 1.10.0+cu102, yours is 2.0.0+cu118...`[/bold yellow]")
+        kwargs = {"threads": self.threads} if self.threads else {}
+        self._model = whisperx.load_model(model_name, self.device, compute_type=self.compute_type, language=whisper_language, vad_options=vad_options, asr_options=asr_options, download_root=MODEL_DIR, **kwargs)
+        return self._model
+
+    def _align_model(self, language):
+        if language not in self._align_models:
+            use_hf_mirror()
+            self._align_models[language] = whisperx.load_align_model(language_code=language, device=self.device)
+        return self._align_models[language]
+
+    def transcribe(self, raw_audio_file, vocal_audio_file, start, end, language=None):
+        """Transcribe one segment; `language` pins the language detected on an earlier segment"""
+        rprint(f"[green]▶️ Starting WhisperX for segment {start:.2f}s to {end:.2f}s...[/green]")
+        # zero-copy views into the decoded 16kHz cache
+        raw_audio_segment = pcm_slice(raw_audio_file, start, end)
+        vocal_audio_segment = pcm_slice(vocal_audio_file, start, end)
+
+        # -------------------------
+        # 1. transcribe raw audio
+        # -------------------------
+        model = self._whisper_model()
+        transcribe_start_time = time.time()
+        rprint("[bold green]Note: You will see Progress if working correctly ↓[/bold green]")
+        result = model.transcribe(raw_audio_segment, batch_size=self.batch_size, language=language, print_progress=True)
+        transcribe_time = time.time() - transcribe_start_time
+        rprint(f"[cyan]⏱️ time transcribe:[/cyan] {transcribe_time:.2f}s")
+        detected_language = result['language']
+
+        # -------------------------
+        # 2. align by vocal audio
+        # -------------------------
+        align_start_time = time.time()
+        model_a, metadata = self._align_model(detected_language)
+        result = whisperx.align(result["segments"], model_a, metadata, vocal_audio_segment, self.device, return_char_alignments=False)
+        align_time = time.time() - align_start_time
+        rprint(f"[cyan]⏱️ time align:[/cyan] {align_time:.2f}s")
+        result['language'] = detected_language
+
+        # Adjust timestamps
+        for segment in result['segments']:
+            segment['start'] += start
+            segment['end'] += start
+            for word in segment['words']:
+                if 'start' in word:
+                    word['start'] += start
+                if 'end' in word:
+                    word['end'] += start
+        return result
+
+    def close(self):
+        self._model = None
+        self._align_models.clear()
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+# ------------
+# worker pool for the cpu int8 path
+# ------------
+# Each worker loads its own whisper model plus the align model, several GB for
+# large-v3, so by default at most MAX_DEFAULT_CPU_WORKERS run and only as many
+# as fit in RAM. whisper.cpu_workers in config.yaml sets the count explicitly.
+# ------------
+
+MAX_DEFAULT_CPU_WORKERS = 2
+WORKER_MEMORY_GB = 6  # whisper large-v3 int8 + wav2vec2 align model + decoded audio, with headroom
+
+_worker_session = None
+_worker_threads = None
+
+def _init_worker(mirror, threads):
+    global _worker_threads
+    use_hf_mirror(mirror)
+    _worker_threads = threads
+
+def _worker_session_for(whisper_language):
+    """The worker's session for the current job's language and model, reloaded only when they change"""
+    global _worker_session
+    session = _worker_session
+    if session is None or (session.language, session.model_name) != (whisper_language, load_key("whisper.model")):
+        if session is not None:
+            session.close()
+        _worker_session = WhisperXSession(device="cpu", threads=_worker_threads, language=whisper_language)
+    return _worker_session
+
+def _transcribe_in_worker(job, whisper_language, raw_audio_file, vocal_audio_file, start, end, language=None):
+    # spawned workers start in the default job: the config layers, the audio and its decode are the caller's
+    with use_job(job):
+        session = _worker_session_for(whisper_language)
+        return session.transcribe(raw_audio_file, vocal_audio_file, start, end, language=language)
+
+def _total_memory_gb():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024**3)
+    except (AttributeError, ValueError, OSError):
+        return None  # not available on Windows
+
+def _cpu_workers(n_segments):
+    try:
+        workers = int(load_key("whisper.cpu_workers"))
+    except KeyError:
+        # every worker holds its own model copy, so stay well below one per core and within RAM
+        workers = min(MAX_DEFAULT_CPU_WORKERS, (os.cpu_count() or 1) // 4)
+        memory_gb = _total_memory_gb()
+        if memory_gb is not None:
+            workers = min(workers, int(memory_gb // WORKER_MEMORY_GB))
+    return max(1, min(workers, n_segments))
+
 @except_handler("WhisperX processing error:")
-def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
-    os.environ['HF_ENDPOINT'] = check_hf_mirror()
-    WHISPER_LANGUAGE = load_key("whisper.language")
+def transcribe_segments(raw_audio_file, vocal_audio_file, segments):
+    """Transcribe all (start, end) segments with models loaded once, results in segment order.
+
+    The first segment runs alone to detect the language, the rest are pinned to it.
+    On GPU the segments share one session; on CPU they are spread over a process pool.
+    """
+    whisper_language = load_key("whisper.language")
     device = "cuda" if torch.cuda.is_available() else "cpu"
     rprint(f"🚀 Starting WhisperX using device: {device} ...")
-    
-    if device == "cuda":
-        gpu_mem = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-        batch_size = 16 if gpu_mem > 8 else 2
-        compute_type = "float16" if torch.cuda.is_bf16_supported() else "int8"
-        rprint(f"[cyan]🎮 GPU memory:[/cyan] {gpu_mem:.2f} GB, [cyan]📦 Batch size:[/cyan] {batch_size}, [cyan]⚙️ Compute type:[/cyan] {compute_type}")
-    else:
-        batch_size = 1
-        compute_type = "int8"
-        rprint(f"[cyan]📦 Batch size:[/cyan] {batch_size}, [cyan]⚙️ Compute type:[/cyan] {compute_type}")
-    rprint(f"[green]▶️ Starting WhisperX for segment {start:.2f}s to {end:.2f}s...[/green]")
-    
-    if WHISPER_LANGUAGE == 'zh':
-        model_name = "Huan69/Belle-whisper-large-v3-zh-punct-fasterwhisper"
-        local_model = os.path.join(MODEL_DIR, "Belle-whisper-large-v3-zh-punct-fasterwhisper")
-    else:
-        model_name = load_key("whisper.model")
-        local_model = os.path.join(MODEL_DIR, model_name)
-        
-    if os.path.exists(local_model):
-        rprint(f"[green]📥 Loading local WHISPER model:[/green] {local_model} ...")
-        model_name = local_model
-    else:
-        rprint(f"[green]📥 Using WHISPER model from HuggingFace:[/green] {model_name} ...")
-
-    vad_options = {"vad_onset": 0.500,"vad_offset": 0.363}
-    asr_options = {"temperatures": [0],"initial_prompt": "",}
-    whisper_language = None if 'auto' in WHISPER_LANGUAGE else WHISPER_LANGUAGE
-    rprint("[bold yellow] You can ignore warning of `Model was trained with torch 1.10.0+cu102, yours is 2.0.0+cu118...`[/bold yellow]")
-    model = whisperx.load_model(model_name, device, compute_type=compute_type, language=whisper_language, vad_options=vad_options, asr_options=asr_options, download_root=MODEL_DIR)
-
-    def load_audio_segment(audio_file, start, end):
-        audio, _ = librosa.load(audio_file, sr=16000, offset=start, duration=end - start, mono=True)
-        return audio
-    raw_audio_segment = load_audio_segment(raw_audio_file, start, end)
-    vocal_audio_segment = load_audio_segment(vocal_audio_file, start, end)
-    
-    # -------------------------
-    # 1. transcribe raw audio
-    # -------------------------
-    transcribe_start_time = time.time()
-    rprint("[bold green]Note: You will see Progress if working correctly ↓[/bold green]")
-    result = model.transcribe(raw_audio_segment, batch_size=batch_size, print_progress=True)
-    transcribe_time = time.time() - transcribe_start_time
-    rprint(f"[cyan]⏱️ time transcribe:[/cyan] {transcribe_time:.2f}s")
-
-    # Free GPU resources
-    del model
-    torch.cuda.empty_cache()
-
-    # Save language
-    update_key("whisper.language", result['language'])
-    if result['language'] == 'zh' and WHISPER_LANGUAGE != 'zh':
-        raise ValueError("Please specify the transcription language as zh and try again!")
-
-    # -------------------------
-    # 2. align by vocal audio
-    # -------------------------
-    align_start_time = time.time()
-    # Align timestamps using vocal audio
-    model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=device)
-    result = whisperx.align(result["segments"], model_a, metadata, vocal_audio_segment, device, return_char_alignments=False)
-    align_time = time.time() - align_start_time
-    rprint(f"[cyan]⏱️ time align:[/cyan] {align_time:.2f}s")
-
-    # Free GPU resources again
-    torch.cuda.empty_cache()
-    del model_a
-
-    # Adjust timestamps
-    for segment in result['segments']:
-        segment['start'] += start
-        segment['end'] += start
-        for word in segment['words']:
-            if 'start' in word:
-                word['start'] += start
-            if 'end' in word:
-                word['end'] += start
-    return result
\ No newline at end of file
+
+    def save_language(result):
+        set_job_key("whisper.language", result['language'])
+        if result['language'] == 'zh' and whisper_language != 'zh':
+            raise ValueError("Please specify the transcription language as zh and try again!")
+
+    workers = _cpu_workers(len(segments)) if device == "cpu" else 1
+    if workers == 1:
+        session = WhisperXSession(device, language=whisper_language)
+        try:
+            results = [session.transcribe(raw_audio_file, vocal_audio_file, *segments[0])]
+            save_language(results[0])
+            for start, end in segments[1:]:
+                results.append(session.transcribe(raw_audio_file, vocal_audio_file, start, end, language=results[0]['language']))
+        finally:
+            session.close()
+        return results
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # decode up front so the workers only map the cache files
+    load_pcm(raw_audio_file)
+    load_pcm(vocal_audio_file)
+    rprint(f"[cyan]🧵 Transcribing {len(segments)} segments with {workers} workers x {threads} threads[/cyan]")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(use_hf_mirror(), threads)) as pool:
+        job = current_job()
+        # the language as configured before detection, so every worker loads the same model
+        first = pool.submit(_transcribe_in_worker, job, whisper_language, raw_audio_file, vocal_audio_file, *segments[0]).result()
+        save_language(first)
+        pinned = partial(_transcribe_in_worker, job, whisper_language, raw_audio_file, vocal_audio_file, language=first['language'])
+        rest = pool.map(pinned, [start for start, _ in segments[1:]], [end for _, end in segments[1:]])
+        return [first, *rest]
+
+def transcribe_audio(raw_audio_file, vocal_audio_file, start, end):
+    return transcribe_segments(raw_audio_file, vocal_audio_file, [(start, end)])[0]
@@ -1,6 +1,6 @@
 from .split_by_comma import split_by_comma_main
 from .split_by_connector import split_sentences_main
-from .split_by_mark import split_by_mark
+from .split_by_mark import split_by_mark, parse_transcript
 from .split_long_by_root import split_long_by_root_main
 from .load_nlp_model import init_nlp
 
@@ -8,6 +8,7 @@ __all__ = [
     "split_by_comma_main",
     "split_sentences_main",
     "split_by_mark",
+    "parse_transcript",
     "split_long_by_root_main",
     "init_nlp"
 ]
@@ -1,6 +1,6 @@
 import spacy
 from spacy.cli import download
-from core.utils import rprint, load_key, except_handler
+from core.utils import rprint, load_key, except_handler, job_path
 
 SPACY_MODEL_MAP = load_key("spacy_model_map")
 
@@ -31,3 +31,26 @@ def init_nlp():
 SPLIT_BY_COMMA_FILE = "output/log/split_by_comma.txt"
 SPLIT_BY_CONNECTOR_FILE = "output/log/split_by_connector.txt"
 SPLIT_BY_MARK_FILE = "output/log/split_by_mark.txt"
+
+def debug_enabled():
+    try:
+        return bool(load_key("nlp_split.debug"))
+    except KeyError:
+        return False
+
+def save_intermediate(path, sentences):
+    """Keep the output of a split pass for inspection, only with nlp_split.debug on"""
+    if not debug_enabled():
+        return
+    with open(job_path(path), "w", encoding="utf-8") as output_file:
+        output_file.write("\n".join(sentence.text for sentence in sentences))
+    rprint(f"[green]💾 Intermediate sentences saved to →  `{path}`[/green]")
+
+def strip_span(span):
+    """Span without leading and trailing whitespace tokens, the token-level str.strip()"""
+    doc, start, end = span.doc, span.start, span.end
+    while start < end and doc[start].is_space:
+        start += 1
+    while end > start and doc[end - 1].is_space:
+        end -= 1
+    return doc[start:end]
@@ -1,6 +1,5 @@
-import os
 import warnings
-from core.spacy_utils.load_nlp_model import init_nlp, SPLIT_BY_COMMA_FILE, SPLIT_BY_CONNECTOR_FILE
+from core.spacy_utils.load_nlp_model import init_nlp, save_intermediate, strip_span, SPLIT_BY_CONNECTOR_FILE
 from core.utils import rprint
 
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -81,75 +80,45 @@ def analyze_connectors(doc, token):
     else:
         return True, False
 
-def split_by_connectors(text, context_words=5, nlp=None):
-    doc = nlp(text)
-    sentences = [doc.text]  # init
-    
-    while True:
-        # Handle each task with a single cut
-        # avoiding the fragmentation of a sentence into multiple parts at the same time.
-        split_occurred = False
-        new_sentences = []
-        
-        for sent in sentences:
-            doc = nlp(sent)
-            start = 0
-            
-            for i, token in enumerate(doc):
-                split_before, _ = analyze_connectors(doc, token)
-                
-                if i + 1 < len(doc) and doc[i + 1].text in ["'s", "'re", "'ve", "'ll", "'d"]:
-                    continue
-                
-                left_words = doc[max(0, token.i - context_words):token.i]
-                right_words = doc[token.i+1:min(len(doc), token.i + context_words + 1)]
-                
-                left_words = [word.text for word in left_words if not word.is_punct]
-                right_words = [word.text for word in right_words if not word.is_punct]
-                
-                if len(left_words) >= context_words and len(right_words) >= context_words and split_before:
-                    rprint(f"[yellow]✂️  Split before '{token.text}': {' '.join(left_words)}| {token.text} {' '.join(right_words)}[/yellow]")
-                    new_sentences.append(doc[start:token.i].text.strip())
-                    start = token.i
-                    split_occurred = True
-                    break
-            
-            if start < len(doc):
-                new_sentences.append(doc[start:].text.strip())
-        
-        if not split_occurred:
-            break
-        
-        sentences = new_sentences
-    
-    return sentences
+def split_by_connectors(sentence, context_words=5):
+    """Split a sentence span before connectors that open a new clause.
 
-def split_sentences_main(nlp):
-    # Read input sentences
-    with open(SPLIT_BY_COMMA_FILE, "r", encoding="utf-8") as input_file:
-        sentences = input_file.readlines()
-    
-    all_split_sentences = []
-    # Process each input sentence
-    for sentence in sentences:
-        split_sentences = split_by_connectors(sentence.strip(), nlp = nlp)
-        all_split_sentences.extend(split_sentences)
-    
-    with open(SPLIT_BY_CONNECTOR_FILE, "w+", encoding="utf-8") as output_file:
-        for sentence in all_split_sentences:
-            output_file.write(sentence + "\n")
-        # do not add a newline at the end of the file
-        output_file.seek(output_file.tell() - 1, os.SEEK_SET)
-        output_file.truncate()
+    Each cut leaves the part before it final and goes on scanning from the
+    connector, with the context windows clipped to the current part.
+    """
+    doc, end = sentence.doc, sentence.end
+    sentences = []
+    start = sentence.start
 
-    # delete the original file
-    os.remove(SPLIT_BY_COMMA_FILE)
-    
-    rprint(f"[green]💾 Sentences split by connectors saved to →  `{SPLIT_BY_CONNECTOR_FILE}`[/green]")
+    for token in sentence:
+        i = token.i
+        split_before, _ = analyze_connectors(doc, token)
+
+        if i + 1 < end and doc[i + 1].text in ["'s", "'re", "'ve", "'ll", "'d"]:
+            continue
+
+        left_words = doc[max(start, i - context_words):i]
+        right_words = doc[i+1:min(end, i + context_words + 1)]
+
+        left_words = [word.text for word in left_words if not word.is_punct]
+        right_words = [word.text for word in right_words if not word.is_punct]
+
+        if len(left_words) >= context_words and len(right_words) >= context_words and split_before:
+            rprint(f"[yellow]✂️  Split before '{token.text}': {' '.join(left_words)}| {token.text} {' '.join(right_words)}[/yellow]")
+            sentences.append(doc[start:i])
+            start = i
+
+    if start < end:
+        sentences.append(doc[start:end])
+
+    return [strip_span(sent) for sent in sentences]
+
+def split_sentences_main(sentences):
+    all_split_sentences = [sent for sentence in sentences for sent in split_by_connectors(sentence)]
+    save_intermediate(SPLIT_BY_CONNECTOR_FILE, all_split_sentences)
+    return all_split_sentences
 
 if __name__ == "__main__":
     nlp = init_nlp()
-    split_sentences_main(nlp)
-    # nlp = init_nlp()
-    # a = "and show the specific differences that make a difference between a breakaway that results in a goal in the NHL versus one that doesn't."
-    # print(split_by_connectors(a, nlp))
\ No newline at end of file
+    a = "and show the specific differences that make a difference between a breakaway that results in a goal in the NHL versus one that doesn't."
+    print([sent.text for sent in split_by_connectors(nlp(a)[:])])
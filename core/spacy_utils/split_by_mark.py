@@ -1,63 +1,90 @@
-import os
-import pandas as pd
 import warnings
-from core.spacy_utils.load_nlp_model import init_nlp, SPLIT_BY_MARK_FILE
+from spacy.tokens import Doc
+from core.spacy_utils.load_nlp_model import init_nlp, save_intermediate, strip_span, SPLIT_BY_MARK_FILE
 from core.utils.config_utils import load_key, get_joiner
+from core.utils.artifacts import load_table
+from core.utils.models import _2_CLEANED_CHUNKS
 from rich import print as rprint
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-def split_by_mark(nlp):
+# the transcript is parsed in blocks of about this many characters, cut after a sentence end
+BLOCK_CHARS = 20000
+MAX_BLOCK_CHARS = 200000  # cut anyway, far below spaCy's nlp.max_length
+PIPE_BATCH_SIZE = 8
+SENTENCE_ENDS = ('.', '!', '?', '。', '！', '？')
+PUNCT_ONLY = [',', '.', '，', '。', '？', '！']
+
+def _n_process():
+    try:
+        return int(load_key("nlp_split.n_process"))
+    except KeyError:
+        return 1
+
+def _is_block_end(word):
+    """A word that surely ends a sentence; abbreviations like Mr. or U.S. do not"""
+    if not word.endswith(SENTENCE_ENDS) or word.endswith('...'):
+        return False
+    body = word.rstrip(''.join(SENTENCE_ENDS))
+    return not body.isascii() or (len(body) > 3 and '.' not in body)
+
+def _blocks(words, joiner):
+    block, size = [], 0
+    for word in words:
+        block.append(word)
+        size += len(word) + len(joiner)
+        if (size >= BLOCK_CHARS and _is_block_end(word)) or size >= MAX_BLOCK_CHARS:
+            yield joiner.join(block)
+            block, size = [], 0
+    if block:
+        yield joiner.join(block)
+
+def parse_transcript(nlp):
+    """Parse the whole transcript once, streaming blocks through nlp.pipe, into a single Doc"""
     whisper_language = load_key("whisper.language")
     language = load_key("whisper.detected_language") if whisper_language == 'auto' else whisper_language # consider force english case
     joiner = get_joiner(language)
     rprint(f"[blue]🔍 Using {language} language joiner: '{joiner}'[/blue]")
-    chunks = pd.read_excel("output/log/cleaned_chunks.xlsx")
-    chunks.text = chunks.text.apply(lambda x: x.strip('"').strip(""))
-    
-    # join with joiner
-    input_text = joiner.join(chunks.text.to_list())
+    chunks = load_table(_2_CLEANED_CHUNKS)
+    words = chunks.text.apply(lambda x: x.strip('"').strip("")).to_list()
 
-    doc = nlp(input_text)
+    docs = list(nlp.pipe(_blocks(words, joiner), batch_size=PIPE_BATCH_SIZE, n_process=_n_process())) or [nlp("")]
+    # joining the blocks puts the joiner back between them, as if the text had been parsed in one piece
+    doc = docs[0] if len(docs) == 1 else Doc.from_docs(docs, ensure_whitespace=bool(joiner))
     assert doc.has_annotation("SENT_START")
+    return doc
 
-    # skip - and ...
-    sentences_by_mark = []
-    current_sentence = []
-    
-    # iterate all sentences
+def split_by_mark(doc):
+    """Sentences of the parsed transcript, keeping - and ... continuations together"""
+    groups = []  # [start, end, last sentence text, text]
     for sent in doc.sents:
         text = sent.text.strip()
-        
+
         # check if the current sentence ends with - or ...
-        if current_sentence and (
-            text.startswith('-') or 
+        if groups and (
+            text.startswith('-') or
             text.startswith('...') or
-            current_sentence[-1].endswith('-') or
-            current_sentence[-1].endswith('...')
+            groups[-1][2].endswith('-') or
+            groups[-1][2].endswith('...')
         ):
-            current_sentence.append(text)
+            groups[-1][1:] = [sent.end, text, f"{groups[-1][3]} {text}"]
+        else:
+            groups.append([sent.start, sent.end, text, text])
+
+    sentences = []
+    for start, end, _, text in groups:
+        if sentences and text.strip() in PUNCT_ONLY:
+            # ! If the current line contains only punctuation, merge it with the previous line, this happens in Chinese, Japanese, etc.
+            sentences[-1] = doc[sentences[-1].start:end]
         else:
-            if current_sentence:
-                sentences_by_mark.append(' '.join(current_sentence))
-                current_sentence = []
-            current_sentence.append(text)
-    
-    # add the last sentence
-    if current_sentence:
-        sentences_by_mark.append(' '.join(current_sentence))
-
-    with open(SPLIT_BY_MARK_FILE, "w", encoding="utf-8") as output_file:
-        for i, sentence in enumerate(sentences_by_mark):
-            if i > 0 and sentence.strip() in [',', '.', '，', '。', '？', '！']:
-                # ! If the current line contains only punctuation, merge it with the previous line, this happens in Chinese, Japanese, etc.
-                output_file.seek(output_file.tell() - 1, os.SEEK_SET)  # Move to the end of the previous line
-                output_file.write(sentence)  # Add the punctuation
-            else:
-                output_file.write(sentence + "\n")
-    
-    rprint(f"[green]💾 Sentences split by punctuation marks saved to →  `{SPLIT_BY_MARK_FILE}`[/green]")
+            sentences.append(doc[start:end])
+
+    sentences = [strip_span(sentence) for sentence in sentences]
+    save_intermediate(SPLIT_BY_MARK_FILE, sentences)
+    rprint(f"[green]✂️  Split by punctuation marks into {len(sentences)} sentences[/green]")
+    return sentences
 
 if __name__ == "__main__":
     nlp = init_nlp()
-    split_by_mark(nlp)
+    for sentence in split_by_mark(parse_transcript(nlp)):
+        print(sentence.text)
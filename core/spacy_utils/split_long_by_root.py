@@ -1,15 +1,14 @@
-import os
 import string
 import warnings
-from core.spacy_utils.load_nlp_model import init_nlp, SPLIT_BY_CONNECTOR_FILE
+from core.spacy_utils.load_nlp_model import init_nlp
 from core.utils import *
 from core.utils.models import _3_1_SPLIT_BY_NLP
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-def split_long_sentence(doc):
-    tokens = [token.text for token in doc]
-    n = len(tokens)
+def long_split_points(doc):
+    """Token ranges of the fewest parts of at least 30 tokens, cut after a verb or root"""
+    n = len(doc)
     
     # dynamic programming array, dp[i] represents the optimal split scheme from the start to the ith token
     dp = [float('inf')] * (n + 1)
@@ -22,23 +21,29 @@ def split_long_sentence(doc):
         for j in range(max(0, i - 100), i):  # limit search range to avoid overly long sentences
             if i - j >= 30:  # ensure sentence length is at least 30
                 token = doc[i-1]
-                if j == 0 or (token.is_sent_end or token.pos_ in ['VERB', 'AUX'] or token.dep_ == 'ROOT'):
+                # the end of the span counts as a sentence end even inside a longer sentence of the doc
+                if j == 0 or (i == n or token.is_sent_end or token.pos_ in ['VERB', 'AUX'] or token.dep_ == 'ROOT'):
                     if dp[j] + 1 < dp[i]:
                         dp[i] = dp[j] + 1
                         prev[i] = j
     
     # rebuild sentences based on optimal split points
-    sentences = []
+    points = []
     i = n
-    whisper_language = load_key("whisper.language")
-    language = load_key("whisper.detected_language") if whisper_language == 'auto' else whisper_language # consider force english case
-    joiner = get_joiner(language)
     while i > 0:
         j = prev[i]
-        sentences.append(joiner.join(tokens[j:i]).strip())
+        points.append((j, i))
         i = j
     
-    return sentences[::-1]  # reverse list to keep original order
+    return points[::-1]  # reverse list to keep original order
+
+def split_long_sentence(doc, points=None):
+    points = points or long_split_points(doc)
+    tokens = [token.text for token in doc]
+    whisper_language = load_key("whisper.language")
+    language = load_key("whisper.detected_language") if whisper_language == 'auto' else whisper_language # consider force english case
+    joiner = get_joiner(language)
+    return [joiner.join(tokens[j:i]).strip() for j, i in points]
 
 def split_extremely_long_sentence(doc):
     tokens = [token.text for token in doc]
@@ -61,25 +66,23 @@ def split_extremely_long_sentence(doc):
     return sentences
 
 
-def split_long_by_root_main(nlp):
-    with open(SPLIT_BY_CONNECTOR_FILE, "r", encoding="utf-8") as input_file:
-        sentences = input_file.readlines()
-
+def split_long_by_root_main(sentences):
     all_split_sentences = []
     for sentence in sentences:
-        doc = nlp(sentence.strip())
-        if len(doc) > 60:
-            split_sentences = split_long_sentence(doc)
-            if any(len(nlp(sent)) > 60 for sent in split_sentences):
-                split_sentences = [subsent for sent in split_sentences for subsent in split_extremely_long_sentence(nlp(sent))]
+        if len(sentence) > 60:
+            points = long_split_points(sentence)
+            if any(i - j > 60 for j, i in points):
+                split_sentences = [subsent for j, i in points for subsent in split_extremely_long_sentence(sentence[j:i])]
+            else:
+                split_sentences = split_long_sentence(sentence, points)
             all_split_sentences.extend(split_sentences)
-            rprint(f"[yellow]✂️  Splitting long sentences by root: {sentence[:30]}...[/yellow]")
+            rprint(f"[yellow]✂️  Splitting long sentences by root: {sentence.text[:30]}...[/yellow]")
         else:
-            all_split_sentences.append(sentence.strip())
+            all_split_sentences.append(sentence.text)
 
     punctuation = string.punctuation + "'" + '"'  # include all punctuation and apostrophe ' and "
 
-    with open(_3_1_SPLIT_BY_NLP, "w", encoding="utf-8") as output_file:
+    with open(job_path(_3_1_SPLIT_BY_NLP), "w", encoding="utf-8") as output_file:
         for i, sentence in enumerate(all_split_sentences):
             stripped_sentence = sentence.strip()
             if not stripped_sentence or all(char in punctuation for char in stripped_sentence):
@@ -89,16 +92,10 @@ def split_long_by_root_main(nlp):
                 continue
             output_file.write(sentence + "\n")
 
-    # delete the original file
-    os.remove(SPLIT_BY_CONNECTOR_FILE)   
-
     rprint(f"[green]💾 Long sentences split by root saved to →  {_3_1_SPLIT_BY_NLP}[/green]")
 
 if __name__ == "__main__":
     nlp = init_nlp()
-    split_long_by_root_main(nlp)
-    # raw = "平口さんの盛り上げごまが初めて売れました本当に嬉しいです本当にやっぱり見た瞬間いいって言ってくれるそういうコマを作るのがやっぱりいいですよねその2ヶ月後チコさんが何やらそわそわしていましたなんか気持ち悪いやってきたのは平口さんの駒の評判を聞きつけた愛知県の収集家ですこの男性師匠大沢さんの駒も持っているといいますちょっと褒めすぎかなでも確実にファンは広がっているようです自信がない部分をすごく感じてたのでこれで自信を持って進んでくれるなっていう本当に始まったばっかりこれからいろいろ挑戦していってくれるといいなと思って今月平口さんはある場所を訪れましたこれまで数々のタイトル戦でコマを提供してきた老舗5番手平口さんのコマを扱いたいと言いますいいですねぇ困ってだんだん成長しますので大切に使ってそういう長く良い駒になる駒ですね商談が終わった後店主があるものを取り出しましたこの前の名人戦で使った駒があるんですけど去年、名人銭で使われた盛り上げごま低く盛り上げて品良くするというのは難しい素晴らしいですね平口さんが目指す高みですこういった感じで作れればまだまだですけどただ、多分、咲く。"
-    # nlp = init_nlp()
-    # doc = nlp(raw.strip())
-    # for sent in split_still_long_sentence(doc):
-    #     print(sent, '\n==========')
+    raw = "平口さんの盛り上げごまが初めて売れました本当に嬉しいです本当にやっぱり見た瞬間いいって言ってくれるそういうコマを作るのがやっぱりいいですよねその2ヶ月後チコさんが何やらそわそわしていましたなんか気持ち悪いやってきたのは平口さんの駒の評判を聞きつけた愛知県の収集家ですこの男性師匠大沢さんの駒も持っているといいますちょっと褒めすぎかなでも確実にファンは広がっているようです自信がない部分をすごく感じてたのでこれで自信を持って進んでくれるなっていう本当に始まったばっかりこれからいろいろ挑戦していってくれるといいなと思って今月平口さんはある場所を訪れましたこれまで数々のタイトル戦でコマを提供してきた老舗5番手平口さんのコマを扱いたいと言いますいいですねぇ困ってだんだん成長しますので大切に使ってそういう長く良い駒になる駒ですね商談が終わった後店主があるものを取り出しましたこの前の名人戦で使った駒があるんですけど去年、名人銭で使われた盛り上げごま低く盛り上げて品良くするというのは難しい素晴らしいですね平口さんが目指す高みですこういった感じで作れればまだまだですけどただ、多分、咲く。"
+    for sent in split_long_sentence(nlp(raw.strip())[:]):
+        print(sent, '\n==========')
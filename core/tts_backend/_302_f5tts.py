@@ -1,14 +1,19 @@
-import http.client
-import json
 import os
+import asyncio
 import requests
+from threading import Lock
 from pydub import AudioSegment
 from core.asr_backend.audio_preprocess import normalize_audio_volume
 from core.utils import *
 from core.utils.models import *
+from core.tts_backend.tts_cache import cached_tts
+from core.tts_backend.tts_client import get_tts_client, run_sync, PROVIDER_302
+from pathlib import Path
 
 API_KEY = load_key("f5tts.302_api")
-UPLOADED_REFER_URL = None
+# uploaded reference audio per job workspace, each video has its own voice
+_uploaded_refer_urls = {}
+_refer_lock = Lock()
 
 def upload_file_to_302(file_path):
     API_KEY = load_key("f5tts.302_api")
@@ -26,30 +31,26 @@ def upload_file_to_302(file_path):
         return None
     return None
 
-def _f5_tts(text: str, refer_url: str, save_path: str) -> bool:
-    conn = http.client.HTTPSConnection("api.302.ai")
-    payload = json.dumps({"gen_text": text, "ref_audio_url": refer_url, "model_type": "F5-TTS"})
+async def _f5_tts_async(text: str, refer_url: str, save_path: str) -> bool:
+    client = get_tts_client()
+    payload = {"gen_text": text, "ref_audio_url": refer_url, "model_type": "F5-TTS"}
     headers = {'Authorization': f'Bearer {API_KEY}', 'Content-Type': 'application/json'}
 
-    conn.request("POST", "/302/submit/f5-tts", payload, headers)
-    res = conn.getresponse()
-    data = json.loads(res.read().decode("utf-8"))
+    response = await client.request(PROVIDER_302, "POST", "https://api.302.ai/302/submit/f5-tts", json=payload, headers=headers)
+    data = response.json()
     
     if "audio_url" in data and "url" in data["audio_url"]:
         # Download audio file
-        audio_url = data["audio_url"]["url"]
-        audio_conn = http.client.HTTPSConnection("file.302.ai")
-        audio_conn.request("GET", audio_url.replace("https://file.302.ai", ""))
-        audio_res = audio_conn.getresponse()
-        
-        with open(save_path, "wb") as f: 
-            f.write(audio_res.read())
+        await client.request(PROVIDER_302, "GET", data["audio_url"]["url"], save_path=save_path)
         print(f"Audio file saved to {save_path}")
         return True
     
     print("Request failed:", data)
     return False
 
+def _f5_tts(text: str, refer_url: str, save_path: str) -> bool:
+    return run_sync(_f5_tts_async(text, refer_url, save_path))
+
 def _merge_audio(files, output: str) -> bool:
     """Merge audio files, add a brief silence"""
     try:
@@ -75,10 +76,8 @@ def _merge_audio(files, output: str) -> bool:
         rprint(f"[red]Failed to merge audio: {str(e)}")
         return False
     
-def _get_ref_audio(task_df, min_duration=8, max_duration=14.5) -> str:
-    """Get reference audio, ensuring the combined audio duration is > min_duration and < max_duration"""
-    rprint(f"[blue]🎯 Starting reference audio selection process...")
-    
+def _select_ref_rows(task_df, min_duration=8, max_duration=14.5):
+    """Rows whose audio makes up the reference, combined duration > min_duration and < max_duration"""
     duration = 0
     selected = []
     
@@ -96,6 +95,13 @@ def _get_ref_audio(task_df, min_duration=8, max_duration=14.5) -> str:
         # Once we exceed min duration and are under max, we're done
         if duration > min_duration and duration < max_duration:
             break
+    return selected, duration
+
+def _get_ref_audio(task_df, min_duration=8, max_duration=14.5) -> str:
+    """Get reference audio, ensuring the combined audio duration is > min_duration and < max_duration"""
+    rprint(f"[blue]🎯 Starting reference audio selection process...")
+    
+    selected, duration = _select_ref_rows(task_df, min_duration, max_duration)
     
     if not selected:
         rprint(f"[red]❌ No valid segments found (could not reach minimum {min_duration}s duration)")
@@ -103,10 +109,10 @@ def _get_ref_audio(task_df, min_duration=8, max_duration=14.5) -> str:
         
     rprint(f"[blue]📊 Selected {len(selected)} segments, total duration: {duration:.2f}s")
     
-    audio_files = [f"{_AUDIO_REFERS_DIR}/{row['number']}.wav" for row in selected]
+    audio_files = [job_path(f"{_AUDIO_REFERS_DIR}/{row['number']}.wav") for row in selected]
     rprint(f"[yellow]🎵 Audio files to merge: {audio_files}")
     
-    combined_audio = f"{_AUDIO_REFERS_DIR}/refer.wav"
+    combined_audio = job_path(f"{_AUDIO_REFERS_DIR}/refer.wav")
     success = _merge_audio(audio_files, combined_audio)
     
     if not success:
@@ -117,23 +123,34 @@ def _get_ref_audio(task_df, min_duration=8, max_duration=14.5) -> str:
     
     return combined_audio
 
-def f5_tts_for_videolingo(text: str, save_as: str, number: int, task_df):
-    global UPLOADED_REFER_URL
-    
-    # Only process the reference audio if we haven't uploaded it yet
-    if UPLOADED_REFER_URL is None:
-        refer_path = _get_ref_audio(task_df)
-        normalized_refer_path = normalize_audio_volume(refer_path, f"{_AUDIO_REFERS_DIR}/refer_normalized.wav")
-        UPLOADED_REFER_URL = upload_file_to_302(normalized_refer_path)
-        rprint(f"[green]✅ Reference audio uploaded, URL cached for reuse")
-    
+def _references(number, task_df):
+    selected, _ = _select_ref_rows(task_df)
+    return [Path(f"{_AUDIO_REFERS_DIR}/{row['number']}.wav") for row in selected]
+
+def _upload_refer(task_df):
+    root = current_job().root
+    with _refer_lock:
+        # Only process the reference audio if we haven't uploaded it yet
+        if _uploaded_refer_urls.get(root) is None:
+            refer_path = _get_ref_audio(task_df)
+            normalized_refer_path = normalize_audio_volume(refer_path, f"{_AUDIO_REFERS_DIR}/refer_normalized.wav")
+            _uploaded_refer_urls[root] = upload_file_to_302(normalized_refer_path)
+            rprint(f"[green]✅ Reference audio uploaded, URL cached for reuse")
+    return _uploaded_refer_urls[root]
+
+@cached_tts("f5tts", references=_references)
+async def f5_tts_for_videolingo_async(text: str, save_as: str, number: int, task_df):
+    refer_url = _uploaded_refer_urls.get(current_job().root) or await asyncio.to_thread(_upload_refer, task_df)
     try:
-        success = _f5_tts(text=text, refer_url=UPLOADED_REFER_URL, save_path=save_as)
+        success = await _f5_tts_async(text=text, refer_url=refer_url, save_path=save_as)
         return success
     except Exception as e:
         print(f"Error in f5_tts_for_videolingo: {str(e)}")
         return False
 
+def f5_tts_for_videolingo(text: str, save_as: str, number: int, task_df):
+    return run_sync(f5_tts_for_videolingo_async(text, save_as, number, task_df))
+
 if __name__ == "__main__":
     test_refer_url = "https://file.302.ai/gpt/imgs/20250226/717e574dc8e440e3b6f8cb4b3acb40e0.mp3"
     test_text = "Hello, world!"
@@ -1,7 +1,9 @@
-import requests
 from core.utils import load_key
+from core.tts_backend.tts_cache import cached_tts
+from core.tts_backend.tts_client import get_tts_client, run_sync, PROVIDER_302
 
-def azure_tts(text: str, save_path: str) -> None:
+@cached_tts("azure_tts")
+async def azure_tts_async(text: str, save_path: str) -> None:
     url = "https://api.302.ai/cognitiveservices/v1"
     
     API_KEY = load_key("azure_tts.api_key")
@@ -14,11 +16,11 @@ def azure_tts(text: str, save_path: str) -> None:
        'Content-Type': 'application/ssml+xml'
     }
 
-    response = requests.request("POST", url, headers=headers, data=payload)
-
-    with open(save_path, 'wb') as f:
-        f.write(response.content)
+    await get_tts_client().request(PROVIDER_302, "POST", url, save_path=save_path, headers=headers, content=payload.encode('utf-8'))
     print(f"Audio saved to {save_path}")
 
+def azure_tts(text: str, save_path: str) -> None:
+    return run_sync(azure_tts_async(text, save_path))
+
 if __name__ == "__main__":
-    azure_tts("Hi! Welcome to VideoLingo!", "test.wav")
\ No newline at end of file
+    azure_tts("Hi! Welcome to VideoLingo!", "test.wav")
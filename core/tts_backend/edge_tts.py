@@ -1,7 +1,9 @@
+import os
 from pathlib import Path
-import edge_tts
+from edge_tts import Communicate
 from core.utils import *
-import subprocess
+from core.tts_backend.tts_cache import cached_tts
+from core.tts_backend.tts_client import get_tts_client, run_sync, PROVIDER_EDGE
 
 # Available voices can be listed using edge-tts --list-voices command
 # Common English voices:
@@ -12,7 +14,12 @@ import subprocess
 # zh-CN-XiaoxiaoNeural - Female
 # zh-CN-YunxiNeural - Male
 # zh-CN-XiaoyiNeural - Female
-def edge_tts(text, save_path):
+
+# Lines are synthesized in process with edge_tts.Communicate on the shared TTS
+# event loop, instead of starting the edge-tts CLI (a new interpreter and a new
+# websocket) per line. Concurrency is bounded by tts_concurrency.edge.
+@cached_tts("edge_tts")
+async def edge_tts_async(text, save_path):
     # Load settings from config file
     edge_set = load_key("edge_tts")
     voice = edge_set.get("voice", "en-US-JennyNeural")
@@ -21,9 +28,14 @@ def edge_tts(text, save_path):
     speech_file_path = Path(save_path)
     speech_file_path.parent.mkdir(parents=True, exist_ok=True)
     
-    cmd = ["edge-tts", "--voice", voice, "--text", text, "--write-media", str(speech_file_path)]
-    subprocess.run(cmd, check=True)
+    tmp_file = f"{speech_file_path}.part"
+    async with get_tts_client().semaphore(PROVIDER_EDGE):
+        await Communicate(text, voice).save(tmp_file)
+    os.replace(tmp_file, speech_file_path)
     print(f"Audio saved to {speech_file_path}")
 
+def edge_tts(text, save_path):
+    return run_sync(edge_tts_async(text, save_path))
+
 if __name__ == "__main__":
     edge_tts("Today is a good day!", "edge_tts.wav")
@@ -1,12 +1,36 @@
 import syllables
 from pypinyin import pinyin, Style
-from g2p_en import G2p
+from functools import lru_cache
 from typing import Optional
 import re
 
+# ------------
+# speaking duration estimate
+# ------------
+# Text is split once into words/clauses and punctuation/space runs. Each
+# distinct segment is classified and counted only once per estimator (LRU
+# caches), so subtitles that reuse the same words cost little more than a
+# dict lookup. g2p_en is loaded on first use only, for words `syllables`
+# cannot handle.
+# ------------
+
+SEGMENT_CACHE_SIZE = 200000
+WORD_CACHE_SIZE = 100000
+
+_HAN_ONLY = re.compile(r'[^\u4e00-\u9fff]')
+_JA_YOON = re.compile(r'[きぎしじちぢにひびぴみり][ょゅゃ]')
+_JA_SILENT = re.compile(r'[っー]')
+_JA_MORA = re.compile(r'[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff]')
+_KO_SYLLABLE = re.compile(r'[\uac00-\ud7af]')
+_FR_MUTE_E = re.compile(r'e\b')
+_VOWEL_GROUPS = {
+    'fr': re.compile('[aeiouyàâéèêëîïôùûüÿœæ]+'),
+    'es': re.compile('[aeiouáéíóúü]+'),
+}
+
 class AdvancedSyllableEstimator:
     def __init__(self):
-        self.g2p_en = G2p()
+        self._g2p_en = None
         self.duration_params = {'en': 0.225, 'zh': 0.21, 'ja': 0.21, 'fr': 0.22, 'es': 0.22, 'ko': 0.21, 'default': 0.22}
         self.lang_patterns = {
             'zh': r'[\u4e00-\u9fff]', 'ja': r'[\u3040-\u309f\u30a0-\u30ff]',
@@ -16,6 +40,22 @@ class AdvancedSyllableEstimator:
             'mid': r'[，；：,;、]+', 'end': r'[。！？.!?]+', 'space': r'\s+',
             'pause': {'space': 0.15, 'default': 0.1}
         }
+        # one scan finds every script present, the first language in lang_patterns order wins
+        self._priority = {lang: i for i, lang in enumerate(self.lang_patterns)}
+        self._script = re.compile('|'.join(f'(?P<{lang}>{p})' for lang, p in self.lang_patterns.items()))
+        self._split = re.compile(f"({self.punctuation['space']}|{self.punctuation['mid']}|{self.punctuation['end']})")
+        self._space = re.compile(self.punctuation['space'])
+        # a space is only heard next to scripts written without spaces
+        self._pause_langs = {lang for lang, joiner in self.lang_joiners.items() if joiner == ''}
+        self._segment_info = lru_cache(maxsize=SEGMENT_CACHE_SIZE)(self._analyze_segment)
+        self._word_syllables = lru_cache(maxsize=WORD_CACHE_SIZE)(self._english_word_syllables)
+
+    @property
+    def g2p_en(self):
+        if self._g2p_en is None:
+            from g2p_en import G2p
+            self._g2p_en = G2p()
+        return self._g2p_en
 
     def estimate_duration(self, text: str, lang: Optional[str] = None) -> float:
         syllable_count = self.count_syllables(text, lang)
@@ -24,42 +64,75 @@ class AdvancedSyllableEstimator:
     def count_syllables(self, text: str, lang: Optional[str] = None) -> int:
         if not text.strip(): return 0
         lang = lang or self._detect_language(text)
-        
-        vowels_map = {
-            'fr': 'aeiouyàâéèêëîïôùûüÿœæ',
-            'es': 'aeiouáéíóúü'
-        }
-        
+
         if lang == 'en':
             return self._count_english_syllables(text)
         elif lang == 'zh':
-            text = re.sub(r'[^\u4e00-\u9fff]', '', text)
+            text = _HAN_ONLY.sub('', text)
             return len(pinyin(text, style=Style.NORMAL))
         elif lang == 'ja':
-            text = re.sub(r'[きぎしじちぢにひびぴみり][ょゅゃ]', 'X', text)
-            text = re.sub(r'[っー]', '', text)
-            return len(re.findall(r'[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff]', text))
+            text = _JA_YOON.sub('X', text)
+            text = _JA_SILENT.sub('', text)
+            return len(_JA_MORA.findall(text))
         elif lang in ('fr', 'es'):
-            text = re.sub(r'e\b', '', text.lower()) if lang == 'fr' else text.lower()
-            return max(1, len(re.findall(f'[{vowels_map[lang]}]+', text)))
+            text = _FR_MUTE_E.sub('', text.lower()) if lang == 'fr' else text.lower()
+            return max(1, len(_VOWEL_GROUPS[lang].findall(text)))
         elif lang == 'ko':
-            return len(re.findall(r'[\uac00-\ud7af]', text))
+            return len(_KO_SYLLABLE.findall(text))
         return len(text.split())
 
+    def _english_word_syllables(self, word: str) -> int:
+        try:
+            return syllables.estimate(word)
+        except Exception:
+            phones = self.g2p_en(word)
+            return max(1, len([p for p in phones if any(c in p for c in 'aeiou')]))
+
     def _count_english_syllables(self, text: str) -> int:
-        total = 0
-        for word in text.strip().split():
-            try:
-                total += syllables.estimate(word)
-            except:
-                phones = self.g2p_en(word)
-                total += max(1, len([p for p in phones if any(c in p for c in 'aeiou')]))
-        return max(1, total)
+        return max(1, sum(self._word_syllables(word) for word in text.strip().split()))
 
     def _detect_language(self, text: str) -> str:
-        for lang, pattern in self.lang_patterns.items():
-            if re.search(pattern, text): return lang
-        return 'en'
+        best = None
+        for match in self._script.finditer(text):
+            lang = match.lastgroup
+            if best is None or self._priority[lang] < self._priority[best]:
+                best = lang
+                if self._priority[lang] == 0:
+                    break
+        return best or 'en'
+
+    def _analyze_segment(self, segment: str):
+        lang = self._detect_language(segment)
+        return lang, self.count_syllables(segment, lang)
+
+    def _walk(self, text: str):
+        """Yield (segment, lang, syllables, pause) in text order; lang is None for a pause"""
+        segments = self._split.split(text)
+        info = self._segment_info
+        # split() alternates text and separator, separators sit at odd indices
+        for i, segment in enumerate(segments):
+            if i % 2:
+                if self._space.match(segment):
+                    if info(segments[i - 1])[0] in self._pause_langs or info(segments[i + 1])[0] in self._pause_langs:
+                        yield segment, None, 0, self.punctuation['pause']['space']
+                else:
+                    yield segment, None, 0, self.punctuation['pause']['default']
+            elif segment:
+                lang, count = info(segment)
+                yield segment, lang, count, 0
+
+    def _text_duration(self, text) -> float:
+        if not text or not isinstance(text, str):
+            return 0
+        total_duration = 0
+        default = self.duration_params['default']
+        for _, lang, count, pause in self._walk(text):
+            total_duration += pause if lang is None else count * self.duration_params.get(lang, default)
+        return total_duration
+
+    def estimate_many(self, texts) -> list:
+        """Estimated speaking durations of many subtitle lines, same values as process_mixed_text"""
+        return [self._text_duration(text) for text in texts]
 
     def process_mixed_text(self, text: str) -> dict:
         if not text or not isinstance(text, str):
@@ -70,39 +143,27 @@ class AdvancedSyllableEstimator:
                 'spaces': [],
                 'estimated_duration': 0
             }
-            
+
         result = {'language_breakdown': {}, 'total_syllables': 0, 'punctuation': [], 'spaces': []}
-        segments = re.split(f"({self.punctuation['space']}|{self.punctuation['mid']}|{self.punctuation['end']})", text)
         total_duration = 0
-        
-        for i, segment in enumerate(segments):
-            if not segment: continue
-            
-            if re.match(self.punctuation['space'], segment):
-                prev_lang = self._detect_language(segments[i-1]) if i > 0 else None
-                next_lang = self._detect_language(segments[i+1]) if i < len(segments)-1 else None
-                if prev_lang and next_lang and (self.lang_joiners[prev_lang] == '' or self.lang_joiners[next_lang] == ''):
-                    result['spaces'].append(segment)
-                    total_duration += self.punctuation['pause']['space']
-            elif re.match(f"{self.punctuation['mid']}|{self.punctuation['end']}", segment):
-                result['punctuation'].append(segment)
-                total_duration += self.punctuation['pause']['default']
-            else:
-                lang = self._detect_language(segment)
-                if lang:
-                    syllables = self.count_syllables(segment, lang)
-                    if lang not in result['language_breakdown']:
-                        result['language_breakdown'][lang] = {'syllables': 0, 'text': ''}
-                    result['language_breakdown'][lang]['syllables'] += syllables
-                    result['language_breakdown'][lang]['text'] += (self.lang_joiners[lang] + segment 
-                        if result['language_breakdown'][lang]['text'] else segment)
-                    result['total_syllables'] += syllables
-                    total_duration += syllables * self.duration_params.get(lang, self.duration_params['default'])
-        
+
+        for segment, lang, count, pause in self._walk(text):
+            if lang is None:
+                result['spaces' if self._space.match(segment) else 'punctuation'].append(segment)
+                total_duration += pause
+                continue
+            if lang not in result['language_breakdown']:
+                result['language_breakdown'][lang] = {'syllables': 0, 'text': ''}
+            result['language_breakdown'][lang]['syllables'] += count
+            result['language_breakdown'][lang]['text'] += (self.lang_joiners[lang] + segment
+                if result['language_breakdown'][lang]['text'] else segment)
+            result['total_syllables'] += count
+            total_duration += count * self.duration_params.get(lang, self.duration_params['default'])
+
         result['estimated_duration'] = total_duration
-        
+
         return result
-    
+
 def init_estimator():
     return AdvancedSyllableEstimator()
 
@@ -111,8 +172,15 @@ def estimate_duration(text: str, estimator: AdvancedSyllableEstimator):
         return 0
     return estimator.process_mixed_text(text)['estimated_duration']
 
+def estimate_many(texts, estimator: AdvancedSyllableEstimator):
+    return estimator.estimate_many(texts)
+
 # 使用示例
 if __name__ == "__main__":
+    import sys
+    import time
+    import random
+
     estimator = init_estimator()
     print(estimate_duration('你好', estimator))
 
@@ -126,7 +194,7 @@ if __name__ == "__main__":
         # "I couldn't help but notice the vibrant colors of the autumn leaves cascading gently from the trees"
         "가을 나뭇잎이 부드럽게 떨어지는 생생한 색깔을 주목하지 않을 수 없었다"
     ]
-    
+
     for text in test_cases:
         result = estimator.process_mixed_text(text)
         print(f"\nText: {text}")
@@ -136,4 +204,31 @@ if __name__ == "__main__":
         for lang, info in result['language_breakdown'].items():
             print(f"- {lang}: {info['syllables']} syllables ({info['text']})")
         print(f"Punctuation: {result['punctuation']}")
-        print(f"Spaces: {result['spaces']}")
\ No newline at end of file
+        print(f"Spaces: {result['spaces']}")
+
+    # throughput: python -m core.tts_backend.estimate_duration [lines]
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    phrases = [
+        "I couldn't help but notice the vibrant colors of the autumn leaves.",
+        "So, what we're going to do today is build a small web server!",
+        "我们需要在输出中体现空格的停顿时间，所以先测试一下。",
+        "The weather is nice 所以我们去公园",
+        "今日はとても良い天気ですね、散歩しましょう。",
+        "가을 나뭇잎이 부드럽게 떨어지는 생생한 색깔을 주목하지 않을 수 없었다",
+        "C'est très intéressant, n'est-ce pas? Voilà pourquoi.",
+        "¿Cómo estás? Mañana vamos a la playa.",
+    ]
+    rng = random.Random(0)
+    lines = [' '.join(rng.sample(phrases, rng.randint(1, 2))) for _ in range(n_lines)]
+
+    start = time.perf_counter()
+    single = [estimate_duration(line, estimator) for line in lines[:1000]]
+    per_line = (time.perf_counter() - start) / 1000
+
+    for label, est in (('cold', init_estimator()), ('warm', estimator)):
+        start = time.perf_counter()
+        batch = estimate_many(lines, est)
+        elapsed = time.perf_counter() - start
+        print(f"estimate_many ({label}): {n_lines} lines in {elapsed:.3f}s, {n_lines / elapsed:,.0f} lines/s")
+    print(f"per-line estimate_duration (warm): {1 / per_line:,.0f} lines/s")
+    assert batch[:1000] == single, "estimate_many disagrees with process_mixed_text"
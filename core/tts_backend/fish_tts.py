@@ -1,40 +1,39 @@
-import requests
 from core.utils import *
-import json
+from core.tts_backend.tts_cache import cached_tts
+from core.tts_backend.tts_client import get_tts_client, run_sync, PROVIDER_302
 
-@except_handler("Failed to generate audio using 302.ai Fish TTS", retry=3, delay=1)
-def fish_tts(text: str, save_as: str) -> bool:
+@cached_tts("fish_tts")
+async def fish_tts_async(text: str, save_as: str) -> bool:
     """302.ai Fish TTS conversion"""
     API_KEY = load_key("fish_tts.api_key")
     character = load_key("fish_tts.character")
     refer_id = load_key("fish_tts.character_id_dict")[character]
     
     url = "https://api.302.ai/fish-audio/v1/tts"
-    payload = json.dumps({
+    payload = {
         "text": text,
         "reference_id": refer_id,
         "chunk_length": 200,
         "normalize": True,
         "format": "wav",
         "latency": "normal"
-    })
+    }
     
     headers = {'Authorization': f'Bearer {API_KEY}', 'Content-Type': 'application/json'}
     
-    response = requests.post(url, headers=headers, data=payload)
-    response.raise_for_status()
+    client = get_tts_client()
+    response = await client.request(PROVIDER_302, "POST", url, headers=headers, json=payload)
     response_data = response.json()
     
     if "url" in response_data:
-        audio_response = requests.get(response_data["url"])
-        audio_response.raise_for_status()
-        
-        with open(save_as, "wb") as f:
-            f.write(audio_response.content)
+        await client.request(PROVIDER_302, "GET", response_data["url"], save_path=save_as)
         return True
     
     print("Request failed:", response_data)
     return False
 
+def fish_tts(text: str, save_as: str) -> bool:
+    return run_sync(fish_tts_async(text, save_as))
+
 if __name__ == '__main__':
     fish_tts("Hi! Welcome to VideoLingo!", "test.wav")
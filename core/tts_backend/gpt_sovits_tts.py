@@ -1,10 +1,18 @@
 from pathlib import Path
 import requests
 import os, sys
+import json
+import asyncio
 import subprocess
 import socket
 import time
+from threading import Lock
 from core.utils import *
+from core.tts_backend.tts_cache import cached_tts, skip_cache
+from core.tts_backend.tts_client import get_tts_client, run_sync, PROVIDER_GPT_SOVITS
+
+GPT_SOVITS_PORT = 9880
+GPT_SOVITS_URL = f"http://127.0.0.1:{GPT_SOVITS_PORT}"
 
 def check_lang(text_lang, prompt_lang):
     # only support zh and en
@@ -24,56 +32,44 @@ def check_lang(text_lang, prompt_lang):
     return text_lang, prompt_lang
 
 
-def gpt_sovits_tts(text, text_lang, save_path, ref_audio_path, prompt_lang, prompt_text):
-    text_lang, prompt_lang = check_lang(text_lang, prompt_lang)
-
-    current_dir = Path.cwd()
-    
-    payload = {
-        'text': text,
-        'text_lang': text_lang,
-        'ref_audio_path': str(ref_audio_path),
-        'prompt_lang': prompt_lang,
-        'prompt_text': prompt_text,
-        "speed_factor": 1.0,
-    }
-
-    def save_audio(response, save_path, current_dir):
-        if save_path:
-            full_save_path = current_dir / save_path
-            full_save_path.parent.mkdir(parents=True, exist_ok=True)
-            full_save_path.write_bytes(response.content)
-            rprint(f"[bold green]Audio saved successfully:[/bold green] {full_save_path}")
-        return True
-
-    response = requests.post('http://127.0.0.1:9880/tts', json=payload)
-    if response.status_code == 200:
-        return save_audio(response, save_path, current_dir)
-    else:
-        rprint(f"[bold red]TTS request failed, status code:[/bold red] {response.status_code}")
-        return False
-
-def gpt_sovits_tts_for_videolingo(text, save_as, number, task_df):
-    start_gpt_sovits_server()
-    TARGET_LANGUAGE = load_key("target_language")
-    WHISPER_LANGUAGE = load_key("whisper.language")
-    sovits_set = load_key("gpt_sovits")
-    DUBBING_CHARACTER = sovits_set["character"]
-    REFER_MODE = sovits_set["refer_mode"]
-
-    current_dir = Path.cwd()
-    prompt_lang = load_key("whisper.detected_language") if WHISPER_LANGUAGE == 'auto' else WHISPER_LANGUAGE
-    prompt_text = task_df.loc[task_df['number'] == number, 'origin'].values[0]
-
-    if REFER_MODE == 1:
-        # Use the default reference audio from config
-        _, config_path = find_and_check_config_path(DUBBING_CHARACTER)
+# ------------
+# GPT-SoVITS session
+# ------------
+# Config, reference audio and the server check are resolved once per session
+# instead of once per line. Requests go through the shared TTS client, whose
+# pooled connection keeps the local server's socket alive. Up to
+# tts_client.DEFAULT_LIMITS[PROVIDER_GPT_SOVITS] requests (or
+# tts_concurrency.gpt_sovits in config.yaml) stay in flight: the server still
+# synthesizes one line at a time, but the next one is already queued when the
+# GPU finishes the current one.
+# ------------
+
+class GPTSoVITSSession:
+    def __init__(self, base_url=GPT_SOVITS_URL):
+        self.base_url = base_url
+        self.target_language = load_key("target_language")
+        whisper_language = load_key("whisper.language")
+        sovits_set = load_key("gpt_sovits")
+        self.character = sovits_set["character"]
+        self.refer_mode = sovits_set["refer_mode"]
+        if self.refer_mode not in [1, 2, 3]:
+            raise ValueError("Invalid REFER_MODE. Choose 1, 2, or 3.")
+        self.prompt_lang = load_key("whisper.detected_language") if whisper_language == 'auto' else whisper_language
+        self.default_ref = None
+        if self.refer_mode == 1:
+            self.default_ref = self._character_reference()
+        elif self.refer_mode == 2:
+            self.default_ref = self._ensure_refer(Path.cwd() / job_path("output/audio/refers/1.wav"))
+
+    def _character_reference(self):
+        """Use the default reference audio from config, its transcript is in the file name"""
+        _, config_path = find_and_check_config_path(self.character)
         config_dir = config_path.parent
 
         # Find reference audio file
-        ref_audio_files = list(config_dir.glob(f"{DUBBING_CHARACTER}_*.wav")) + list(config_dir.glob(f"{DUBBING_CHARACTER}_*.mp3"))
+        ref_audio_files = list(config_dir.glob(f"{self.character}_*.wav")) + list(config_dir.glob(f"{self.character}_*.mp3"))
         if not ref_audio_files:
-            raise FileNotFoundError(f"No reference audio file found for {DUBBING_CHARACTER}")
+            raise FileNotFoundError(f"No reference audio file found for {self.character}")
         ref_audio_path = ref_audio_files[0]
 
         # Extract content from filename
@@ -81,12 +77,10 @@ def gpt_sovits_tts_for_videolingo(text, save_as, number, task_df):
         
         #! Check. Only support zh and en.
         prompt_lang = 'zh' if any('\u4e00' <= char <= '\u9fff' for char in content) else 'en'
-        
         print(f"Detected language: {prompt_lang}")
-        prompt_text = content
-    elif REFER_MODE in [2, 3]:
-        # Check if the reference audio file exists
-        ref_audio_path = current_dir / ("output/audio/refers/1.wav" if REFER_MODE == 2 else f"output/audio/refers/{number}.wav")
+        return ref_audio_path, prompt_lang, content
+
+    def _ensure_refer(self, ref_audio_path):
         if not ref_audio_path.exists():
             # If the file does not exist, try to extract the reference audio
             try:
@@ -96,15 +90,87 @@ def gpt_sovits_tts_for_videolingo(text, save_as, number, task_df):
             except Exception as e:
                 rprint(f"[bold red]Failed to extract reference audio: {str(e)}[/bold red]")
                 raise
-    else:
-        raise ValueError("Invalid REFER_MODE. Choose 1, 2, or 3.")
+        return ref_audio_path
+
+    def reference(self, number, task_df):
+        """(reference audio, prompt language, prompt text) for a line"""
+        if self.refer_mode == 1:
+            return self.default_ref
+        prompt_text = task_df.loc[task_df['number'] == number, 'origin'].values[0]
+        if self.refer_mode == 2:
+            return self.default_ref, self.prompt_lang, prompt_text
+        return self._ensure_refer(Path.cwd() / job_path(f"output/audio/refers/{number}.wav")), self.prompt_lang, prompt_text
+
+    def is_ready(self):
+        """True once the server answers HTTP, whatever the status"""
+        try:
+            requests.get(f"{self.base_url}/ping", timeout=2)
+            return True
+        except requests.exceptions.RequestException:
+            return False
+
+    async def tts(self, text, save_path, ref_audio_path, prompt_lang, prompt_text):
+        text_lang, prompt_lang = check_lang(self.target_language, prompt_lang)
+        payload = {
+            'text': text,
+            'text_lang': text_lang,
+            'ref_audio_path': str(ref_audio_path),
+            'prompt_lang': prompt_lang,
+            'prompt_text': prompt_text,
+            "speed_factor": 1.0,
+        }
+        full_save_path = Path.cwd() / job_path(save_path)
+        await get_tts_client().request(PROVIDER_GPT_SOVITS, "POST", f"{self.base_url}/tts", save_path=full_save_path, json=payload)
+        rprint(f"[bold green]Audio saved successfully:[/bold green] {full_save_path}")
+        return True
+
+    async def synthesize(self, text, save_as, number, task_df):
+        ref_audio_path, prompt_lang, prompt_text = self.reference(number, task_df)
+        try:
+            return await self.tts(text, save_as, ref_audio_path, prompt_lang, prompt_text)
+        except Exception as e:
+            if self.refer_mode != 3:
+                raise
+            rprint(f"[bold red]TTS request failed ({e}), switching back to mode 2 and retrying[/bold red]")
+            # spoken with the first line's reference, not the one the cache key names
+            skip_cache()
+            return await self.tts(text, save_as, Path.cwd() / job_path("output/audio/refers/1.wav"), prompt_lang, prompt_text)
+
+# one session per settings and job workspace, a session holds the job's reference audio
+_sessions = {}
+_session_lock = Lock()
+
+def get_gpt_sovits_session():
+    """The session for the current settings, the server is started (or found running) on first use"""
+    key = (json.dumps(load_key("gpt_sovits"), sort_keys=True, default=str), load_key("target_language"),
+           load_key("whisper.language"), _optional_key("whisper.detected_language"), os.getcwd(), current_job().root)
+    with _session_lock:
+        if key not in _sessions:
+            start_gpt_sovits_server()
+            _sessions[key] = GPTSoVITSSession()
+        return _sessions[key]
+
+def _optional_key(key):
+    try:
+        return load_key(key)
+    except KeyError:
+        return None
 
-    success = gpt_sovits_tts(text, TARGET_LANGUAGE, save_as, ref_audio_path, prompt_lang, prompt_text)
-    if not success and REFER_MODE == 3:
-        rprint(f"[bold red]TTS request failed, switching back to mode 2 and retrying[/bold red]")
-        ref_audio_path = current_dir / "output/audio/refers/1.wav"
-        gpt_sovits_tts(text, TARGET_LANGUAGE, save_as, ref_audio_path, prompt_lang, prompt_text)
+def _references(number, task_df):
+    # refer mode 1 uses the character's own reference, which the character name in the config already pins
+    refer_mode = load_key("gpt_sovits")["refer_mode"]
+    if refer_mode not in [2, 3]:
+        return []
+    ref_audio_path = Path("output/audio/refers/1.wav" if refer_mode == 2 else f"output/audio/refers/{number}.wav")
+    return [ref_audio_path, task_df.loc[task_df['number'] == number, 'origin'].values[0]]
 
+@cached_tts("gpt_sovits", references=_references, config=["target_language", "whisper.language", "whisper.detected_language"])
+async def gpt_sovits_tts_for_videolingo_async(text, save_as, number, task_df):
+    session = await asyncio.to_thread(get_gpt_sovits_session)
+    return await session.synthesize(text, save_as, number, task_df)
+
+def gpt_sovits_tts_for_videolingo(text, save_as, number, task_df):
+    return run_sync(gpt_sovits_tts_for_videolingo_async(text, save_as, number, task_df))
 
 def find_and_check_config_path(dubbing_character):
     current_dir = Path(__file__).resolve().parent.parent.parent
@@ -123,10 +189,9 @@ def find_and_check_config_path(dubbing_character):
     return gpt_sovits_dir, config_path
 
 def start_gpt_sovits_server():
-    current_dir = Path(__file__).resolve().parent.parent.parent
-    # Check if port 9880 is already in use
+    # Check if the port is already in use
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    result = sock.connect_ex(('127.0.0.1', 9880))
+    result = sock.connect_ex(('127.0.0.1', GPT_SOVITS_PORT))
     if result == 0:
         sock.close()
         return None
@@ -145,22 +210,19 @@ def start_gpt_sovits_server():
     # Find and check config path
     gpt_sovits_dir, config_path = find_and_check_config_path(load_key("gpt_sovits.character"))
 
-    # Change to the GPT-SoVITS-v2 directory
-    os.chdir(gpt_sovits_dir)
-
-    # Start the GPT-SoVITS server
+    # Start the GPT-SoVITS server in its own directory; no os.chdir, other jobs' threads use relative paths
     if sys.platform == "win32":
         cmd = [
-            "runtime\\python.exe",
+            str(gpt_sovits_dir / "runtime" / "python.exe"),
             "api_v2.py",
             "-a", "127.0.0.1",
-            "-p", "9880",
+            "-p", str(GPT_SOVITS_PORT),
             "-c", str(config_path)
         ]
         # Open the command in a new window on Windows
-        process = subprocess.Popen(cmd, creationflags=subprocess.CREATE_NEW_CONSOLE)
+        process = subprocess.Popen(cmd, cwd=gpt_sovits_dir, creationflags=subprocess.CREATE_NEW_CONSOLE)
     elif sys.platform == "darwin":  # macOS
-        print("Please manually start the GPT-SoVITS server at http://127.0.0.1:9880, refer to api_v2.py.")
+        print(f"Please manually start the GPT-SoVITS server at {GPT_SOVITS_URL}, refer to api_v2.py.")
         while True:
             user_input = input("Have you started the server? (y/n): ").lower()
             if user_input == 'y':
@@ -171,15 +233,12 @@ def start_gpt_sovits_server():
     else:
         raise OSError("Unsupported operating system. Only Windows and macOS are supported.")
 
-    # Change back to the original directory
-    os.chdir(current_dir)
-
     # Wait for the server to start (max 30 seconds)
     start_time = time.time()
     while time.time() - start_time < 50:
         try:
             time.sleep(15)
-            response = requests.get('http://127.0.0.1:9880/ping')
+            response = requests.get(f'{GPT_SOVITS_URL}/ping')
             if response.status_code == 200:
                 print("GPT-SoVITS server is ready.")
                 return process
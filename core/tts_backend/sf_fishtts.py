@@ -1,5 +1,6 @@
 import os
 import time
+import asyncio
 import uuid
 import base64
 import hashlib
@@ -9,9 +10,11 @@ from pydub import AudioSegment
 from rich.panel import Panel
 from rich.text import Text
 from core._1_ytdlp import find_video_files
-from core.asr_backend.audio_preprocess import get_audio_duration
+from core.utils.audio_duration import get_audio_duration
 from core.utils import *
 from core.utils.models import *
+from core.tts_backend.tts_cache import cached_tts
+from core.tts_backend.tts_client import get_tts_client, run_sync, PROVIDER_SILICONFLOW
 
 API_URL_SPEECH = "https://api.siliconflow.cn/v1/audio/speech"
 API_URL_VOICE = "https://api.siliconflow.cn/v1/uploads/audio/voice"
@@ -19,8 +22,7 @@ API_URL_VOICE = "https://api.siliconflow.cn/v1/uploads/audio/voice"
 MODEL_NAME = "fishaudio/fish-speech-1.4"
 REFER_MAX_LENGTH = 90
 
-@except_handler("Failed to generate audio using SiliconFlow Fish TTS", retry=2, delay=1)
-def siliconflow_fish_tts(text, save_path, mode="preset", voice_id=None, ref_audio=None, ref_text=None, check_duration=False):
+async def siliconflow_fish_tts_async(text, save_path, mode="preset", voice_id=None, ref_audio=None, ref_text=None, check_duration=False):
     sf_fish_set = load_key("sf_fish_tts")
     headers =  {"Authorization": f'Bearer {sf_fish_set["api_key"]}', "Content-Type": "application/json"}
     payload = {"model": MODEL_NAME, "response_format": "wav", "stream": False, "input": text}
@@ -42,25 +44,24 @@ def siliconflow_fish_tts(text, save_path, mode="preset", voice_id=None, ref_audi
         }
     else: raise ValueError("Invalid mode")
 
-    response = requests.post(API_URL_SPEECH, json=payload, headers=headers)
-    if response.status_code == 200:
-        wav_file_path = Path(save_path).with_suffix('.wav')
-        wav_file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(wav_file_path, 'wb') as f: f.write(response.content)
+    wav_file_path = Path(save_path).with_suffix('.wav')
+    try:
+        await get_tts_client().request(PROVIDER_SILICONFLOW, "POST", API_URL_SPEECH, save_path=wav_file_path, json=payload, headers=headers)
+    except Exception as e:
+        rprint(f"[red]Failed to generate audio | Text: {text}")
+        rprint(f"[red]Error details: {e}")
+        raise
         
-        if check_duration:
-            duration = get_audio_duration(wav_file_path)
-            rprint(f"[blue]Audio Duration: {duration:.2f} seconds")
-            
-        rprint(f"[green]Successfully generated audio file: {wav_file_path}")
-        return True
+    if check_duration:
+        duration = get_audio_duration(wav_file_path)
+        rprint(f"[blue]Audio Duration: {duration:.2f} seconds")
         
-    error_msg = response.json()
-    rprint(f"[red]Failed to generate audio | HTTP {response.status_code} (Attempt {attempt + 1}/{max_retries})")
-    rprint(f"[red]Text: {text}")
-    rprint(f"[red]Error details: {error_msg}")
-            
-    return False
+    rprint(f"[green]Successfully generated audio file: {wav_file_path}")
+    return True
+
+@except_handler("Failed to generate audio using SiliconFlow Fish TTS", retry=2, delay=1)
+def siliconflow_fish_tts(text, save_path, mode="preset", voice_id=None, ref_audio=None, ref_text=None, check_duration=False):
+    return run_sync(siliconflow_fish_tts_async(text, save_path, mode, voice_id, ref_audio, ref_text, check_duration))
 
 @except_handler("Failed to create custom voice")
 def create_custom_voice(audio_path, text, custom_name=None):
@@ -162,10 +163,10 @@ def get_ref_audio(task_df):
         
     rprint(f"[blue]📊 Selected {len(selected)} segments, total duration: {duration:.2f}s")
     
-    audio_files = [f"{_AUDIO_REFERS_DIR}/{row['number']}.wav" for row in selected]
+    audio_files = [job_path(f"{_AUDIO_REFERS_DIR}/{row['number']}.wav") for row in selected]
     rprint(f"[yellow]🎵 Audio files to merge: {audio_files}")
     
-    combined_audio = f"{_AUDIO_REFERS_DIR}/combined_reference.wav"
+    combined_audio = job_path(f"{_AUDIO_REFERS_DIR}/combined_reference.wav")
     success = merge_audio(audio_files, combined_audio)
     
     if not success:
@@ -177,12 +178,24 @@ def get_ref_audio(task_df):
     
     return combined_audio, combined_text
 
-def siliconflow_fish_tts_for_videolingo(text, save_as, number, task_df):
+def _references(number, task_df):
+    mode = load_key("sf_fish_tts")["mode"]
+    if mode == "custom":
+        # the voice cloned for this video, kept in the job state; until it exists the line is not cached
+        if load_key("sf_fish_tts.custom_name") != hashlib.md5(find_video_files().encode()).hexdigest()[:8]:
+            return None
+        return [load_key("sf_fish_tts.voice_id")]
+    if mode == "dynamic":
+        return [Path(f"{_AUDIO_REFERS_DIR}/{number}.wav"), task_df[task_df['number'] == number]['origin'].iloc[0]]
+    return []
+
+@cached_tts("sf_fish_tts", references=_references)
+async def siliconflow_fish_tts_for_videolingo_async(text, save_as, number, task_df):
     sf_fish_set = load_key("sf_fish_tts")
     MODE = sf_fish_set["mode"]
 
     if MODE == "preset":
-        return siliconflow_fish_tts(text, save_as, mode="preset")
+        return await siliconflow_fish_tts_async(text, save_as, mode="preset")
     elif MODE == "custom":
         video_file = find_video_files()
         custom_name = hashlib.md5(video_file.encode()).hexdigest()[:8]
@@ -191,28 +204,32 @@ def siliconflow_fish_tts_for_videolingo(text, save_as, number, task_df):
         
         if log_name != custom_name:
             # Get the merged reference audio and text
-            ref_audio, ref_text = get_ref_audio(task_df)
+            ref_audio, ref_text = await asyncio.to_thread(get_ref_audio, task_df)
             if ref_audio is None or ref_text is None:
                 rprint(f"[red]Failed to get reference audio and text, falling back to preset mode")
-                return siliconflow_fish_tts(text, save_as, mode="preset")
+                return await siliconflow_fish_tts_async(text, save_as, mode="preset")
                 
-            voice_id = create_custom_voice(ref_audio, ref_text, custom_name)
-            update_key("sf_fish_tts.voice_id", voice_id)
-            update_key("sf_fish_tts.custom_name", custom_name)
+            voice_id = await asyncio.to_thread(create_custom_voice, ref_audio, ref_text, custom_name)
+            # the cloned voice belongs to this video, keep it with the job
+            set_job_key("sf_fish_tts.voice_id", voice_id)
+            set_job_key("sf_fish_tts.custom_name", custom_name)
         else:
             voice_id = load_key("sf_fish_tts.voice_id")
-        return siliconflow_fish_tts(text=text, save_path=save_as, mode="custom", voice_id=voice_id)
+        return await siliconflow_fish_tts_async(text=text, save_path=save_as, mode="custom", voice_id=voice_id)
     elif MODE == "dynamic":
-        ref_audio_path = f"{_AUDIO_REFERS_DIR}/{number}.wav"
+        ref_audio_path = job_path(f"{_AUDIO_REFERS_DIR}/{number}.wav")
         if not Path(ref_audio_path).exists():
             rprint(f"[red]Reference audio not found: {ref_audio_path}, falling back to preset mode")
-            return siliconflow_fish_tts(text, save_as, mode="preset")
+            return await siliconflow_fish_tts_async(text, save_as, mode="preset")
             
         ref_text = task_df[task_df['number'] == number]['origin'].iloc[0]
-        return siliconflow_fish_tts(text=text, save_path=save_as, mode="dynamic", ref_audio=str(ref_audio_path), ref_text=ref_text)
+        return await siliconflow_fish_tts_async(text=text, save_path=save_as, mode="dynamic", ref_audio=str(ref_audio_path), ref_text=ref_text)
     else:
         raise ValueError("Invalid mode. Choose 'preset', 'custom', or 'dynamic'")
 
+def siliconflow_fish_tts_for_videolingo(text, save_as, number, task_df):
+    return run_sync(siliconflow_fish_tts_for_videolingo_async(text, save_as, number, task_df))
+
 if __name__ == '__main__':
     pass
     # create_custom_voice("output/audio/refers/1.wav", "Okay folks, welcome back. This is price action model number four, position trading.")
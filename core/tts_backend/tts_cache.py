@@ -0,0 +1,229 @@
+import os
+import json
+import asyncio
+import shutil
+import hashlib
+import functools
+import contextvars
+import unicodedata
+from pathlib import Path
+from threading import Lock
+from rich import print as rprint
+from core.utils.config_utils import load_key
+from core.utils.step_cache import path_digest
+from core.utils.audio_duration import get_audio_duration
+
+# ------------
+# content-addressed TTS cache
+# ------------
+# Synthesized lines are kept in a directory outside output/, shared by every
+# run and video, keyed by sha256(tts method, its voice settings, reference
+# audio content, normalized text). Recurring lines (greetings, intros, outros
+# of a channel) are then only paid for once. The directory is capped in size
+# and evicts the least recently used files; a hit bumps the file's mtime.
+# Optional config: tts_cache.enabled (default true), tts_cache.dir, tts_cache.max_mb
+# ------------
+
+DEFAULT_CACHE_DIR = '_tts_cache'
+DEFAULT_MAX_MB = 2048
+EVICT_TO = 0.9  # after eviction the cache is at most this share of the cap
+
+_lock = Lock()
+_index = None  # key -> (size, mtime) of the files in the cache dir
+_index_dir = None
+_total_size = 0
+_stats = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0}
+_skip_store = contextvars.ContextVar('tts_cache_skip_store', default=False)
+
+def _optional_key(key, default):
+    try:
+        value = load_key(key)
+    except KeyError:
+        return default
+    return default if value is None else value
+
+def _cache_dir():
+    return _optional_key("tts_cache.dir", DEFAULT_CACHE_DIR)
+
+def _enabled():
+    return bool(_optional_key("tts_cache.enabled", True))
+
+def _backend_config(method):
+    # secrets do not change the voice, leave them out so rotating a key keeps the cache
+    settings = _optional_key(method, None)
+    if isinstance(settings, dict):
+        return {k: v for k, v in settings.items() if 'api' not in k.lower()}
+    return settings
+
+def normalize_text(text):
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+def tts_key(method, text, references=(), config=()):
+    """Path items in references are hashed by content, anything else is used as is.
+
+    None if a reference file does not exist (yet): without it the key would not
+    tell one video's speaker from another's, so the line is not cached.
+    """
+    refs = [path_digest(os.fspath(item)) if isinstance(item, Path) else item for item in references]
+    if any(ref is None for ref, item in zip(refs, references) if isinstance(item, Path)):
+        return None
+    payload = {
+        'method': method,
+        'settings': _backend_config(method),
+        'config': [[key, _optional_key(key, None)] for key in config],
+        'references': refs,
+        'text': normalize_text(text),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+def _entry_file(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.audio")
+
+def _load_index(cache_dir):
+    global _index, _index_dir, _total_size
+    if _index is not None and _index_dir == cache_dir:
+        return _index
+    _index, _index_dir, _total_size = {}, cache_dir, 0
+    if os.path.isdir(cache_dir):
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                if name.endswith('.audio'):
+                    st = os.stat(os.path.join(root, name))
+                    _index[name[:-len('.audio')]] = (st.st_size, st.st_mtime)
+                    _total_size += st.st_size
+    return _index
+
+def _evict(cache_dir):
+    global _total_size
+    cap = float(_optional_key("tts_cache.max_mb", DEFAULT_MAX_MB)) * 1024 * 1024
+    if _total_size <= cap:
+        return
+    for key, (size, _) in sorted(_index.items(), key=lambda item: item[1][1]):
+        if _total_size <= cap * EVICT_TO:
+            break
+        try:
+            os.remove(_entry_file(cache_dir, key))
+        except OSError:
+            pass
+        del _index[key]
+        _total_size -= size
+
+def fetch(key, save_path):
+    """Copy a cached line to save_path, False on a miss"""
+    global _total_size
+    cache_dir = _cache_dir()
+    entry = _entry_file(cache_dir, key)
+    with _lock:
+        index = _load_index(cache_dir)
+        if key not in index:
+            _stats['misses'] += 1
+            return False
+    try:
+        os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+        shutil.copyfile(entry, save_path)
+        os.utime(entry)
+        st = os.stat(entry)
+    except OSError:
+        # evicted by another process in the meantime
+        with _lock:
+            _total_size -= index.pop(key, (0, 0))[0]
+            _stats['misses'] += 1
+        return False
+    with _lock:
+        _total_size += st.st_size - index.get(key, (0, 0))[0]
+        index[key] = (st.st_size, st.st_mtime)
+        _stats['hits'] += 1
+        _stats['saved_seconds'] += get_audio_duration(save_path)
+    return True
+
+def store(key, save_path):
+    """Keep a freshly synthesized line, only if it holds audio"""
+    global _total_size
+    if not os.path.exists(save_path) or get_audio_duration(save_path) <= 0:
+        return
+    cache_dir = _cache_dir()
+    entry = _entry_file(cache_dir, key)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    tmp_file = f"{entry}.{os.getpid()}.tmp"
+    shutil.copyfile(save_path, tmp_file)
+    os.replace(tmp_file, entry)
+    with _lock:
+        index = _load_index(cache_dir)
+        size = os.path.getsize(entry)
+        _total_size += size - index.get(key, (0, 0))[0]
+        index[key] = (size, os.path.getmtime(entry))
+        _evict(cache_dir)
+
+def skip_cache():
+    """Called by a backend that fell back to another voice than its key names: the line is not stored"""
+    _skip_store.set(True)
+
+def cached_tts(method, references=None, config=()):
+    """Serve a backend's `(text, save_path, ...)` calls from the shared TTS cache.
+
+    `references(*args, **kwargs)` gets the arguments after save_path and returns
+    what else shapes the voice: Path items (reference audio) and plain values
+    (e.g. the reference transcript), or None when the voice is not known yet,
+    which leaves the call uncached. `config` lists extra config keys that do.
+    A backend that falls back to another voice calls skip_cache(). Works on
+    plain and async backends.
+    """
+    def decorator(func):
+        def lookup(text, save_path, args, kwargs):
+            if not _enabled():
+                return None
+            refs = references(*args, **kwargs) if references else ()
+            if refs is None:
+                return None
+            return tts_key(method, text, refs, config)
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(text, save_path, *args, **kwargs):
+                # hashing and copying files would stall the shared TTS loop, they run in threads
+                key = await asyncio.to_thread(lookup, text, save_path, args, kwargs)
+                if key and await asyncio.to_thread(fetch, key, save_path):
+                    return True
+                token = _skip_store.set(False)
+                try:
+                    result = await func(text, save_path, *args, **kwargs)
+                    skipped = _skip_store.get()
+                finally:
+                    _skip_store.reset(token)
+                if key and not skipped:
+                    await asyncio.to_thread(store, key, save_path)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(text, save_path, *args, **kwargs):
+            key = lookup(text, save_path, args, kwargs)
+            if key and fetch(key, save_path):
+                return True
+            token = _skip_store.set(False)
+            try:
+                result = func(text, save_path, *args, **kwargs)
+                skipped = _skip_store.get()
+            finally:
+                _skip_store.reset(token)
+            if key and not skipped:
+                store(key, save_path)
+            return result
+        return wrapper
+    return decorator
+
+def reset_tts_cache_stats():
+    with _lock:
+        _stats.update(hits=0, misses=0, saved_seconds=0.0)
+
+def tts_cache_stats():
+    with _lock:
+        return dict(_stats, size_mb=_total_size / 1024 / 1024, entries=len(_index or {}))
+
+def report_tts_cache_stats():
+    stats = tts_cache_stats()
+    total = stats['hits'] + stats['misses']
+    if not total:
+        return
+    rprint(f"[cyan]🗃️ TTS cache: {stats['hits']}/{total} lines reused ({stats['saved_seconds']:.0f}s of audio), "
+           f"{stats['entries']} entries, {stats['size_mb']:.0f}MB[/cyan]")
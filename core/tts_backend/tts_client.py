@@ -0,0 +1,127 @@
+import os
+import random
+import asyncio
+import threading
+import httpx
+from rich import print as rprint
+from core.utils.config_utils import load_key
+
+# ------------
+# shared async HTTP client for TTS backends
+# ------------
+# One asyncio loop in a daemon thread serves every TTS request. Each
+# provider gets one pooled httpx.AsyncClient and a semaphore bounding its
+# in-flight requests (tts_concurrency.<provider>, default max_workers).
+# Throttling and server errors are retried with jittered exponential backoff,
+# and audio bodies stream straight to disk.
+# ------------
+
+PROVIDER_302 = '302ai'
+PROVIDER_SILICONFLOW = 'siliconflow'
+PROVIDER_EDGE = 'edge'
+PROVIDER_GPT_SOVITS = 'gpt_sovits'
+# the local GPT-SoVITS server synthesizes one line at a time, two in flight keep it busy
+DEFAULT_LIMITS = {PROVIDER_GPT_SOVITS: 2}
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BASE_DELAY = 1
+TIMEOUT = httpx.Timeout(120, connect=15)
+
+class _Retry(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class TTSClient:
+    def __init__(self):
+        self._clients = {}
+        self._semaphores = {}
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run_loop, args=(ready,), name='tts_client', daemon=True).start()
+        ready.wait()
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def _limit(self, provider):
+        try:
+            return int(load_key(f"tts_concurrency.{provider}"))
+        except KeyError:
+            return DEFAULT_LIMITS.get(provider) or int(load_key("max_workers"))
+
+    def semaphore(self, provider):
+        """Bounds the provider's in-flight requests, also for backends that bring their own transport"""
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self._limit(provider))
+        return self._semaphores[provider]
+
+    def _session(self, provider):
+        if provider not in self._clients:
+            limit = self._limit(provider)
+            self._clients[provider] = httpx.AsyncClient(
+                timeout=TIMEOUT, limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+            )
+        return self._clients[provider], self.semaphore(provider)
+
+    async def _send(self, client, method, url, save_path, kwargs):
+        if save_path is None:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code in RETRY_STATUS:
+                raise _Retry(f"HTTP {response.status_code}", _retry_after(response))
+            response.raise_for_status()
+            return response
+        async with client.stream(method, url, **kwargs) as response:
+            if response.status_code in RETRY_STATUS:
+                raise _Retry(f"HTTP {response.status_code}", _retry_after(response))
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+            os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+            tmp_file = f"{save_path}.part"
+            with open(tmp_file, 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+            os.replace(tmp_file, save_path)
+            return response
+
+    async def request(self, provider, method, url, save_path=None, **kwargs):
+        """Send a request through the provider's pool; the body is streamed to save_path when given"""
+        client, semaphore = self._session(provider)
+        async with semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                try:
+                    return await self._send(client, method, url, save_path, kwargs)
+                except (_Retry, httpx.TransportError) as e:
+                    if attempt == MAX_RETRIES:
+                        raise Exception(f"{provider} request failed after {MAX_RETRIES + 1} attempts: {e}")
+                    delay = getattr(e, 'retry_after', None) or BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+                    rprint(f"[yellow]⚠️ {provider} TTS request failed ({e}), retrying in {delay:.1f}s[/yellow]")
+                    await asyncio.sleep(delay)
+
+    def run(self, coro):
+        """Run a coroutine on the shared loop and wait for it; never call from the loop itself"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_tts_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TTSClient()
+    return _client
+
+def run_sync(coro):
+    return get_tts_client().run(coro)
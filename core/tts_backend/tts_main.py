@@ -1,18 +1,20 @@
 import os
 import re
+import asyncio
 from pydub import AudioSegment
 
-from core.asr_backend.audio_preprocess import get_audio_duration
-from core.tts_backend.gpt_sovits_tts import gpt_sovits_tts_for_videolingo
-from core.tts_backend.sf_fishtts import siliconflow_fish_tts_for_videolingo
-from core.tts_backend.openai_tts import openai_tts
-from core.tts_backend.fish_tts import fish_tts
-from core.tts_backend.azure_tts import azure_tts
-from core.tts_backend.edge_tts import edge_tts
-from core.tts_backend.sf_cosyvoice2 import cosyvoice_tts_for_videolingo
+from core.utils.audio_duration import get_audio_duration
+from core.tts_backend.gpt_sovits_tts import gpt_sovits_tts_for_videolingo_async
+from core.tts_backend.sf_fishtts import siliconflow_fish_tts_for_videolingo_async
+from core.tts_backend.openai_tts import openai_tts_async
+from core.tts_backend.fish_tts import fish_tts_async
+from core.tts_backend.azure_tts import azure_tts_async
+from core.tts_backend.edge_tts import edge_tts_async
+from core.tts_backend.sf_cosyvoice2 import cosyvoice_tts_for_videolingo_async
 from core.tts_backend.custom_tts import custom_tts
+from core.tts_backend.tts_client import run_sync
 from core.prompts import get_correct_text_prompt
-from core.tts_backend._302_f5tts import f5_tts_for_videolingo
+from core.tts_backend._302_f5tts import f5_tts_for_videolingo_async
 from core.utils import *
 
 def clean_text_for_tts(text):
@@ -22,13 +24,39 @@ def clean_text_for_tts(text):
         text = text.replace(char, '')
     return text.strip()
 
-def tts_main(text, save_as, number, task_df):
+def export_silence(save_as, duration_ms=100):
+    AudioSegment.silent(duration=duration_ms).export(save_as, format="wav")
+
+# HTTP backends run on the shared TTS event loop, the rest in worker threads
+ASYNC_TTS_METHODS = {'openai_tts', 'gpt_sovits', 'fish_tts', 'azure_tts', 'sf_fish_tts', 'edge_tts', 'sf_cosyvoice2', 'f5tts'}
+
+async def synthesize(tts_method, text, save_as, number, task_df):
+    if tts_method == 'openai_tts':
+        await openai_tts_async(text, save_as)
+    elif tts_method == 'gpt_sovits':
+        await gpt_sovits_tts_for_videolingo_async(text, save_as, number, task_df)
+    elif tts_method == 'fish_tts':
+        await fish_tts_async(text, save_as)
+    elif tts_method == 'azure_tts':
+        await azure_tts_async(text, save_as)
+    elif tts_method == 'sf_fish_tts':
+        await siliconflow_fish_tts_for_videolingo_async(text, save_as, number, task_df)
+    elif tts_method == 'edge_tts':
+        await edge_tts_async(text, save_as)
+    elif tts_method == 'custom_tts':
+        await asyncio.to_thread(custom_tts, text, save_as)
+    elif tts_method == 'sf_cosyvoice2':
+        await cosyvoice_tts_for_videolingo_async(text, save_as, number, task_df)
+    elif tts_method == 'f5tts':
+        await f5_tts_for_videolingo_async(text, save_as, number, task_df)
+
+async def tts_main_async(text, save_as, number, task_df):
     text = clean_text_for_tts(text)
     # Check if text is empty or single character, single character voiceovers are prone to bugs
     cleaned_text = re.sub(r'[^\w\s]', '', text).strip()
+    # file and audio work goes to a thread, the TTS loop is shared by every job's requests
     if not cleaned_text or len(cleaned_text) <= 1:
-        silence = AudioSegment.silent(duration=100)  # 100ms = 0.1s
-        silence.export(save_as, format="wav")
+        await asyncio.to_thread(export_silence, save_as)  # 100ms = 0.1s
         rprint(f"Created silent audio for empty/single-char text: {save_as}")
         return
     
@@ -44,29 +72,12 @@ def tts_main(text, save_as, number, task_df):
         try:
             if attempt >= max_retries - 1:
                 print("Asking GPT to correct text...")
-                correct_text = ask_gpt(get_correct_text_prompt(text),resp_type="json", log_title='tts_correct_text')
+                correct_text = await asyncio.to_thread(ask_gpt, get_correct_text_prompt(text), resp_type="json", log_title='tts_correct_text')
                 text = correct_text['text']
-            if TTS_METHOD == 'openai_tts':
-                openai_tts(text, save_as)
-            elif TTS_METHOD == 'gpt_sovits':
-                gpt_sovits_tts_for_videolingo(text, save_as, number, task_df)
-            elif TTS_METHOD == 'fish_tts':
-                fish_tts(text, save_as)
-            elif TTS_METHOD == 'azure_tts':
-                azure_tts(text, save_as)
-            elif TTS_METHOD == 'sf_fish_tts':
-                siliconflow_fish_tts_for_videolingo(text, save_as, number, task_df)
-            elif TTS_METHOD == 'edge_tts':
-                edge_tts(text, save_as)
-            elif TTS_METHOD == 'custom_tts':
-                custom_tts(text, save_as)
-            elif TTS_METHOD == 'sf_cosyvoice2':
-                cosyvoice_tts_for_videolingo(text, save_as, number, task_df)
-            elif TTS_METHOD == 'f5tts':
-                f5_tts_for_videolingo(text, save_as, number, task_df)
+            await synthesize(TTS_METHOD, text, save_as, number, task_df)
                 
             # Check generated audio duration
-            duration = get_audio_duration(save_as)
+            duration = await asyncio.to_thread(get_audio_duration, save_as)
             if duration > 0:
                 break
             else:
@@ -75,11 +86,13 @@ def tts_main(text, save_as, number, task_df):
                 if attempt == max_retries - 1:
                     print(f"Warning: Generated audio duration is 0 for text: {text}")
                     # Create silent audio file
-                    silence = AudioSegment.silent(duration=100)  # 100ms silence
-                    silence.export(save_as, format="wav")
+                    await asyncio.to_thread(export_silence, save_as)  # 100ms silence
                     return
                 print(f"Attempt {attempt + 1} failed, retrying...")
         except Exception as e:
             if attempt == max_retries - 1:
                 raise Exception(f"Failed to generate audio after {max_retries} attempts: {str(e)}")
-            print(f"Attempt {attempt + 1} failed, retrying...")
\ No newline at end of file
+            print(f"Attempt {attempt + 1} failed, retrying...")
+
+def tts_main(text, save_as, number, task_df):
+    return run_sync(tts_main_async(text, save_as, number, task_df))
@@ -1,10 +1,12 @@
 # use try-except to avoid error when installing
 try:
     from .ask_gpt import ask_gpt
-    from .decorator import except_handler, check_file_exists
-    from .config_utils import load_key, update_key, get_joiner
+    from .decorator import except_handler
+    from .config_utils import load_key, update_key, set_job_key, get_joiner, load_str, load_int, load_float, load_bool
+    from .artifacts import load_table, save_table, table_exists
+    from .job_context import job_path, current_job, use_job
     from rich import print as rprint
 except ImportError:
     pass
 
-__all__ = ["ask_gpt", "except_handler", "check_file_exists", "load_key", "update_key", "rprint", "get_joiner"]
\ No newline at end of file
+__all__ = ["ask_gpt", "except_handler", "load_key", "update_key", "set_job_key", "rprint", "get_joiner", "load_str", "load_int", "load_float", "load_bool", "load_table", "save_table", "table_exists", "job_path", "current_job", "use_job"]
\ No newline at end of file
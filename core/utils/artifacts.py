@@ -0,0 +1,91 @@
+import os
+import ast
+import pandas as pd
+from rich import print as rprint
+from core.utils.config_utils import load_key
+from core.utils.job_context import job_path
+
+# ------------
+# table artifacts
+# ------------
+# Intermediate tables (the paths in models.py) go through load_table/save_table.
+# The file extension picks the format: parquet by default, which keeps dtypes
+# and stores list columns natively, while .xlsx is still readable for runs made
+# before the switch. Set `export_excel: true` in config.yaml to also write an
+# .xlsx copy of every table for inspection. Paths are mapped into the current
+# job's workspace.
+# ------------
+
+LEGACY_EXT = '.xlsx'
+# columns holding python lists, stored as their repr in legacy excel files
+LIST_COLUMNS = ('lines', 'src_lines', 'new_sub_times')
+
+def _read_parquet(path):
+    import pyarrow.parquet as pq
+    import pyarrow.types as pa_types
+    table = pq.read_table(path)
+    df = table.to_pandas()
+    # pyarrow hands list cells back as numpy arrays, callers expect plain lists
+    for field in table.schema:
+        if pa_types.is_list(field.type) or pa_types.is_large_list(field.type):
+            df[field.name] = table.column(field.name).to_pylist()
+    return df
+
+def _write_parquet(df, path):
+    df.to_parquet(path, index=False)
+
+def _read_excel(path):
+    df = pd.read_excel(path)
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = [ast.literal_eval(v) if isinstance(v, str) else v for v in df[column]]
+    return df
+
+def _write_excel(df, path):
+    df.to_excel(path, index=False)
+
+BACKENDS = {
+    '.parquet': (_read_parquet, _write_parquet),
+    '.xlsx': (_read_excel, _write_excel),
+}
+
+def _backend(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in BACKENDS:
+        raise ValueError(f"Unsupported table format: {path}")
+    return BACKENDS[ext]
+
+def _legacy_path(path):
+    return os.path.splitext(path)[0] + LEGACY_EXT
+
+def _export_excel():
+    try:
+        return bool(load_key("export_excel"))
+    except KeyError:
+        return False
+
+def table_exists(path):
+    path = job_path(path)
+    return os.path.exists(path) or os.path.exists(_legacy_path(path))
+
+def load_table(path):
+    """Load an intermediate table, falling back to the legacy .xlsx of an older run"""
+    path = job_path(path)
+    if os.path.exists(path):
+        return _backend(path)[0](path)
+    legacy = _legacy_path(path)
+    if legacy != path and os.path.exists(legacy):
+        rprint(f"[yellow]📦 Reading legacy table {legacy}[/yellow]")
+        return _read_excel(legacy)
+    raise FileNotFoundError(f"Table not found: {path}")
+
+def save_table(df, path):
+    path = job_path(path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    root, ext = os.path.splitext(path)
+    tmp_file = f"{root}.tmp{ext}"
+    _backend(path)[1](df, tmp_file)
+    os.replace(tmp_file, path)
+    legacy = _legacy_path(path)
+    if legacy != path and _export_excel():
+        _write_excel(df, legacy)
@@ -1,40 +1,32 @@
-import os
-import json
-from threading import Lock
+import time
 import json_repair
-from openai import OpenAI
+from openai import RateLimitError
 from core.utils.config_utils import load_key
 from rich import print as rprint
 from core.utils.decorator import except_handler
+from core.utils.openai_client import get_openai_client
+from core.utils.llm_dispatcher import get_llm_dispatcher, estimate_tokens
+from core.utils.gpt_cache import get_cached, put_cached, append_log
 
 # ------------
 # cache gpt response
 # ------------
 
-LOCK = Lock()
-GPT_LOG_FOLDER = 'output/gpt_log'
-
 def _save_cache(model, prompt, resp_content, resp_type, resp, message=None, log_title="default"):
-    with LOCK:
-        logs = []
-        file = os.path.join(GPT_LOG_FOLDER, f"{log_title}.json")
-        os.makedirs(os.path.dirname(file), exist_ok=True)
-        if os.path.exists(file):
-            with open(file, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-        logs.append({"model": model, "prompt": prompt, "resp_content": resp_content, "resp_type": resp_type, "resp": resp, "message": message})
-        with open(file, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, ensure_ascii=False, indent=4)
+    # error responses are only logged, never served from the cache
+    if log_title != "error":
+        put_cached(model, prompt, resp_type, resp_content, resp, log_title=log_title)
+    append_log(log_title, {"model": model, "prompt": prompt, "resp_content": resp_content, "resp_type": resp_type, "resp": resp, "message": message})
+
+def _load_cache(model, prompt, resp_type):
+    cached = get_cached(model, prompt, resp_type)
+    return cached if cached is not None else False
 
-def _load_cache(prompt, resp_type, log_title):
-    with LOCK:
-        file = os.path.join(GPT_LOG_FOLDER, f"{log_title}.json")
-        if os.path.exists(file):
-            with open(file, 'r', encoding='utf-8') as f:
-                for item in json.load(f):
-                    if item["prompt"] == prompt and item["resp_type"] == resp_type:
-                        return item["resp"]
-        return False
+def _retry_after(response):
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
 
 # ------------
 # ask gpt once
@@ -42,32 +34,46 @@ def _load_cache(prompt, resp_type, log_title):
 
 @except_handler("GPT request failed", retry=5)
 def ask_gpt(prompt, resp_type=None, valid_def=None, log_title="default"):
-    if not load_key("api.key"):
+    api_set = load_key("api")
+    if not api_set["key"]:
         raise ValueError("API key is not set")
+    model = api_set["model"]
     # check cache
-    cached = _load_cache(prompt, resp_type, log_title)
+    cached = _load_cache(model, prompt, resp_type)
     if cached:
         rprint("use cache response")
         return cached
 
-    model = load_key("api.model")
-    base_url = load_key("api.base_url")
+    base_url = api_set["base_url"]
     if 'ark' in base_url:
         base_url = "https://ark.cn-beijing.volces.com/api/v3" # huoshan base url
     elif 'v1' not in base_url:
         base_url = base_url.strip('/') + '/v1'
-    client = OpenAI(api_key=load_key("api.key"), base_url=base_url)
-    response_format = {"type": "json_object"} if resp_type == "json" and load_key("api.llm_support_json") else None
+    client = get_openai_client(api_set["key"], base_url)
+    response_format = {"type": "json_object"} if resp_type == "json" and api_set["llm_support_json"] else None
 
     messages = [{"role": "user", "content": prompt}]
 
     params = dict(
         model=model,
         messages=messages,
-        response_format=response_format,
-        timeout=300
+        response_format=response_format
     )
-    resp_raw = client.chat.completions.create(**params)
+    # wait for a slot from the shared dispatcher (rate limit + adaptive concurrency)
+    dispatcher = get_llm_dispatcher()
+    prompt_tokens = estimate_tokens(prompt)
+    dispatcher.acquire(tokens=prompt_tokens)
+    start = time.time()
+    try:
+        resp_raw = client.chat.completions.create(**params)
+    except RateLimitError as e:
+        dispatcher.release(rate_limited=True, retry_after=_retry_after(e.response))
+        raise
+    except Exception:
+        dispatcher.release()
+        raise
+    used_tokens = resp_raw.usage.total_tokens if resp_raw.usage else prompt_tokens
+    dispatcher.release(latency=time.time() - start, extra_tokens=max(0, used_tokens - prompt_tokens))
 
     # process and return full result
     resp_content = resp_raw.choices[0].message.content
@@ -0,0 +1,72 @@
+import os
+import subprocess
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+import soundfile as sf
+from rich import print as rprint
+from core.utils.job_context import job_path
+
+# ------------
+# audio duration probe
+# ------------
+# Durations are read from the file header in process (soundfile handles wav,
+# flac, ogg and mp3); only formats it cannot open fall back to one ffprobe call.
+# Results are memoized by (path, mtime, size), so a file rewritten in place,
+# e.g. a TTS retry, is probed again.
+# ------------
+
+MAX_MEMO_ENTRIES = 50000
+PROBE_WORKERS = 8
+
+_lock = Lock()
+_memo = {}
+
+def _header_duration(audio_file):
+    try:
+        info = sf.info(audio_file)
+    except RuntimeError:
+        return None
+    return info.frames / info.samplerate if info.samplerate else None
+
+def _ffprobe_duration(audio_file):
+    result = subprocess.run([
+        'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1', audio_file
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return float(result.stdout.decode('utf-8').strip())
+
+def get_audio_duration(audio_file) -> float:
+    """Duration in seconds, 0 if the file cannot be read"""
+    audio_file = job_path(audio_file)
+    try:
+        st = os.stat(audio_file)
+    except OSError as e:
+        rprint(f"[red]❌ Error: Failed to get audio duration: {e}[/red]")
+        return 0
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _memo.get(audio_file)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    duration = _header_duration(audio_file)
+    if duration is None:
+        try:
+            duration = _ffprobe_duration(audio_file)
+        except (OSError, ValueError, subprocess.CalledProcessError) as e:
+            rprint(f"[red]❌ Error: Failed to get audio duration: {e}[/red]")
+            return 0
+    with _lock:
+        if len(_memo) >= MAX_MEMO_ENTRIES:
+            _memo.pop(next(iter(_memo)))
+        _memo[audio_file] = (stamp, duration)
+    return duration
+
+def get_audio_durations(audio_files) -> list:
+    """Durations of many files in order, misses probed concurrently"""
+    # resolved here, the probe threads do not run in the caller's job
+    audio_files = [job_path(f) for f in audio_files]
+    if len(audio_files) <= 1:
+        return [get_audio_duration(f) for f in audio_files]
+    with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(audio_files))) as executor:
+        return list(executor.map(get_audio_duration, audio_files))
@@ -1,28 +1,193 @@
+import os
+import copy
+import json
+import time
 from ruamel.yaml import YAML
 import threading
+from core.utils.job_context import current_job, job_path
 
 CONFIG_PATH = 'config.yaml'
+# values a run finds out for itself (e.g. the detected language), kept with the job
+JOB_STATE_FILE = 'output/job_state.json'
 lock = threading.Lock()
 
 yaml = YAML()
 yaml.preserve_quotes = True
 
+# -----------------------
+# parsed config snapshot
+# -----------------------
+# config.yaml is parsed once into a read-only snapshot that lookups read
+# straight from memory. The file is stat'ed at most every CONFIG_CHECK_INTERVAL
+# seconds to pick up edits made outside this process; update_key refreshes the
+# snapshot at once and invalidate_config() forces a re-read. Sections are handed
+# out as read-only views (plain dict/list subclasses, so they still compare,
+# serialize and pickle like the originals); copy.deepcopy() one to edit it.
+
+CONFIG_CHECK_INTERVAL = 1.0
+
+class FrozenDict(dict):
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("config values are read-only, copy.deepcopy() them to edit")
+    __setitem__ = __delitem__ = setdefault = update = pop = popitem = clear = _readonly
+    __ior__ = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+class FrozenList(list):
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("config values are read-only, copy.deepcopy() them to edit")
+    __setitem__ = __delitem__ = append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __iadd__ = __imul__ = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(v, memo) for v in self]
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenList(_freeze(v) for v in value)
+    return value
+
+_snapshot = {'stamp': None, 'data': None, 'checked': 0.0}
+
+def _file_stamp():
+    st = os.stat(CONFIG_PATH)
+    return (CONFIG_PATH, st.st_mtime_ns, st.st_size)
+
+def _get_config():
+    data = _snapshot['data']
+    if data is not None and time.monotonic() - _snapshot['checked'] < CONFIG_CHECK_INTERVAL:
+        return data
+    stamp = _file_stamp()
+    with lock:
+        if _snapshot['data'] is None or _snapshot['stamp'] != stamp:
+            with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
+                _snapshot['data'] = _freeze(yaml.load(file))
+            _snapshot['stamp'] = stamp
+        _snapshot['checked'] = time.monotonic()
+        return _snapshot['data']
+
+def invalidate_config():
+    with lock:
+        _snapshot['stamp'], _snapshot['data'] = None, None
+
+# -----------------------
+# per-job layers
+# -----------------------
+# load_key resolves a key through three layers: the current job's overrides
+# (fixed when the job is created), the job's state (values found at runtime,
+# stored in its workspace) and config.yaml. Jobs never write the shared file,
+# so runs with different settings can share one process. Layers hold dotted
+# leaf keys; loading a whole section merges the leaves below it. The state file
+# is checked like config.yaml, at most every CONFIG_CHECK_INTERVAL seconds;
+# set_job_key updates the cached state as it writes, and invalidate_job_state()
+# drops it when the workspace is cleared.
+
+_states = {}
+
+def _state_file():
+    return job_path(JOB_STATE_FILE)
+
+def _state_stamp(state_file):
+    try:
+        st = os.stat(state_file)
+    except FileNotFoundError:
+        # a new or wiped workspace starts without state
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _load_state(state_file):
+    """Cached state of a job, the file is re-checked once CONFIG_CHECK_INTERVAL has passed; callers hold the lock"""
+    cached = _states.get(state_file)
+    if cached is None or time.monotonic() - cached['checked'] >= CONFIG_CHECK_INTERVAL:
+        stamp = _state_stamp(state_file)
+        if cached is None or cached['stamp'] != stamp:
+            data = {}
+            if stamp is not None:
+                with open(state_file, 'r', encoding='utf-8') as file:
+                    data = _freeze(json.load(file))
+            cached = _states[state_file] = {'stamp': stamp, 'data': data}
+        cached['checked'] = time.monotonic()
+    return cached['data']
+
+def _job_state():
+    cached = _states.get(_state_file())
+    if cached is not None and time.monotonic() - cached['checked'] < CONFIG_CHECK_INTERVAL:
+        return cached['data']
+    with lock:
+        return _load_state(_state_file())
+
+def _write_state(state):
+    """Write the current job's state and cache it, callers hold the lock"""
+    state_file = _state_file()
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    tmp_file = f"{state_file}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as file:
+        json.dump(state, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, state_file)
+    _states[state_file] = {'stamp': _state_stamp(state_file), 'data': _freeze(state), 'checked': time.monotonic()}
+
+def set_job_key(key, new_value):
+    """Record a value for the current job only, it shadows config.yaml until the job's workspace is gone"""
+    with lock:
+        _write_state({**_load_state(_state_file()), key: new_value})
+    return True
+
+def invalidate_job_state():
+    with lock:
+        _states.pop(_state_file(), None)
+
+def _layered(key, value, layers):
+    prefix = key + '.'
+    for layer in layers:
+        for k, v in layer.items():
+            if not k.startswith(prefix):
+                continue
+            current = value
+            *parents, leaf = k[len(prefix):].split('.')
+            for p in parents:
+                current = current.setdefault(p, {})
+            current[leaf] = v
+    return _freeze(value)
+
 # -----------------------
 # load & update config
 # -----------------------
 
 def load_key(key):
-    with lock:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as file:
-            data = yaml.load(file)
+    # later layers win, the job's own overrides come last
+    layers = (_job_state(), current_job().overrides)
+    for layer in reversed(layers):
+        if key in layer:
+            return _freeze(layer[key])
 
     keys = key.split('.')
-    value = data
+    value = _get_config()
     for k in keys:
         if isinstance(value, dict) and k in value:
             value = value[k]
         else:
             raise KeyError(f"Key '{k}' not found in configuration")
+    # sections are read-only views of the snapshot, only merging job layers into one copies it
+    if isinstance(value, dict) and any(layers):
+        prefix = key + '.'
+        if any(k.startswith(prefix) for layer in layers for k in layer):
+            value = _layered(key, copy.deepcopy(value), layers)
     return value
 
 def update_key(key, new_value):
@@ -42,10 +207,34 @@ def update_key(key, new_value):
             current[keys[-1]] = new_value
             with open(CONFIG_PATH, 'w', encoding='utf-8') as file:
                 yaml.dump(data, file)
+            _snapshot['stamp'], _snapshot['data'], _snapshot['checked'] = _file_stamp(), _freeze(data), time.monotonic()
+            # a setting changed on purpose wins over what the current run found out
+            state = _load_state(_state_file())
+            if key in state:
+                _write_state({k: v for k, v in state.items() if k != key})
             return True
         else:
             raise KeyError(f"Key '{keys[-1]}' not found in configuration")
-        
+
+# -----------------------
+# typed accessors
+# -----------------------
+
+def load_str(key):
+    return str(load_key(key))
+
+def load_int(key):
+    return int(load_key(key))
+
+def load_float(key):
+    return float(load_key(key))
+
+def load_bool(key):
+    value = load_key(key)
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes', '1', 'on')
+    return bool(value)
+
 # basic utils
 def get_joiner(language):
     if language in load_key('language_split_with_space'):
@@ -1,10 +1,11 @@
 import os
 import shutil
+from core.utils.job_context import job_path
 
 def delete_dubbing_files():
     files_to_delete = [
-        os.path.join("output", "dub.wav"),
-        os.path.join("output", "output_dub.mp4")
+        job_path(os.path.join("output", "dub.wav")),
+        job_path(os.path.join("output", "output_dub.mp4"))
     ]
     
     for file_path in files_to_delete:
@@ -17,7 +18,7 @@ def delete_dubbing_files():
         else:
             print(f"File not found: {file_path}")
     
-    segs_folder = os.path.join("output", "audio", "segs")
+    segs_folder = job_path(os.path.join("output", "audio", "segs"))
     if os.path.exists(segs_folder):
         try:
             shutil.rmtree(segs_folder)
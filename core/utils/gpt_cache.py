@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from threading import Lock
+from core.utils.job_context import job_path
+
+# ------------
+# content-addressed gpt response cache
+# ------------
+# responses are keyed by sha256(model, resp_type, prompt) and stored in one
+# sqlite file, so a lookup is a primary-key read instead of a full json scan.
+# the per-title logs are kept for humans, but only ever appended to.
+# both live in the current job's workspace.
+# ------------
+
+GPT_LOG_FOLDER = 'output/gpt_log'
+CACHE_DB_FILE = os.path.join(GPT_LOG_FOLDER, 'cache.db')
+CACHE_MAX_ENTRIES = 50000
+CACHE_MAX_AGE_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    log_title TEXT,
+    model TEXT,
+    resp_type TEXT,
+    prompt TEXT,
+    resp_content TEXT,
+    resp TEXT,
+    created_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+"""
+
+_db_lock = Lock()
+_log_lock = Lock()
+_conns = {}  # db file -> connection, one per job workspace
+
+def cache_key(model, prompt, resp_type):
+    h = hashlib.sha256()
+    for part in (model, resp_type, prompt):
+        h.update(str(part).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+def _get_conn():
+    """Open the job's cache db once; reopen if the file was moved away (e.g. archived to history)"""
+    db_file = job_path(CACHE_DB_FILE)
+    conn = _conns.get(db_file)
+    if conn is not None and os.path.exists(db_file):
+        return conn
+    if conn is not None:
+        conn.close()
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    is_new = not os.path.exists(db_file)
+    conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    _conns[db_file] = conn
+    if is_new:
+        _import_legacy_logs(conn, os.path.dirname(db_file))
+    _evict(conn)
+    return conn
+
+def _import_legacy_logs(conn, log_folder):
+    """Seed the cache from the old whole-file `<log_title>.json` logs of an unfinished run"""
+    now = time.time()
+    for name in os.listdir(log_folder):
+        log_title, ext = os.path.splitext(name)
+        if ext != '.json' or log_title == 'error':
+            continue
+        try:
+            with open(os.path.join(log_folder, name), 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            continue
+        conn.executemany(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(cache_key(item["model"], item["prompt"], item["resp_type"]), log_title, item["model"], item["resp_type"],
+              item["prompt"], item.get("resp_content"), json.dumps(item["resp"], ensure_ascii=False), now, now)
+             for item in items if isinstance(item, dict) and "prompt" in item]
+        )
+
+def _evict(conn):
+    """Drop entries older than CACHE_MAX_AGE_DAYS, then the least recently used beyond CACHE_MAX_ENTRIES"""
+    conn.execute("DELETE FROM responses WHERE accessed_at < ?", (time.time() - CACHE_MAX_AGE_DAYS * 86400,))
+    conn.execute(
+        "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+        (CACHE_MAX_ENTRIES,)
+    )
+
+def close_cache():
+    """Release the current job's cache db, e.g. before its workspace is archived"""
+    with _db_lock:
+        conn = _conns.pop(job_path(CACHE_DB_FILE), None)
+        if conn is not None:
+            conn.close()
+
+def get_cached(model, prompt, resp_type):
+    key = cache_key(model, prompt, resp_type)
+    with _db_lock:
+        conn = _get_conn()
+        row = conn.execute("SELECT resp FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+    return json.loads(row[0])
+
+def put_cached(model, prompt, resp_type, resp_content, resp, log_title="default"):
+    key = cache_key(model, prompt, resp_type)
+    now = time.time()
+    with _db_lock:
+        _get_conn().execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, log_title, model, resp_type, prompt, resp_content, json.dumps(resp, ensure_ascii=False), now, now)
+        )
+
+def append_log(log_title, record):
+    """Append one record to the human readable `<log_title>.jsonl` log"""
+    log_folder = job_path(GPT_LOG_FOLDER)
+    file = os.path.join(log_folder, f"{log_title}.jsonl")
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with _log_lock:
+        os.makedirs(log_folder, exist_ok=True)
+        with open(file, 'a', encoding='utf-8') as f:
+            f.write(line)
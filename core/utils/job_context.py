@@ -0,0 +1,78 @@
+import os
+import uuid
+import functools
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+
+# ------------
+# job workspaces
+# ------------
+# Artifact paths are written in the single-run layout rooted at `output/`
+# (models.py and the module constants of each step). A job carries its own
+# workspace root and job_path() maps such paths into it, so several videos can
+# be processed side by side, each in its own directory. The current job lives
+# in a context variable: asyncio tasks inherit it, worker threads get it through
+# with_current_job(). The default job's workspace is `output/` itself, so a
+# plain run reads and writes exactly where it always did.
+# ------------
+
+OUTPUT_ROOT = 'output'
+JOBS_DIR = 'jobs'
+
+@dataclass(frozen=True)
+class JobContext:
+    job_id: str
+    root: str = OUTPUT_ROOT
+    # config keys set for this job only (dotted keys, e.g. the languages of a batch task)
+    overrides: dict = field(default_factory=dict, compare=False)
+
+    def with_overrides(self, overrides):
+        """The same job with more config keys set, the later value wins"""
+        return replace(self, overrides={**self.overrides, **overrides})
+
+    def path(self, path):
+        """Map an `output/...` path into this job's workspace, other paths are returned as is"""
+        path = os.fspath(path)
+        if self.root == OUTPUT_ROOT:
+            return path
+        norm = path.replace(os.sep, '/')
+        if norm == OUTPUT_ROOT:
+            return self.root
+        if norm.startswith(OUTPUT_ROOT + '/'):
+            return os.path.join(self.root, norm[len(OUTPUT_ROOT) + 1:])
+        return path
+
+DEFAULT_JOB = JobContext('default')
+_current = contextvars.ContextVar('videolingo_job', default=DEFAULT_JOB)
+
+def new_job(job_id=None, jobs_dir=JOBS_DIR, overrides=None):
+    """A job with a workspace of its own under jobs_dir"""
+    job_id = job_id or uuid.uuid4().hex[:12]
+    return JobContext(job_id, os.path.join(jobs_dir, job_id), dict(overrides or {}))
+
+def current_job():
+    return _current.get()
+
+@contextmanager
+def use_job(job):
+    """Run the enclosed steps inside `job`'s workspace"""
+    token = _current.set(job)
+    try:
+        os.makedirs(job.root, exist_ok=True)
+        yield job
+    finally:
+        _current.reset(token)
+
+def job_path(path):
+    return current_job().path(path)
+
+def with_current_job(fn):
+    """Wrap fn to run in the caller's job, for work handed to other threads"""
+    job = current_job()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with use_job(job):
+            return fn(*args, **kwargs)
+    return wrapper
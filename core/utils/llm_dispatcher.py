@@ -0,0 +1,207 @@
+import time
+import heapq
+import queue
+import asyncio
+import itertools
+import threading
+import concurrent.futures
+from contextlib import contextmanager
+from core.utils.config_utils import load_key
+from core.utils.job_context import with_current_job
+from rich import print as rprint
+
+# ------------
+# shared LLM dispatcher
+# ------------
+# All LLM steps submit their work here instead of spinning up their own
+# thread pool. Every single API request then asks the dispatcher for a permit:
+#   - a token bucket enforces requests/min and tokens/min (api.rpm / api.tpm, optional)
+#   - an AIMD limit adapts the number of in-flight requests: +1 per window of
+#     successes, halved on 429, held while latency is degraded
+#   - waiting requests are served by priority lane, then FIFO
+# The asyncio loop lives in a daemon thread; callers use the sync facade.
+# ------------
+
+PRIORITY_SUMMARY = 0
+PRIORITY_TRANSLATE = 1
+PRIORITY_SPLIT = 2
+PRIORITY_BACKGROUND = 3
+
+MAX_CONCURRENCY_FACTOR = 2  # the AIMD limit may grow up to max_workers * this
+LATENCY_FACTOR = 3  # latency above this multiple of the best seen counts as degraded
+DEFAULT_COOLDOWN = 2  # seconds to pause all dispatch after a 429 without retry-after
+
+_local = threading.local()
+
+def _optional_key(key, default=None):
+    try:
+        value = load_key(key)
+    except KeyError:
+        return default
+    return value if value else default
+
+def current_priority():
+    return getattr(_local, 'priority', PRIORITY_SPLIT)
+
+@contextmanager
+def llm_priority(priority):
+    """Run LLM requests made by the current thread in the given lane"""
+    previous = current_priority()
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute) if per_minute else None
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` can be taken, 0 if available now"""
+        if self.capacity is None:
+            return 0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0 if self.tokens >= amount else (amount - self.tokens) * 60 / self.capacity
+
+    def take(self, amount):
+        if self.capacity is not None:
+            self.tokens -= min(amount, self.capacity)
+
+class LLMDispatcher:
+    def __init__(self, max_workers, rpm=None, tpm=None):
+        self.base_limit = max(1, int(max_workers))
+        self.max_limit = self.base_limit * MAX_CONCURRENCY_FACTOR
+        self.limit = float(self.base_limit)
+        self.in_flight = 0
+        self.best_latency = None
+        self.paused_until = 0
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.stats = {'requests': 0, 'rate_limited': 0}
+        self._waiters = []
+        self._seq = itertools.count()
+        # jobs are picked up by lane too, so later high-priority work isn't stuck behind a backlog
+        self._jobs = queue.PriorityQueue()
+        for i in range(self.max_limit):
+            threading.Thread(target=self._worker, name=f'llm_{i}', daemon=True).start()
+        self._loop = asyncio.new_event_loop()
+        self._wake = None
+        ready = threading.Event()
+        threading.Thread(target=self._run_loop, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    # ------------
+    # event loop side
+    # ------------
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._wake = asyncio.Event()
+        self._loop.create_task(self._pump())
+        ready.set()
+        self._loop.run_forever()
+
+    async def _pump(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while self._waiters and self.in_flight < int(self.limit):
+                delay = max(self.paused_until - time.monotonic(), 0)
+                _, _, tokens, fut = self._waiters[0]
+                delay = max(delay, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if delay > 0:
+                    self._loop.call_later(delay, self._wake.set)
+                    break
+                heapq.heappop(self._waiters)
+                if fut.cancelled():
+                    continue
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                self.in_flight += 1
+                fut.set_result(None)
+
+    async def _acquire(self, tokens, priority):
+        fut = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, fut))
+        self._wake.set()
+        await fut
+
+    def _release(self, latency, rate_limited, retry_after, extra_tokens):
+        self.in_flight -= 1
+        self.stats['requests'] += 1
+        if extra_tokens:
+            self.tokens.take(extra_tokens)
+        if rate_limited:
+            self.stats['rate_limited'] += 1
+            self.limit = max(1.0, self.limit / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + (retry_after or DEFAULT_COOLDOWN))
+            rprint(f"[yellow]⚠️ LLM rate limited, concurrency lowered to {int(self.limit)}[/yellow]")
+        elif latency is not None:
+            if self.best_latency is None or latency < self.best_latency:
+                self.best_latency = latency
+            if latency <= self.best_latency * LATENCY_FACTOR:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._wake.set()
+
+    # ------------
+    # sync facade
+    # ------------
+
+    def acquire(self, tokens=0, priority=None):
+        """Block until a request slot is granted; pair every call with release()"""
+        priority = current_priority() if priority is None else priority
+        asyncio.run_coroutine_threadsafe(self._acquire(tokens, priority), self._loop).result()
+
+    def release(self, latency=None, rate_limited=False, retry_after=None, extra_tokens=0):
+        self._loop.call_soon_threadsafe(self._release, latency, rate_limited, retry_after, extra_tokens)
+
+    def _worker(self):
+        while True:
+            priority, _, fn, args, kwargs, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with llm_priority(priority):
+                    result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args, priority=PRIORITY_SPLIT, **kwargs):
+        """Run fn in the shared pool, inside the caller's job; LLM requests made inside it use `priority`"""
+        future = concurrent.futures.Future()
+        self._jobs.put((priority, next(self._seq), with_current_job(fn), args, kwargs, future))
+        return future
+
+    def map(self, fn, items, priority=PRIORITY_SPLIT):
+        futures = [self.submit(fn, item, priority=priority) for item in items]
+        return [future.result() for future in futures]
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_llm_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = LLMDispatcher(
+                    max_workers=load_key("max_workers"),
+                    rpm=_optional_key("api.rpm"),
+                    tpm=_optional_key("api.tpm"),
+                )
+    return _dispatcher
+
+def estimate_tokens(text):
+    # rough count good enough for budgeting: ~3 chars per token across languages
+    return max(1, len(text) // 3)
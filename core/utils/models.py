@@ -2,15 +2,15 @@
 # 定义中间产出文件
 # ------------------------------------------
 
-_2_CLEANED_CHUNKS = "output/log/cleaned_chunks.xlsx"
+_2_CLEANED_CHUNKS = "output/log/cleaned_chunks.parquet"
 _3_1_SPLIT_BY_NLP = "output/log/split_by_nlp.txt"
 _3_2_SPLIT_BY_MEANING = "output/log/split_by_meaning.txt"
 _4_1_TERMINOLOGY = "output/log/terminology.json"
-_4_2_TRANSLATION = "output/log/translation_results.xlsx"
-_5_SPLIT_SUB = "output/log/translation_results_for_subtitles.xlsx"
-_5_REMERGED = "output/log/translation_results_remerged.xlsx"
+_4_2_TRANSLATION = "output/log/translation_results.parquet"
+_5_SPLIT_SUB = "output/log/translation_results_for_subtitles.parquet"
+_5_REMERGED = "output/log/translation_results_remerged.parquet"
 
-_8_1_AUDIO_TASK = "output/audio/tts_tasks.xlsx"
+_8_1_AUDIO_TASK = "output/audio/tts_tasks.parquet"
 
 
 # ------------------------------------------
@@ -1,12 +1,17 @@
 import os
 import glob
 from core._1_ytdlp import find_video_files
+from core.utils.gpt_cache import close_cache
+from core.utils.step_cache import clear_step_cache
+from core.utils.pcm_cache import clear_pcm_cache
+from core.utils.config_utils import invalidate_job_state
+from core.utils.job_context import job_path
 import shutil
 
 def cleanup(history_dir="history"):
     # Get video file name
     video_file = find_video_files()
-    video_name = video_file.split("/")[1]
+    video_name = os.path.basename(video_file)
     video_name = os.path.splitext(video_name)[0]
     video_name = sanitize_filename(video_name)
     
@@ -18,24 +23,32 @@ def cleanup(history_dir="history"):
     os.makedirs(log_dir, exist_ok=True)
     os.makedirs(gpt_log_dir, exist_ok=True)
 
+    clear_pcm_cache()
+
     # Move non-log files
-    for file in glob.glob("output/*"):
+    for file in glob.glob(job_path("output/*")):
         if not file.endswith(('log', 'gpt_log')):
             move_file(file, video_history_dir)
 
     # Move log files
-    for file in glob.glob("output/log/*"):
+    for file in glob.glob(job_path("output/log/*")):
         move_file(file, log_dir)
 
-    # Move gpt_log files
-    for file in glob.glob("output/gpt_log/*"):
+    # Move gpt_log files (release the cache db first)
+    close_cache()
+    for file in glob.glob(job_path("output/gpt_log/*")):
         move_file(file, gpt_log_dir)
 
+    # Step snapshots only matter while the video is being worked on
+    clear_step_cache()
+    # job_state.json went to history with the other outputs
+    invalidate_job_state()
+
     # Delete empty output directories
     try:
-        os.rmdir("output/log")
-        os.rmdir("output/gpt_log")
-        os.rmdir("output")
+        os.rmdir(job_path("output/log"))
+        os.rmdir(job_path("output/gpt_log"))
+        os.rmdir(job_path("output"))
     except OSError:
         pass  # Ignore errors when deleting directories
 
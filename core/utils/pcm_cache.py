@@ -0,0 +1,87 @@
+import os
+import shutil
+import hashlib
+import subprocess
+from threading import Lock
+import numpy as np
+from rich import print as rprint
+from core.utils.job_context import job_path
+
+# ------------
+# decoded audio cache
+# ------------
+# Each source file is decoded once with ffmpeg to mono float32 PCM and kept on
+# disk as a raw .f32 file. Consumers get np.memmap views (zero copy) instead of
+# decoding the mp3 again with pydub/librosa/soundfile. The cache entry is keyed
+# by source path, mtime, size and sample rate, so a rewritten source (e.g. a
+# normalized vocal track) is decoded again. Decodes live in the workspace of
+# the current job.
+# ------------
+
+PCM_CACHE_DIR = 'output/audio/pcm'
+PCM_SAMPLE_RATE = 16000
+
+_lock = Lock()
+_maps = {}
+
+def _cache_file(audio_file, sample_rate):
+    st = os.stat(audio_file)
+    tag = f"{os.path.abspath(audio_file)}|{st.st_mtime_ns}|{st.st_size}|{sample_rate}"
+    name = os.path.splitext(os.path.basename(audio_file))[0]
+    return os.path.join(job_path(PCM_CACHE_DIR), f"{name}_{sample_rate}_{hashlib.md5(tag.encode()).hexdigest()[:12]}.f32")
+
+def _decode(audio_file, sample_rate, cache_file):
+    cache_dir = os.path.dirname(cache_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    # drop stale decodes of the same source
+    prefix = f"{os.path.splitext(os.path.basename(audio_file))[0]}_{sample_rate}_"
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith('.f32'):
+            stale_file = os.path.join(cache_dir, name)
+            _maps.pop(stale_file, None)
+            try:
+                os.remove(stale_file)
+            except OSError:
+                pass
+    rprint(f"[blue]🎵 Decoding <{audio_file}> to {sample_rate}Hz PCM cache...[/blue]")
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    subprocess.run([
+        'ffmpeg', '-y', '-i', audio_file, '-vn',
+        '-ac', '1', '-ar', str(sample_rate),
+        '-f', 'f32le', '-acodec', 'pcm_f32le', tmp_file
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    os.replace(tmp_file, cache_file)
+
+def load_pcm(audio_file, sample_rate=PCM_SAMPLE_RATE):
+    """Read-only float32 memmap of the whole file, decoding it on first use"""
+    audio_file = job_path(audio_file)
+    cache_file = _cache_file(audio_file, sample_rate)
+    with _lock:
+        pcm = _maps.get(cache_file)
+        if pcm is None:
+            if not os.path.exists(cache_file):
+                _decode(audio_file, sample_rate, cache_file)
+            if os.path.getsize(cache_file) == 0:
+                pcm = np.zeros(0, dtype=np.float32)
+            else:
+                pcm = np.memmap(cache_file, dtype=np.float32, mode='r')
+            _maps[cache_file] = pcm
+    return pcm
+
+def pcm_slice(audio_file, start=None, end=None, sample_rate=PCM_SAMPLE_RATE):
+    """View of the samples between start and end seconds (whole file when omitted)"""
+    pcm = load_pcm(audio_file, sample_rate)
+    start_sample = 0 if start is None else max(int(start * sample_rate), 0)
+    end_sample = len(pcm) if end is None else min(int(end * sample_rate), len(pcm))
+    return pcm[start_sample:end_sample]
+
+def pcm_duration(audio_file, sample_rate=PCM_SAMPLE_RATE):
+    return len(load_pcm(audio_file, sample_rate)) / sample_rate
+
+def clear_pcm_cache():
+    """Drop the current job's decoded audio, it is cheap to rebuild and too big to archive"""
+    cache_dir = job_path(PCM_CACHE_DIR)
+    with _lock:
+        for cache_file in [f for f in _maps if os.path.dirname(f) == cache_dir]:
+            del _maps[cache_file]
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,82 @@
+import os
+import threading
+from contextlib import contextmanager
+from rich import print as rprint
+from core.utils.config_utils import load_key
+
+# ------------
+# named resource slots
+# ------------
+# Jobs running side by side share the machine through a few named slots,
+# one per kind of work: "asr" (whisper/demucs, GPU or all cores), "llm"
+# (network bound, the LLM dispatcher bounds the requests themselves), "tts"
+# and "encode" (ffmpeg, spaCy and other CPU work). A job holds at most one
+# slot at a time, for the duration of one step, so while one video transcribes
+# the next can translate and a third can synthesize. Limits come from
+# slots.<name> in config.yaml, with defaults sized for one GPU/8-core host.
+# ------------
+
+SLOT_ASR = 'asr'
+SLOT_LLM = 'llm'
+SLOT_TTS = 'tts'
+SLOT_ENCODE = 'encode'
+DEFAULT_LIMITS = {
+    SLOT_ASR: 1,
+    SLOT_LLM: 4,
+    SLOT_TTS: 2,
+    SLOT_ENCODE: max(1, (os.cpu_count() or 1) // 4),
+}
+
+def slot_limit(name):
+    try:
+        return max(1, int(load_key(f"slots.{name}")))
+    except KeyError:
+        return DEFAULT_LIMITS[name]
+
+class ResourceSlots:
+    def __init__(self, limits=None):
+        limits = limits or {name: slot_limit(name) for name in DEFAULT_LIMITS}
+        self.limits = dict(limits)
+        self._semaphores = {name: threading.BoundedSemaphore(n) for name, n in self.limits.items()}
+        self._lock = threading.Lock()
+        self._busy = {name: 0 for name in self.limits}
+
+    @contextmanager
+    def acquire(self, name):
+        """Hold one `name` slot for the enclosed work; a None name runs without a slot"""
+        if name is None:
+            yield
+            return
+        semaphore = self._semaphores[name]
+        if not semaphore.acquire(blocking=False):
+            rprint(f"[dim]⏳ Waiting for a free <{name}> slot...[/dim]")
+            semaphore.acquire()
+        with self._lock:
+            self._busy[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._busy[name] -= 1
+            semaphore.release()
+
+    def busy(self):
+        """Slots in use per name"""
+        with self._lock:
+            return dict(self._busy)
+
+    @property
+    def capacity(self):
+        """Jobs that can make progress at once"""
+        return sum(self.limits.values())
+
+_slots = None
+_slots_lock = threading.Lock()
+
+def get_resource_slots():
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                _slots = ResourceSlots()
+    return _slots
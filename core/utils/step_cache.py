@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import functools
+from threading import Lock
+from rich import print as rprint
+from core.utils.config_utils import load_key
+from core.utils.artifacts import table_exists
+from core.utils.job_context import job_path
+
+# ------------
+# content-hashed step cache
+# ------------
+# A step declares what it reads (upstream files + config keys) and what it
+# writes. Its key is a hash of those inputs; after a run the outputs are copied
+# to STEP_CACHE_DIR/<step>/<key>. On the next call with the same key the outputs
+# are restored (if they changed since) and the step is skipped, so editing e.g.
+# the TTS voice only reruns the steps downstream of it.
+# Outputs are copied rather than hard linked: ffmpeg/pydub rewrite files in
+# place, which would silently corrupt a shared inode. Outputs larger than
+# step_cache.snapshot_max_mb (the extracted audio, the final videos) are not
+# copied: the manifest keeps their digest only, and the step is skipped only
+# while they are still in place unchanged.
+# Paths are declared in the output/ layout and resolved in the current job's
+# workspace on every call, so each job keeps its own snapshots.
+# ------------
+
+STEP_CACHE_DIR = 'output/.steps'
+# steps that build LLM prompts list this as an input, so editing a prompt reruns them
+PROMPTS_FILE = 'core/prompts.py'
+# config that shapes every LLM prompt/response
+LLM_CONFIG = ["api.model", "api.base_url", "whisper.language", "whisper.detected_language", "target_language"]
+DIGEST_MEMO_FILE = os.path.join(STEP_CACHE_DIR, 'digests.json')
+MAX_ENTRIES_PER_STEP = 2
+SNAPSHOT_MAX_MB = 64
+_CHUNK = 1 << 20
+
+_memo_lock = Lock()
+_memos = {}  # digest memo file -> {path: [mtime, size, digest]}, one per job workspace
+
+# ------------
+# file digests, memoized by (mtime, size) so big videos are hashed once
+# ------------
+
+def _load_memo():
+    memo_file = job_path(DIGEST_MEMO_FILE)
+    if memo_file not in _memos:
+        try:
+            with open(memo_file, 'r', encoding='utf-8') as f:
+                _memos[memo_file] = json.load(f)
+        except (OSError, ValueError):
+            _memos[memo_file] = {}
+    return _memos[memo_file]
+
+def _save_memo():
+    memo = _load_memo()
+    memo_file = job_path(DIGEST_MEMO_FILE)
+    os.makedirs(os.path.dirname(memo_file), exist_ok=True)
+    tmp_file = memo_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(memo, f)
+    os.replace(tmp_file, memo_file)
+
+def _file_digest(path):
+    st = os.stat(path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    with _memo_lock:
+        memo = _load_memo()
+        cached = memo.get(path)
+        if cached and cached[:2] == stamp:
+            return cached[2]
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_CHUNK), b''):
+            h.update(block)
+    digest = h.hexdigest()
+    with _memo_lock:
+        _load_memo()[path] = stamp + [digest]
+    return digest
+
+def path_digest(path):
+    """sha256 of a file, or of the (relative name, digest) list of a directory; None if missing"""
+    path = job_path(path)
+    if os.path.isfile(path):
+        return _file_digest(path)
+    if os.path.isdir(path):
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file = os.path.join(root, name)
+                h.update(os.path.relpath(file, path).encode('utf-8'))
+                h.update(_file_digest(file).encode())
+        return 'dir:' + h.hexdigest()
+    return None
+
+def clear_step_cache():
+    with _memo_lock:
+        _memos.pop(job_path(DIGEST_MEMO_FILE), None)
+    shutil.rmtree(job_path(STEP_CACHE_DIR), ignore_errors=True)
+
+# ------------
+# steps
+# ------------
+
+def _config_value(key):
+    try:
+        return load_key(key)
+    except KeyError:
+        return None
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+def _snapshot_max_bytes():
+    try:
+        return float(load_key("step_cache.snapshot_max_mb")) * (1 << 20)
+    except KeyError:
+        return SNAPSHOT_MAX_MB * (1 << 20)
+
+def _copy(src, dst):
+    _remove(dst)
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+class Step:
+    def __init__(self, name, inputs, config, outputs, version, adopt_existing):
+        self.name = name
+        self.inputs = list(inputs)
+        self.config = list(config)
+        self.outputs = list(outputs)
+        self.version = version
+        self.adopt_existing = adopt_existing
+
+    @property
+    def folder(self):
+        return os.path.join(job_path(STEP_CACHE_DIR), self.name)
+
+    def _input_paths(self):
+        paths = []
+        for item in self.inputs:
+            # callables resolve paths that are only known at run time, e.g. the input video
+            resolved = item() if callable(item) else item
+            paths.extend(resolved if isinstance(resolved, (list, tuple)) else [resolved])
+        return paths
+
+    def _input_digests(self):
+        return [[path, path_digest(path)] for path in self._input_paths()]
+
+    def _config_values(self):
+        return [[key, _config_value(key)] for key in self.config]
+
+    def key(self, input_digests=None, config_values=None):
+        payload = {
+            'step': self.name,
+            'version': self.version,
+            'inputs': self._input_digests() if input_digests is None else input_digests,
+            'config': self._config_values() if config_values is None else config_values,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:24]
+
+    def _entry_dir(self, key):
+        return os.path.join(self.folder, key)
+
+    def _manifest(self, key):
+        entry_dir = self._entry_dir(key)
+        try:
+            if os.path.exists(os.path.join(entry_dir, 'alias.json')):
+                with open(os.path.join(entry_dir, 'alias.json'), 'r', encoding='utf-8') as f:
+                    key = json.load(f)['key']
+                entry_dir = self._entry_dir(key)
+            with open(os.path.join(entry_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        manifest['key'] = key
+        return manifest
+
+    def _alias(self, alias, key):
+        # the step changed config it depends on (e.g. ASR saving the detected language in the job state):
+        # the rerun computes the key from the new values, point it at the same outputs
+        alias_dir = self._entry_dir(alias)
+        os.makedirs(alias_dir, exist_ok=True)
+        with open(os.path.join(alias_dir, 'alias.json'), 'w', encoding='utf-8') as f:
+            json.dump({'key': key}, f)
+
+    def record(self, key):
+        """Snapshot the current outputs under `key`, large ones by digest only"""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        outputs = {}
+        max_bytes = _snapshot_max_bytes()
+        for i, path in enumerate(self.outputs):
+            # manifests name outputs by their output/ path, the snapshot does not depend on the workspace
+            digest = path_digest(path)
+            outputs[path] = digest
+            if digest is not None and _size(job_path(path)) <= max_bytes:
+                _copy(job_path(path), os.path.join(tmp_dir, str(i)))
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({'outputs': outputs, 'created': time.time()}, f, ensure_ascii=False, indent=2)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self._evict(keep=key)
+
+    def _stale(self, manifest):
+        """Indices of the outputs that differ from the manifest; None if one of them has no snapshot"""
+        stale = []
+        for i, path in enumerate(self.outputs):
+            digest = manifest['outputs'].get(path)
+            # optional outputs the step did not write are left alone, another step may own them
+            if digest is None or path_digest(path) == digest:
+                continue
+            if not os.path.exists(os.path.join(self._entry_dir(manifest['key']), str(i))):
+                return None
+            stale.append(i)
+        return stale
+
+    def restore(self, manifest):
+        """Put the cached outputs of a manifest back where the pipeline expects them.
+
+        Returns the number of outputs copied back, or None if a changed output was
+        only recorded by its digest and the step has to run again.
+        """
+        key = manifest['key']
+        stale = self._stale(manifest)
+        if stale is None:
+            return None
+        for i in stale:
+            _copy(os.path.join(self._entry_dir(key), str(i)), job_path(self.outputs[i]))
+        os.utime(os.path.join(self._entry_dir(key), 'manifest.json'))
+        return len(stale)
+
+    def _evict(self, keep):
+        entries, aliases = [], []
+        for name in os.listdir(self.folder):
+            manifest = os.path.join(self.folder, name, 'manifest.json')
+            if os.path.exists(os.path.join(self.folder, name, 'alias.json')):
+                aliases.append(name)
+            elif name != keep and os.path.exists(manifest):
+                entries.append((os.path.getmtime(manifest), name))
+        for _, name in sorted(entries, reverse=True)[MAX_ENTRIES_PER_STEP - 1:]:
+            shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+        for name in aliases:
+            if self._manifest(name) is None:
+                shutil.rmtree(os.path.join(self.folder, name), ignore_errors=True)
+
+    def _can_adopt(self):
+        # outputs left by a run from before the step cache: trust them once, as the old exists-check did
+        return self.adopt_existing and not os.path.isdir(self.folder) and table_exists(self.outputs[0])
+
+    def is_current(self):
+        manifest = self._manifest(self.key())
+        if manifest is not None:
+            return self._stale(manifest) is not None
+        return self._can_adopt()
+
+    def run(self, func, *args, **kwargs):
+        input_digests, config_values = self._input_digests(), self._config_values()
+        key = self.key(input_digests, config_values)
+        try:
+            manifest = self._manifest(key)
+            restored = None if manifest is None else self.restore(manifest)
+            if restored is not None:
+                note = f", restored {restored} output(s)" if restored else ""
+                rprint(f"[yellow]⚠️ Inputs of <{self.name}> unchanged{note}, skip step.[/yellow]")
+                return None
+            if self._can_adopt():
+                self.record(key)
+                rprint(f"[yellow]⚠️ File <{self.outputs[0]}> already exists, skip <{self.name}> step.[/yellow]")
+                return None
+            result = func(*args, **kwargs)
+            # a step that returned without its main artifact is not done, record nothing so it runs again
+            if path_digest(self.outputs[0]) is None:
+                raise FileNotFoundError(f"Step <{self.name}> finished without writing {self.outputs[0]}")
+            self.record(key)
+            config_after = self._config_values()
+            if config_after != config_values:
+                self._alias(self.key(input_digests, config_after), key)
+            return result
+        finally:
+            with _memo_lock:
+                _save_memo()
+
+def cached_step(name=None, inputs=(), config=(), outputs=(), version=1, adopt_existing=False):
+    """Memoize a pipeline step on the content of its input files and config keys.
+
+    `inputs` are paths (or callables returning paths) the step reads, `config`
+    the config keys it depends on, `outputs` the files/dirs it writes. The first
+    output is the step's main artifact. With `adopt_existing`, outputs found from
+    an older run are kept the first time instead of recomputed.
+    """
+    def decorator(func):
+        step = Step(name or func.__name__, inputs, config, outputs, version, adopt_existing)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return step.run(func, *args, **kwargs)
+        wrapper.step = step
+        return wrapper
+    return decorator
+
+def is_step_current(step_func):
+    """True if calling the cached step now would skip it"""
+    return step_func.step.is_current()
+
+def record_step(step_func):
+    """Record the current outputs of a step that were produced by another code path"""
+    step = step_func.step
+    step.record(step.key())
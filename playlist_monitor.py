@@ -11,13 +11,15 @@
 
 import os
 import sys
-import time
 import json
+import asyncio
+import threading
 import requests
 import yt_dlp
 import logging
 from datetime import datetime
 from pathlib import Path
+from contextlib import contextmanager
 import shutil
 from typing import Dict, List, Optional, Tuple
 
@@ -27,7 +29,12 @@ sys.path.append(current_dir)
 
 from core.st_utils.imports_and_utils import *
 from core.utils.onekeycleanup import cleanup
-from core.utils.config_utils import load_key, update_key
+from core.utils.pcm_cache import clear_pcm_cache
+from core.utils.gpt_cache import close_cache
+from core.utils.step_cache import clear_step_cache
+from core.utils.config_utils import load_key, update_key, invalidate_job_state
+from core.utils.job_context import OUTPUT_ROOT, new_job, use_job, job_path
+from core.utils.resource_slots import get_resource_slots, SLOT_ASR, SLOT_LLM, SLOT_TTS, SLOT_ENCODE
 from core.utils.ask_gpt import ask_gpt
 from core import *
 
@@ -247,6 +254,71 @@ except ImportError:
     BILIBILI_UPLOADER_AVAILABLE = False
     logger.warning("Bilibili uploader not available. Please install: pip install biliup")
 
+# === 临时还原stdout/stderr，避免yt-dlp输出被日志捕获 ===
+# 下载在工作线程中进行，可能有多个同时进行：第一个进入的线程换出日志重定向，
+# 最后一个离开的线程换回，无论下载是否出错
+_stdio_lock = threading.Lock()
+_stdio_users = 0
+_saved_stdio = None
+
+@contextmanager
+def real_stdio():
+    global _stdio_users, _saved_stdio
+    with _stdio_lock:
+        if _stdio_users == 0:
+            _saved_stdio = (sys.stdout, sys.stderr)
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        _stdio_users += 1
+    try:
+        yield
+    finally:
+        with _stdio_lock:
+            _stdio_users -= 1
+            if _stdio_users == 0:
+                sys.stdout, sys.stderr = _saved_stdio
+                _saved_stdio = None
+
+# ------------
+# 流水线设置
+# ------------
+# 新视频依次经过 下载 → 处理(转录/翻译/配音 + 存档) → 上传 三个阶段，阶段之间用有界队列
+# 连接，每个阶段有自己的并发数。下一个视频在当前视频转录时就开始下载，上传在后台进行，
+# 处理阶段的各步骤再按资源槽位(asr/llm/tts/encode)排队，所以繁忙播放列表的吞吐量取决于
+# 最慢的阶段，而不是所有阶段之和。每个视频在 playlist_monitor/jobs/<任务> 下有独立的
+# 工作目录，互不干扰。可在 playlist_monitor_config.json 的 monitor_settings 中调整。
+# ------------
+
+MONITOR_CONFIG_FILE = "playlist_monitor_config.json"
+MONITOR_JOBS_DIR = "playlist_monitor/jobs"
+DEFAULT_MONITOR_SETTINGS = {
+    "processing_delay": 5,   # 两次下载之间的间隔（秒）
+    "download_workers": 1,
+    "process_workers": 2,    # 同时在处理阶段的视频数，步骤本身再受资源槽位限制
+    "upload_workers": 1,
+    "queue_size": 2,         # 每个阶段队列最多积压的视频数，限制预下载的数量
+}
+
+async def run_stage(inbox: asyncio.Queue, handler, workers: int, outbox: asyncio.Queue = None, outbox_workers: int = 0):
+    """用 workers 个协程处理 inbox 中的条目直到收到结束标记(None)，handler 的非 None 结果放入 outbox"""
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is None:
+                return
+            try:
+                result = await handler(item)
+            except Exception as e:
+                logger.error(f"Pipeline stage error: {e}")
+                result = None
+            if result is not None and outbox is not None:
+                await outbox.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    # 本阶段全部完成后通知下游阶段的每个协程结束
+    if outbox is not None:
+        for _ in range(outbox_workers):
+            await outbox.put(None)
+
 class PlaylistMonitor:
     def __init__(self):
         logger.info("Initializing PlaylistMonitor...")
@@ -273,11 +345,16 @@ class PlaylistMonitor:
         # 加载代理配置
         self.proxy_config = self.load_proxy_config()
         logger.info(f"Proxy config loaded: {self.proxy_config.get('proxy_settings', {}).get('enabled', False)}")
+        self.apply_proxy_env()
         
         # 加载上传器配置
         self.uploader_config = self.load_uploader_config()
         logger.info(f"Uploader config loaded: {self.uploader_config}")
         
+        # 加载流水线设置
+        self.monitor_settings = self.load_monitor_settings()
+        logger.info(f"Monitor settings loaded: {self.monitor_settings}")
+        
         # 加载已处理的视频记录
         self.processed_videos = self.load_processed_videos()
         logger.info(f"Processed videos loaded: {len(self.processed_videos.get('中字', []))} 中字, {len(self.processed_videos.get('中配', []))} 中配")
@@ -324,6 +401,15 @@ class PlaylistMonitor:
         logger.info("No proxy config file found, using default")
         return {"proxy_settings": {"enabled": False}}
     
+    def apply_proxy_env(self):
+        """设置代理环境变量，启动时设置一次，下载线程不再修改进程环境"""
+        if self.proxy_config.get("proxy_settings", {}).get("enabled", False):
+            proxy_settings = self.proxy_config["proxy_settings"]
+            os.environ['https_proxy'] = proxy_settings.get("https_proxy", "http://127.0.0.1:7890")
+            os.environ['http_proxy'] = proxy_settings.get("http_proxy", "http://127.0.0.1:7890")
+            os.environ['all_proxy'] = proxy_settings.get("all_proxy", "socks5://127.0.0.1:7890")
+            logger.info(f"Using proxy: {os.environ['https_proxy']}")
+    
     def load_uploader_config(self) -> Dict:
         """加载上传器配置"""
         logger.info("Loading uploader config...")
@@ -339,6 +425,17 @@ class PlaylistMonitor:
         logger.info("No uploader config file found, using default")
         return {"douyin": {"enabled": False}, "bilibili": {"enabled": False}}
     
+    def load_monitor_settings(self) -> Dict:
+        """加载流水线设置，缺少的项使用默认值"""
+        settings = dict(DEFAULT_MONITOR_SETTINGS)
+        if os.path.exists(MONITOR_CONFIG_FILE):
+            try:
+                with open(MONITOR_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    settings.update(json.load(f).get("monitor_settings", {}))
+            except Exception as e:
+                logger.error(f"Error loading monitor settings: {e}")
+        return settings
+    
     def save_processed_videos(self):
         """保存已处理的视频记录"""
         try:
@@ -363,13 +460,7 @@ class PlaylistMonitor:
                 ydl_opts['proxy'] = self.proxy_config.get("yt_dlp_proxy", "http://127.0.0.1:7890")
                 logger.info(f"Using proxy: {ydl_opts['proxy']}")
             
-            # === 临时还原stdout/stderr，避免yt-dlp输出被日志捕获 ===
-            current_stdout = sys.stdout
-            current_stderr = sys.stderr
-            sys.stdout = sys.__stdout__
-            sys.stderr = sys.__stderr__
-            
-            try:
+            with real_stdio():
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     playlist_info = ydl.extract_info(playlist_url, download=False)
                     videos = playlist_info.get('entries', [])
@@ -380,11 +471,6 @@ class PlaylistMonitor:
                     logger.info(f"Playlist info: {len(videos)} total videos, {len(valid_videos)} valid videos")
                     
                     return valid_videos
-            finally:
-                # 恢复日志重定向
-                sys.stdout = current_stdout
-                sys.stderr = current_stderr
-            # === 还原结束 ===
             
         except Exception as e:
             logger.error(f"Error getting playlist videos: {e}")
@@ -408,26 +494,9 @@ class PlaylistMonitor:
         """下载视频"""
         logger.info(f"Downloading video: {video_url}")
         try:
-            # 设置代理环境变量
-            if self.proxy_config.get("proxy_settings", {}).get("enabled", False):
-                proxy_settings = self.proxy_config["proxy_settings"]
-                os.environ['https_proxy'] = proxy_settings.get("https_proxy", "http://127.0.0.1:7890")
-                os.environ['http_proxy'] = proxy_settings.get("http_proxy", "http://127.0.0.1:7890")
-                os.environ['all_proxy'] = proxy_settings.get("all_proxy", "socks5://127.0.0.1:7890")
-                logger.info(f"Using proxy: {os.environ['https_proxy']}")
-
-            # === 临时还原stdout/stderr，避免yt-dlp输出被日志捕获 ===
-            current_stdout = sys.stdout
-            current_stderr = sys.stderr
-            sys.stdout = sys.__stdout__
-            sys.stderr = sys.__stderr__
-
-            _1_ytdlp.download_video_ytdlp(video_url, resolution=load_key("ytb_resolution"))
-
-            # 恢复日志重定向
-            sys.stdout = current_stdout
-            sys.stderr = current_stderr
-            # === 还原结束 ===
+            # 代理环境变量已在启动时设置（apply_proxy_env）
+            with real_stdio():
+                _1_ytdlp.download_video_ytdlp(video_url, resolution=load_key("ytb_resolution"))
 
             logger.info("Video downloaded successfully")
             return True
@@ -435,32 +504,36 @@ class PlaylistMonitor:
             logger.error(f"Error downloading video: {e}")
             return False
     
-    def process_text_only(self, video_url: str) -> bool:
-        """仅处理文本翻译和字幕生成"""
+    def process_text_only(self, video_url: str, slots=None) -> bool:
+        """仅处理文本翻译和字幕生成，每一步占用对应的资源槽位"""
         logger.info("Processing text translation and subtitle generation...")
+        slots = slots or get_resource_slots()
         try:
             # 1. 转录
             logger.info("Step 1: Transcribing with Whisper...")
-            _2_asr.transcribe()
+            with slots.acquire(SLOT_ASR):
+                _2_asr.transcribe()
             
             # 2. 分割句子
             logger.info("Step 2: Splitting sentences...")
-            _3_1_split_nlp.split_by_spacy()
-            _3_2_split_meaning.split_sentences_by_meaning()
+            with slots.acquire(SLOT_ENCODE):
+                _3_1_split_nlp.split_by_spacy()
             
-            # 3. 总结和翻译
+            # 3. 总结和翻译（与按语义分句流水线并行）
             logger.info("Step 3: Summarizing and translating...")
-            _4_1_summarize.get_summary()
-            _4_2_translate.translate_all()
+            with slots.acquire(SLOT_LLM):
+                _4_2_translate.split_and_translate()
             
             # 4. 处理和字幕对齐
             logger.info("Step 4: Processing and aligning subtitles...")
-            _5_split_sub.split_for_sub_main()
-            _6_gen_sub.align_timestamp_main()
+            with slots.acquire(SLOT_LLM):
+                _5_split_sub.split_for_sub_main()
+                _6_gen_sub.align_timestamp_main()
             
             # 5. 合并字幕到视频
             logger.info("Step 5: Merging subtitles to video...")
-            _7_sub_into_vid.merge_subtitles_to_video()
+            with slots.acquire(SLOT_ENCODE):
+                _7_sub_into_vid.merge_subtitles_to_video()
             
             logger.info("Text processing completed successfully!")
             return True
@@ -469,34 +542,40 @@ class PlaylistMonitor:
             logger.error(f"Error in text processing: {e}")
             return False
     
-    def process_with_dubbing(self, video_url: str) -> bool:
+    def process_with_dubbing(self, video_url: str, slots=None) -> bool:
         """处理文本翻译、字幕生成和配音"""
         logger.info("Processing text translation, subtitle generation, and dubbing...")
+        slots = slots or get_resource_slots()
         try:
             # 1-5. 文本处理步骤（与process_text_only相同）
-            if not self.process_text_only(video_url):
+            if not self.process_text_only(video_url, slots):
                 return False
             
             # 6. 生成音频任务
             logger.info("Step 6: Generating audio tasks...")
-            _8_1_audio_task.gen_audio_task_main()
-            _8_2_dub_chunks.gen_dub_chunks()
+            with slots.acquire(SLOT_LLM):
+                _8_1_audio_task.gen_audio_task_main()
+                _8_2_dub_chunks.gen_dub_chunks()
             
             # 7. 提取参考音频
             logger.info("Step 7: Extracting reference audio...")
-            _9_refer_audio.extract_refer_audio_main()
+            with slots.acquire(SLOT_ASR):
+                _9_refer_audio.extract_refer_audio_main()
             
             # 8. 生成音频
             logger.info("Step 8: Generating audio...")
-            _10_gen_audio.gen_audio()
+            with slots.acquire(SLOT_TTS):
+                _10_gen_audio.gen_audio()
             
             # 9. 合并完整音频
             logger.info("Step 9: Merging full audio...")
-            _11_merge_audio.merge_full_audio()
+            with slots.acquire(SLOT_ENCODE):
+                _11_merge_audio.merge_full_audio()
             
             # 10. 合并配音到视频
             logger.info("Step 10: Merging dubbing to video...")
-            _12_dub_to_vid.merge_video_audio()
+            with slots.acquire(SLOT_ENCODE):
+                _12_dub_to_vid.merge_video_audio()
             
             logger.info("Dubbing processing completed successfully!")
             return True
@@ -611,11 +690,18 @@ Chinese translation:"""
             else:
                 video_dir = history_dir
             
-            # 移动输出文件到视频特定的历史文件夹
-            if os.path.exists("output"):
+            # 解码缓存体积大且可重建，不存档
+            clear_pcm_cache()
+            # 移动前释放本任务的 GPT 缓存数据库连接，步骤快照只在处理过程中有用
+            close_cache()
+            clear_step_cache()
+
+            # 移动当前任务工作目录中的输出文件到视频特定的历史文件夹
+            output_dir = job_path("output")
+            if os.path.exists(output_dir):
                 moved_files = []
-                for item in os.listdir("output"):
-                    src_path = os.path.join("output", item)
+                for item in os.listdir(output_dir):
+                    src_path = os.path.join(output_dir, item)
                     dst_path = os.path.join(video_dir, item)
                     
                     if os.path.isfile(src_path):
@@ -628,6 +714,8 @@ Chinese translation:"""
                         moved_files.append(item)
                 
                 logger.info(f"Moved {len(moved_files)} files to history: {moved_files}")
+                # job_state.json 已随输出移走
+                invalidate_job_state()
             
             logger.info(f"Archive completed for {playlist_name}!")
             return True
@@ -681,7 +769,7 @@ Chinese translation:"""
                 theme_title = video_title
             
             # 生成新的标题格式：【{playlist_name}】{video_title}——{theme_title}
-            final_title = self.generate_new_title(playlist_name, video_title, theme_title)
+            final_title = await asyncio.to_thread(self.generate_new_title, playlist_name, video_title, theme_title)
             
             logger.info(f"Uploading to Douyin: {video_title}")
             # 显示标题预览，支持长标题
@@ -791,7 +879,7 @@ Chinese translation:"""
                 theme_title = video_title
             
             # 生成新的标题格式：【{playlist_name}】{video_title}——{theme_title}
-            final_title = self.generate_new_title(playlist_name, video_title, theme_title)
+            final_title = await asyncio.to_thread(self.generate_new_title, playlist_name, video_title, theme_title)
             
             logger.info(f"Uploading to Bilibili: {video_title}")
             # 显示标题预览，支持长标题
@@ -856,84 +944,137 @@ Chinese translation:"""
             logger.error(f"Error uploading to Bilibili: {e}")
             return False
     
-    async def process_video(self, video_info: Dict, playlist_name: str) -> bool:
-        """处理单个视频"""
+    def uploads_enabled(self) -> bool:
+        return any(self.uploader_config.get(name, {}).get("enabled", False) for name in ("douyin", "bilibili"))
+    
+    def _in_job(self, job, fn, *args):
+        """在 job 的工作目录中运行 fn，供工作线程使用"""
+        with use_job(job):
+            return fn(*args)
+    
+    def _discard_workspace(self, job):
+        if job.root != OUTPUT_ROOT:
+            shutil.rmtree(job.root, ignore_errors=True)
+    
+    async def download_stage(self, item: Tuple[int, Dict, str]):
+        """下载阶段：在视频自己的工作目录中下载，成功后交给处理阶段"""
+        index, video_info, playlist_name = item
         video_id = video_info.get('id')
+        video_title = video_info.get('title', 'Unknown')
+        
+        # 两次下载之间保持间隔，避免过于频繁
+        if index > 0 and self.monitor_settings["processing_delay"] > 0:
+            await asyncio.sleep(self.monitor_settings["processing_delay"])
+        
+        # 0. 每个视频独立的工作目录，清理上次残留的文件
+        job = new_job(f"{playlist_name}_{video_id}", jobs_dir=MONITOR_JOBS_DIR)
+        self._discard_workspace(job)
+        
+        # 1. 下载视频
+        logger.info(f"Downloading video: {video_title} ({playlist_name})")
         video_url = f"https://www.youtube.com/watch?v={video_id}"
+        if not await asyncio.to_thread(self._in_job, job, self.download_video, video_url):
+            logger.error(f"Failed to download video {video_title}")
+            # 标记为已处理，防止重复处理
+            self.mark_video_processed(video_id, playlist_name)
+            self._discard_workspace(job)
+            self.pipeline_results.append((playlist_name, False))
+            return None
+        return video_info, playlist_name, job
+    
+    async def process_stage(self, item: Tuple[Dict, str, object]):
+        """处理阶段：转录、翻译、配音并存档，需要上传时交给上传阶段"""
+        video_info, playlist_name, job = item
+        video_id = video_info.get('id')
         video_title = video_info.get('title', 'Unknown')
+        video_url = f"https://www.youtube.com/watch?v={video_id}"
         
         logger.info(f"Processing video: {video_title}")
         logger.info(f"Video ID: {video_id}")
         logger.info(f"Playlist: {playlist_name}")
         
         try:
-            # 0. 清理output目录，确保只处理一个视频
-            logger.info("Cleaning output directory...")
-            if os.path.exists("output"):
-                for item in os.listdir("output"):
-                    item_path = os.path.join("output", item)
-                    try:
-                        if os.path.isfile(item_path):
-                            os.remove(item_path)
-                        elif os.path.isdir(item_path):
-                            shutil.rmtree(item_path)
-                    except Exception as e:
-                        logger.warning(f"Could not remove {item_path}: {e}")
-            
-            # 1. 下载视频
-            if not self.download_video(video_url):
-                logger.error(f"Failed to download video {video_title}")
-                # 标记为已处理，防止重复处理
-                self.mark_video_processed(video_id, playlist_name)
-                return False
-            
             # 2. 根据播放列表类型选择处理方式
-            playlist_config = self.playlists[playlist_name]
-            success = False
-            
-            if playlist_config['dubbing']:
+            if self.playlists[playlist_name]['dubbing']:
                 # 中配播放列表：翻译并配音
                 logger.info("Processing with dubbing...")
-                success = self.process_with_dubbing(video_url)
+                process = self.process_with_dubbing
             else:
                 # 中字播放列表：仅翻译生成字幕
                 logger.info("Processing text only...")
-                success = self.process_text_only(video_url)
+                process = self.process_text_only
+            success = await asyncio.to_thread(self._in_job, job, process, video_url, get_resource_slots())
             
+            # 3. 存档到历史
             if success:
-                # 3. 存档到历史
-                self.archive_to_history(playlist_name, video_info)
-                
-                # 4. 上传到抖音（如果启用）
-                if self.uploader_config.get("douyin", {}).get("enabled", False):
-                    logger.info("Uploading to Douyin...")
-                    await self.upload_to_douyin(video_info, playlist_name)
-                
-                # 5. 上传到bilibili（如果启用）
-                if self.uploader_config.get("bilibili", {}).get("enabled", False):
-                    logger.info("Uploading to Bilibili...")
-                    await self.upload_to_bilibili(video_info, playlist_name)
-                
+                await asyncio.to_thread(self._in_job, job, self.archive_to_history, playlist_name, video_info)
                 logger.info(f"Video {video_title} processed successfully!")
             else:
                 logger.error(f"Failed to process video {video_title}")
-            
-            # 无论成功还是失败，都标记为已处理，防止重复处理
-            self.mark_video_processed(video_id, playlist_name)
-            return success
-                
         except Exception as e:
             logger.error(f"Error processing video {video_title}: {e}")
-            # 即使发生异常，也标记为已处理，防止重复处理
+            success = False
+        finally:
+            # 无论成功还是失败，都标记为已处理，防止重复处理
             self.mark_video_processed(video_id, playlist_name)
-            return False
+            self._discard_workspace(job)
+        
+        self.pipeline_results.append((playlist_name, success))
+        if success and self.uploads_enabled():
+            return video_info, playlist_name
+        return None
+    
+    async def upload_stage(self, item: Tuple[Dict, str]):
+        """上传阶段：从历史文件夹上传，与后续视频的处理同时进行"""
+        video_info, playlist_name = item
+        
+        # 4. 上传到抖音（如果启用）
+        if self.uploader_config.get("douyin", {}).get("enabled", False):
+            logger.info("Uploading to Douyin...")
+            await self.upload_to_douyin(video_info, playlist_name)
+        
+        # 5. 上传到bilibili（如果启用）
+        if self.uploader_config.get("bilibili", {}).get("enabled", False):
+            logger.info("Uploading to Bilibili...")
+            await self.upload_to_bilibili(video_info, playlist_name)
+        return None
+    
+    async def run_pipeline(self, videos: List[Tuple[Dict, str]]):
+        """让视频流经 下载 → 处理 → 上传 三个阶段，返回每个视频的 (播放列表, 是否成功)"""
+        settings = self.monitor_settings
+        download_workers = max(1, int(settings["download_workers"]))
+        process_workers = max(1, int(settings["process_workers"]))
+        upload_workers = max(1, int(settings["upload_workers"]))
+        queue_size = max(1, int(settings["queue_size"]))
+        logger.info(f"Pipeline: {len(videos)} videos, workers download={download_workers} "
+                    f"process={process_workers} upload={upload_workers}, queue size {queue_size}")
+        
+        download_queue = asyncio.Queue()
+        process_queue = asyncio.Queue(maxsize=queue_size)
+        upload_queue = asyncio.Queue(maxsize=queue_size)
+        for index, (video_info, playlist_name) in enumerate(videos):
+            download_queue.put_nowait((index, video_info, playlist_name))
+        for _ in range(download_workers):
+            download_queue.put_nowait(None)
+        
+        self.pipeline_results = []
+        await asyncio.gather(
+            run_stage(download_queue, self.download_stage, download_workers, process_queue, process_workers),
+            run_stage(process_queue, self.process_stage, process_workers, upload_queue, upload_workers),
+            run_stage(upload_queue, self.upload_stage, upload_workers),
+        )
+        return self.pipeline_results
+    
+    async def process_video(self, video_info: Dict, playlist_name: str) -> bool:
+        """处理单个视频"""
+        results = await self.run_pipeline([(video_info, playlist_name)])
+        return bool(results) and results[0][1]
     
     async def check_playlists(self):
-        """检查所有播放列表的新视频"""
+        """检查所有播放列表的新视频，并把所有新视频送入同一条流水线"""
         logger.info(f"Checking playlists at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        total_new_videos = 0
-        
+        new_videos = []
         for playlist_name, playlist_config in self.playlists.items():
             logger.info(f"Checking playlist: {playlist_name}")
             logger.info(f"Description: {playlist_config['description']}")
@@ -945,49 +1086,32 @@ Chinese translation:"""
             
             # 统计已处理和新视频数量
             processed_count = len(self.processed_videos.get(playlist_name, []))
-            new_videos = []
-            for video in videos:
-                if video and 'id' in video:
-                    video_id = video['id']
-                    if self.is_new_video(video_id, playlist_name):
-                        new_videos.append(video)
+            playlist_new = [video for video in videos
+                            if video and 'id' in video and self.is_new_video(video['id'], playlist_name)]
+            new_videos.extend((video, playlist_name) for video in playlist_new)
             
             logger.info(f"{playlist_name} stats:")
             logger.info(f"  - Total videos in playlist: {len(videos)}")
             logger.info(f"  - Already processed: {processed_count}")
-            logger.info(f"  - New videos found: {len(new_videos)}")
-            
-            if new_videos:
-                logger.info(f"Processing {len(new_videos)} new videos...")
-                
-                # 处理新视频
-                success_count = 0
-                failed_count = 0
-                
-                for i, video in enumerate(new_videos, 1):
-                    logger.info(f"Processing video {i}/{len(new_videos)}: {video.get('title', 'Unknown')[:50]}...")
-                    
-                    if await self.process_video(video, playlist_name):
-                        logger.info(f"Successfully processed video: {video.get('title', 'Unknown')}")
-                        success_count += 1
-                        total_new_videos += 1
-                    else:
-                        logger.error(f"Failed to process video: {video.get('title', 'Unknown')}")
-                        failed_count += 1
-                    
-                    # 处理间隔，避免过于频繁
-                    if i < len(new_videos):  # 最后一个视频不需要等待
-                        logger.info("Waiting 5 seconds before next video...")
-                        time.sleep(5)
-                
-                logger.info(f"{playlist_name} processing summary:")
-                logger.info(f"  - Successfully processed: {success_count}")
-                logger.info(f"  - Failed to process: {failed_count}")
-                logger.info(f"  - All videos marked as processed (including failed ones)")
-            else:
-                logger.info(f"No new videos to process in {playlist_name}")
+            logger.info(f"  - New videos found: {len(playlist_new)}")
+        
+        if not new_videos:
+            logger.info("No new videos to process")
+            return
+        
+        logger.info(f"Processing {len(new_videos)} new videos...")
+        results = await self.run_pipeline(new_videos)
+        
+        for playlist_name in self.playlists:
+            outcomes = [success for name, success in results if name == playlist_name]
+            if not outcomes:
+                continue
+            logger.info(f"{playlist_name} processing summary:")
+            logger.info(f"  - Successfully processed: {sum(outcomes)}")
+            logger.info(f"  - Failed to process: {len(outcomes) - sum(outcomes)}")
+            logger.info(f"  - All videos marked as processed (including failed ones)")
         
-        logger.info(f"Summary: Processed {total_new_videos} new videos across all playlists")
+        logger.info(f"Summary: Processed {sum(success for _, success in results)} new videos across all playlists")
     
     async def run_monitor(self, check_interval: int = 60):
         """运行监控器"""
@@ -999,7 +1123,7 @@ Chinese translation:"""
             while True:
                 await self.check_playlists()
                 logger.info(f"Next check in {check_interval} seconds...")
-                time.sleep(check_interval)
+                await asyncio.sleep(check_interval)
                 
         except KeyboardInterrupt:
             logger.info("Monitor stopped by user")
@@ -1025,5 +1149,4 @@ async def main():
     await monitor.run_monitor()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main()) 
\ No newline at end of file
@@ -47,12 +47,16 @@ def process_text():
         _2_asr.transcribe()
     with st.spinner(t("Splitting long sentences...")):  
         _3_1_split_nlp.split_by_spacy()
-        _3_2_split_meaning.split_sentences_by_meaning()
+        if load_key("pause_before_translate"):
+            _3_2_split_meaning.split_sentences_by_meaning()
     with st.spinner(t("Summarizing and translating...")):
-        _4_1_summarize.get_summary()
         if load_key("pause_before_translate"):
+            _4_1_summarize.get_summary()
             input(t("⚠️ PAUSE_BEFORE_TRANSLATE. Go to `output/log/terminology.json` to edit terminology. Then press ENTER to continue..."))
-        _4_2_translate.translate_all()
+            _4_2_translate.translate_all()
+        else:
+            # split by meaning, summary and translation run overlapped
+            _4_2_translate.split_and_translate()
     with st.spinner(t("Processing and aligning subtitles...")): 
         _5_split_sub.split_for_sub_main()
         _6_gen_sub.align_timestamp_main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# ------------
+# Test Dubbing Chunks
+# ------------
+# Golden test for core/_8_2_dub_chunks.py: a fixed timing table and SRT pair
+# with the cut_off / lines / src_lines the row-by-row chunker produced for
+# them, so the array-based version must give exactly the same chunks.
+# ------------
+"""
+
+import os
+import sys
+import tempfile
+import pandas as pd
+
+# Add current directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+import core._8_2_dub_chunks as dub_chunks
+
+CONFIG = {"tolerance": 1.5, "speed_factor.accept": 1.2}
+
+# timing table after analyze_subtitle_timing_and_speed (tolerance 1.5, accept 1.2)
+TIMING_TABLE = {
+    "est_dur": [2.0, 3.9, 1.0, 2.8, 2.9, 1.0, 2.2, 0.8, 5.0, 1.1, 0.9, 3.4, 2.6, 1.5, 4.5],
+    "duration": [2.5, 2.0, 1.2, 1.5, 1.4, 3.0, 1.0, 1.6, 1.0, 1.3, 1.0, 1.2, 1.1, 2.0, 1.0],
+    "gap": [0.2, 0.1, 0.3, 0.1, 0.05, 2.0, 0.1, 0.4, 0.1, 0.2, 0.0, 0.1, 0.1, 0.9, 3.0],
+    "tolerance": [0.2, 0.1, 0.3, 0.1, 0.05, 1.5, 0.1, 0.4, 0.1, 0.2, 0.0, 0.1, 0.1, 0.9, 1.5],
+    "tol_dur": [2.7, 2.1, 1.5, 1.6, 1.45, 4.5, 1.1, 2.0, 1.1, 1.5, 1.0, 1.3, 1.2000000000000002, 2.9, 2.5],
+    "if_too_fast": [-1, 2, 0, 2, 2, -1, 2, -1, 2, 0, -1, 2, 2, 0, 2],
+}
+EXPECTED_CUT_OFF = [0, 0, 1, 0, 0, 1, 0, 1, 0, 0, 1, 0, 0, 1, 1]
+
+TRANS_LINES = ["你好，世界。", "这是（注释）第一句", "话的后半部分！", "- 第二句-话", "...",
+               "Mixed English 文本", "line two", "of three", "最后一行"]
+SRC_LINES = ["Hello, world.", "This is (note) the first", "half of the sentence!", "- Second-line", "...",
+             "Mixed English text", "Line two", "of three", "The last line"]
+TASK_TEXTS = ["你好世界", "这是第一句话的后半部分", "第二句话", "", "Mixed English 文本 line two of three", "最后一行。"]
+EXPECTED_LINES = [["你好，世界。"], ["这是第一句", "话的后半部分！"], [" 第二句话"], ["..."],
+                  ["Mixed English 文本", "line two", "of three"], ["最后一行"]]
+EXPECTED_SRC_LINES = [["Hello, world."], ["This is  the first", "half of the sentence!"], [" Secondline"], ["..."],
+                      ["Mixed English text", "Line two", "of three"], ["The last line"]]
+
+def write_srt(path, texts):
+    blocks = [f"{i}\n00:00:{i:02d},000 --> 00:00:{i + 1:02d},000\n{text}" for i, text in enumerate(texts, 1)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(blocks) + "\n")
+
+def match(targets, lines):
+    return dub_chunks.match_lines([dub_chunks.clean_text(text) for text in targets], lines)
+
+def expect_matching_failure(targets, lines):
+    try:
+        match(targets, lines)
+    except ValueError:
+        return
+    raise AssertionError(f"matching {targets} against {lines} should fail")
+
+def test_process_cutoffs():
+    """cut_off of a table with gap cuts, two-line and three-line merges"""
+    load_key, load_float = dub_chunks.load_key, dub_chunks.load_float
+    dub_chunks.load_key = dub_chunks.load_float = CONFIG.__getitem__
+    try:
+        df = dub_chunks.process_cutoffs(pd.DataFrame(TIMING_TABLE))
+    finally:
+        dub_chunks.load_key, dub_chunks.load_float = load_key, load_float
+    assert df["cut_off"].tolist() == EXPECTED_CUT_OFF
+
+def test_match_lines():
+    """lines / src_lines of each task, read from an SRT pair"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        trans_srt, src_srt = os.path.join(tmp_dir, "trans.srt"), os.path.join(tmp_dir, "src.srt")
+        write_srt(trans_srt, TRANS_LINES)
+        write_srt(src_srt, SRC_LINES)
+        content_lines = dub_chunks.read_srt_texts(trans_srt)
+        ori_content_lines = dub_chunks.read_srt_texts(src_srt)
+    spans = match(TASK_TEXTS, content_lines)
+    assert [content_lines[a:b] for a, b in spans] == EXPECTED_LINES
+    assert [ori_content_lines[a:b] for a, b in spans] == EXPECTED_SRC_LINES
+
+def test_match_lines_failures():
+    """an empty target only matches an empty line, and targets left after the last line fail"""
+    expect_matching_failure(["你好世界", ""], ["你好，世界。", "第二句"])
+    expect_matching_failure(["你好世界", "第二句", "多余"], ["你好，世界。", "第二句"])
+
+if __name__ == "__main__":
+    for test in (test_process_cutoffs, test_match_lines, test_match_lines_failures):
+        test()
+        print(f"✅ {test.__name__}")
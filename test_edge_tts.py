@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# ------------
+# Test Edge TTS
+# ------------
+# Offline test for core/tts_backend/edge_tts.py: the edge websocket service is
+# replaced by a local aiohttp stub, a batch of lines is synthesized on the
+# shared TTS loop, and every file must be written while no more than
+# tts_concurrency.edge lines are in flight at once.
+# ------------
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+from aiohttp import web, WSMsgType
+
+# Add current directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+import edge_tts.communicate as communicate
+import core.tts_backend.edge_tts as edge_backend
+import core.tts_backend.tts_client as tts_client
+
+LIMIT = 3
+LINES = 12
+CONFIG = {"edge_tts": {"voice": "en-US-JennyNeural"}, "tts_concurrency.edge": LIMIT}
+FAKE_AUDIO = b"\xff\xf3" + bytes(4000)
+SERVER_DELAY = 0.05  # long enough for the client to have every allowed line in flight
+
+def start_stub_server(stats):
+    """Serve the edge websocket protocol on a free port, counting the turns in flight"""
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT and "Path:ssml" in msg.data:
+                stats["active"] += 1
+                stats["peak"] = max(stats["peak"], stats["active"])
+                await ws.send_str("X-RequestId:stub\r\nPath:turn.start\r\n\r\n{}")
+                await asyncio.sleep(SERVER_DELAY)
+                header = b"X-RequestId:stub\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n"
+                await ws.send_bytes(len(header).to_bytes(2, "big") + header + FAKE_AUDIO)
+                stats["active"] -= 1
+                await ws.send_str("X-RequestId:stub\r\nPath:turn.end\r\n\r\n{}")
+        return ws
+
+    def serve(ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/edge", handler)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        ready.append(site._server.sockets[0].getsockname()[1])
+        loop.run_forever()
+
+    ready = []
+    threading.Thread(target=serve, args=(ready,), daemon=True).start()
+    while not ready:
+        time.sleep(0.01)
+    return ready[0]
+
+def test_edge_tts_batch():
+    """every line is written, at most tts_concurrency.edge of them in flight"""
+    stats = {"active": 0, "peak": 0}
+    port = start_stub_server(stats)
+    wss_url = communicate.WSS_URL
+    load_keys = edge_backend.load_key, tts_client.load_key
+    communicate.WSS_URL = f"ws://127.0.0.1:{port}/edge?TrustedClientToken=stub"
+    edge_backend.load_key = tts_client.load_key = CONFIG.__getitem__
+    # the semaphore is sized on first use, start from this test's limit
+    tts_client.get_tts_client()._semaphores.pop(tts_client.PROVIDER_EDGE, None)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, f"{i}.mp3") for i in range(LINES)]
+
+            async def synthesize_all():
+                # straight to the backend, the shared TTS cache would turn repeats into hits
+                await asyncio.gather(*(edge_backend.edge_tts_async.__wrapped__(f"Line number {i}", path)
+                                       for i, path in enumerate(paths)))
+
+            tts_client.run_sync(synthesize_all())
+            assert [os.path.getsize(path) for path in paths] == [len(FAKE_AUDIO)] * LINES
+            assert not [name for name in os.listdir(tmp_dir) if name.endswith(".part")]
+    finally:
+        communicate.WSS_URL = wss_url
+        edge_backend.load_key, tts_client.load_key = load_keys
+        tts_client.get_tts_client()._semaphores.pop(tts_client.PROVIDER_EDGE, None)
+    assert stats["peak"] == LIMIT
+
+if __name__ == "__main__":
+    test_edge_tts_batch()
+    print("✅ test_edge_tts_batch")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+# ------------
+# Test GPT-SoVITS TTS
+# ------------
+# Offline test for core/tts_backend/gpt_sovits_tts.py: a local stub of api_v2
+# that, like the real server, synthesizes one line at a time. With the default
+# limit the session must keep exactly DEFAULT_LIMITS[gpt_sovits] requests in
+# flight (the next line queued while the current one is synthesized), and
+# every line's audio must be written.
+# ------------
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add current directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+import core.tts_backend.tts_client as tts_client
+from core.tts_backend.gpt_sovits_tts import GPTSoVITSSession
+
+LINES = 12
+SYNTH_SECONDS = 0.05
+FAKE_AUDIO = b"RIFF" + bytes(4000)
+
+def start_stub_server(stats):
+    """api_v2 on a free port, one synthesis at a time, counting the requests in flight"""
+    gpu = threading.Lock()
+    counter = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(404)
+            self.end_headers()
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with counter:
+                stats["active"] += 1
+                stats["peak"] = max(stats["peak"], stats["active"])
+                stats["texts"].append(payload["text"])
+            with gpu:
+                time.sleep(SYNTH_SECONDS)
+            with counter:
+                stats["active"] -= 1
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(FAKE_AUDIO)))
+            self.end_headers()
+            self.wfile.write(FAKE_AUDIO)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def no_config(key):
+    raise KeyError(key)
+
+def test_gpt_sovits_pipeline():
+    """every line is written, with DEFAULT_LIMITS[gpt_sovits] requests queued at the server"""
+    stats = {"active": 0, "peak": 0, "texts": []}
+    server = start_stub_server(stats)
+    session = GPTSoVITSSession.__new__(GPTSoVITSSession)
+    session.base_url, session.target_language = f"http://127.0.0.1:{server.server_port}", "English"
+    assert session.is_ready()
+
+    load_key = tts_client.load_key
+    # no tts_concurrency.gpt_sovits in config, the default depth applies
+    tts_client.load_key = no_config
+    tts_client.get_tts_client()._semaphores.pop(tts_client.PROVIDER_GPT_SOVITS, None)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, f"{i}.wav") for i in range(LINES)]
+
+            async def synthesize_all():
+                async def line(i):
+                    await session.tts(f"Line {i}", paths[i], "ref.wav", "en", "prompt")
+                    # what the pipeline does between two lines of a row
+                    await asyncio.sleep(SYNTH_SECONDS / 2)
+                await asyncio.gather(*(line(i) for i in range(LINES)))
+
+            tts_client.run_sync(synthesize_all())
+            assert [os.path.getsize(path) for path in paths] == [len(FAKE_AUDIO)] * LINES
+    finally:
+        tts_client.load_key = load_key
+        tts_client.get_tts_client()._semaphores.pop(tts_client.PROVIDER_GPT_SOVITS, None)
+        server.shutdown()
+    assert sorted(stats["texts"]) == sorted(f"Line {i}" for i in range(LINES))
+    assert stats["peak"] == tts_client.DEFAULT_LIMITS[tts_client.PROVIDER_GPT_SOVITS]
+
+if __name__ == "__main__":
+    test_gpt_sovits_pipeline()
+    print("✅ test_gpt_sovits_pipeline")
@@ -209,8 +209,8 @@ class BilibiliUploader:
                 cookie_data, video_path, title, desc, tid, valid_tags, dtime, cover_path
             )
             
-            # 执行上传
-            success = uploader.upload()
+            # 执行上传（biliup是同步的，放到线程中运行，不阻塞事件循环）
+            success = await asyncio.to_thread(uploader.upload)
             
             if success:
                 print(f"✅ Successfully uploaded to Bilibili: {title}")